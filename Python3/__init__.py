@@ -25,7 +25,8 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-__all__ = ['graphs',
+__all__ = ['benchmarks',
+           'graphs',
            'hashes',
            'linear',
            'nodes',
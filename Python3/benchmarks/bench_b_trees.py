@@ -0,0 +1,369 @@
+﻿#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+# structs/benchmarks/bench_b_trees.py
+#
+# Copyright (c) 2011 David J Felix
+#
+# MIT/X11 License
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from structs.benchmarks.bench_binary_trees import random_keys
+from structs.benchmarks.timing import best_time, bytes_allocated, report
+from structs.trees import b_trees, binary_trees
+
+def _variants():
+    """Return the trees to compare as (name, factory, loader) triples.
+    factory makes an empty tree and loader builds one from sorted keys.
+    """
+    variants = []
+    for tree_class in (binary_trees.AVLTree, binary_trees.RedBlackTree):
+        variants.append((tree_class.__name__,
+                         tree_class,
+                         tree_class.from_sorted,
+                        ))
+
+    variants.append(('TTree(32)',
+                     lambda: binary_trees.TTree(capacity = 32),
+                     lambda keys: binary_trees.TTree.from_sorted(
+                         keys, capacity = 32),
+                    ))
+    for tree_class in (b_trees.BTree, b_trees.BPlusTree):
+        for order in (16, 64, 256):
+            variants.append(('%s(%d)' % (tree_class.__name__, order),
+                             lambda tree_class = tree_class, order = order:
+                                 tree_class(order = order),
+                             lambda keys, tree_class = tree_class,
+                                    order = order:
+                                 tree_class.from_sorted(
+                                     ((key, None) for key in keys),
+                                     order = order),
+                            ))
+
+    return variants
+
+def run_benchmark(count = 200000, lookups = 200000, scans = 2000, width = 100):
+    """Compare B-trees of several orders with balanced binary trees.
+    Inserts are of count keys in random order into an empty tree, lookups
+    are of random present and absent keys, and each scan reads width keys
+    in order from a random start. Bulk loads and memory are measured from
+    sorted keys. The binary trees hold keys only, while the B-trees map each
+    key to None.
+    """
+    rng = random.Random(0)
+    keys = random_keys(count)
+    ordered = sorted(keys)
+    probes = [rng.randrange(2 * count) for _ in range(lookups)]
+    starts = [rng.randrange(count) for _ in range(scans)]
+    rows = []
+    for name, factory, loader in _variants():
+        def insert():
+            tree = factory()
+            for key in keys:
+                tree.insert(key)
+
+            return tree
+
+        tree = loader(ordered)
+
+        def lookup():
+            for key in probes:
+                key in tree
+
+        def scan():
+            for start in starts:
+                for key in _range(tree, start, start + width - 1):
+                    pass
+
+        _, size = bytes_allocated(lambda: loader(ordered))
+        rows.append([name,
+                     '%.0f' % (count / best_time(insert, repeat = 1)),
+                     '%.0f' % (lookups / best_time(lookup)),
+                     '%.0f' % (scans * width / best_time(scan)),
+                     '%.0f' % (count / best_time(lambda: loader(ordered))),
+                     '%.1f' % (size / count),
+                    ])
+
+    report('B-trees against binary trees (%d keys)' % count,
+           ['tree',
+            'inserts/s',
+            'lookups/s',
+            'scanned/s',
+            'loaded/s',
+            'bytes/key',
+           ],
+           rows,
+          )
+
+def run_ingest_benchmark(count = 500000, lookups = 100000):
+    """Compare the ingest rate of BEpsilonTree with the unbuffered trees.
+    Inserts are of count keys in random and then in ascending order, and
+    counting is count increments spread over count // 10 keys, which the
+    unbuffered trees do with a get and an insert and BEpsilonTree with a
+    blind upsert. Lookups are of random present and absent keys.
+    """
+    rng = random.Random(0)
+    keys = random_keys(count)
+    ordered = sorted(keys)
+    counted = [rng.randrange(count // 10) for _ in range(count)]
+    probes = [rng.randrange(2 * count) for _ in range(lookups)]
+    variants = [('BTree(64)', lambda: b_trees.BTree(order = 64)),
+                ('BPlusTree(64)', lambda: b_trees.BPlusTree(order = 64)),
+               ]
+    for buffer_size in (1024, 4096, 16384):
+        variants.append(('BEpsilonTree(16, %d)' % buffer_size,
+                         lambda buffer_size = buffer_size:
+                             b_trees.BEpsilonTree(fanout = 16,
+                                                  buffer_size = buffer_size),
+                        ))
+
+    increment = (1).__add__
+    rows = []
+    for name, factory in variants:
+        def insert(keys):
+            tree = factory()
+            for key in keys:
+                tree.insert(key, key)
+
+            return tree
+
+        def count_keys():
+            tree = factory()
+            if isinstance(tree, b_trees.BEpsilonTree):
+                for key in counted:
+                    tree.upsert(key, increment, 0)
+
+            else:
+                for key in counted:
+                    tree.insert(key, tree.get(key, 0) + 1)
+
+            return tree
+
+        tree = insert(keys)
+
+        def lookup():
+            for key in probes:
+                key in tree
+
+        rows.append([name,
+                     '%.0f' % (count / best_time(lambda: insert(keys),
+                                                 repeat = 1)),
+                     '%.0f' % (count / best_time(lambda: insert(ordered),
+                                                 repeat = 1)),
+                     '%.0f' % (count / best_time(count_keys, repeat = 1)),
+                     '%.0f' % (lookups / best_time(lookup)),
+                    ])
+
+    report('Buffered ingest (%d keys)' % count,
+           ['tree', 'random/s', 'ascending/s', 'counted/s', 'lookups/s'],
+           rows,
+          )
+
+class _LockedTree(object):
+    """A BPlusTree behind one lock, the baseline for the concurrent tree."""
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.lock = threading.Lock()
+
+    def delete(self, key):
+        with self.lock:
+            return self.tree.delete(key)
+
+    def get(self, key, default = None):
+        with self.lock:
+            return self.tree.get(key, default)
+
+    def insert(self, key, value = None):
+        with self.lock:
+            self.tree.insert(key, value)
+
+def run_concurrent_benchmark(count = 200000, duration = 1.0,
+                             readers = (1, 2, 4), writers = (0, 1, 2)):
+    """Measure lookups and writes per second with threads sharing a tree.
+    Each reader looks up random keys and each writer inserts and deletes
+    random keys, for duration seconds, against ConcurrentBPlusTree and
+    against a BPlusTree behind a single lock.
+    """
+    keys = random_keys(count)
+    ordered = sorted(keys)
+    rows = []
+    for name, factory in (('BPlusTree + lock',
+                           lambda: _LockedTree(b_trees.BPlusTree.from_sorted(
+                               (key, key) for key in ordered))),
+                          ('ConcurrentBPlusTree',
+                           lambda: b_trees.ConcurrentBPlusTree.from_sorted(
+                               (key, key) for key in ordered)),
+                         ):
+        for reader_count in readers:
+            for writer_count in writers:
+                tree = factory()
+                done = threading.Event()
+                reads = [0] * reader_count
+                writes = [0] * writer_count
+
+                def read(n):
+                    rng = random.Random(n)
+                    get = tree.get
+                    total = 0
+                    while not done.is_set():
+                        for _ in range(100):
+                            get(rng.randrange(2 * count))
+
+                        total += 100
+
+                    reads[n] = total
+
+                def write(n):
+                    rng = random.Random(-1 - n)
+                    total = 0
+                    while not done.is_set():
+                        for _ in range(100):
+                            key = rng.randrange(2 * count)
+                            if rng.random() < 0.5:
+                                tree.insert(key, key)
+
+                            else:
+                                try:
+                                    tree.delete(key)
+
+                                except KeyError:
+                                    pass
+
+                        total += 100
+
+                    writes[n] = total
+
+                threads = [threading.Thread(target = read, args = (n,))
+                           for n in range(reader_count)]
+                threads += [threading.Thread(target = write, args = (n,))
+                            for n in range(writer_count)]
+                for thread in threads:
+                    thread.start()
+
+                time.sleep(duration)
+                done.set()
+                for thread in threads:
+                    thread.join()
+
+                rows.append([name,
+                             str(reader_count),
+                             str(writer_count),
+                             '%.0f' % (sum(reads) / duration),
+                             '%.0f' % (sum(writes) / duration),
+                            ])
+
+    report('Threads sharing a tree (%d keys)' % count,
+           ['tree', 'readers', 'writers', 'lookups/s', 'writes/s'],
+           rows,
+          )
+
+def run_disk_benchmark(count = 200000, lookups = 100000, scans = 1000,
+                       width = 100, batch = 10000):
+    """Measure DiskBPlusTree with buffer pools of several sizes against an
+    in memory BPlusTree. Inserts are of count keys in random order,
+    committing every batch keys, and the lookups and scans are as in
+    run_benchmark but against the reopened file, so the pool starts cold.
+    The hit rate is of the pool over the lookups.
+    """
+    rng = random.Random(0)
+    keys = random_keys(count)
+    probes = [rng.randrange(2 * count) for _ in range(lookups)]
+    starts = [rng.randrange(count) for _ in range(scans)]
+    directory = tempfile.mkdtemp()
+    rows = []
+    try:
+        for pages in (None, 16, 256, 4096):
+            path = os.path.join(directory, 'tree%s' % pages)
+            if pages is None:
+                name = 'BPlusTree(256)'
+                tree = b_trees.BPlusTree(order = 256)
+
+            else:
+                name = 'DiskBPlusTree(%d pages)' % pages
+                tree = b_trees.DiskBPlusTree(path, cache_pages = pages)
+
+            started = time.perf_counter()
+            for n, key in enumerate(keys, 1):
+                tree.insert(key, key)
+                if pages is not None and n % batch == 0:
+                    tree.commit()
+
+            inserted = time.perf_counter() - started
+            if pages is not None:
+                tree.close()
+                tree = b_trees.DiskBPlusTree(path, cache_pages = pages)
+
+            started = time.perf_counter()
+            for key in probes:
+                key in tree
+
+            looked = time.perf_counter() - started
+            hit_rate = ''
+            if pages is not None:
+                hit_rate = '%.1f' % (100 * tree.hits /
+                                     (tree.hits + tree.misses))
+
+            started = time.perf_counter()
+            for start in starts:
+                for key in tree.keys(start, start + width - 1):
+                    pass
+
+            scanned = time.perf_counter() - started
+            size = ''
+            if pages is not None:
+                tree.close()
+                size = '%.1f' % (os.path.getsize(path) / 2 ** 20)
+
+            rows.append([name,
+                         '%.0f' % (count / inserted),
+                         '%.0f' % (lookups / looked),
+                         hit_rate,
+                         '%.0f' % (scans * width / scanned),
+                         size,
+                        ])
+
+    finally:
+        shutil.rmtree(directory)
+
+    report('Disk B+ tree buffer pools (%d keys)' % count,
+           ['tree', 'inserts/s', 'lookups/s', 'hit %', 'scanned/s', 'MiB'],
+           rows,
+          )
+
+def _range(tree, low, high):
+    """Return the keys of tree from low to high, whatever its kind."""
+    if isinstance(tree, b_trees.BTree):
+        return tree.keys(low, high)
+
+    return tree.range(low, high)
+
+if __name__ == '__main__':
+    run_benchmark()
+    run_ingest_benchmark()
+    run_concurrent_benchmark()
+    run_disk_benchmark()
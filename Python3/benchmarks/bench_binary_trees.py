@@ -0,0 +1,678 @@
+﻿#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+# structs/benchmarks/bench_binary_trees.py
+#
+# Copyright (c) 2011 David J Felix
+#
+# MIT/X11 License
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import random
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from itertools import accumulate, islice
+
+from structs import nodes
+from structs.benchmarks.timing import (best_time,
+                                       bytes_allocated,
+                                       bytes_per_item,
+                                       report,
+                                      )
+from structs.trees import binary_trees
+
+def sorted_keys(count, seed = 0):
+    return list(range(count))
+
+def random_keys(count, seed = 0):
+    keys = list(range(count))
+    random.Random(seed).shuffle(keys)
+    return keys
+
+def zigzag_keys(count, seed = 0):
+    """Alternate between the smallest and largest remaining keys.
+    This builds a maximally deep zigzag path in an unbalanced tree and forces
+    a double rotation at almost every step of a balanced one.
+    """
+    keys = []
+    low = 0
+    high = count - 1
+    while low <= high:
+        keys.append(low)
+        low += 1
+        if low <= high:
+            keys.append(high)
+            high -= 1
+
+    return keys
+
+STREAMS = [('sorted', sorted_keys),
+           ('random', random_keys),
+           ('zigzag', zigzag_keys),
+          ]
+
+SEARCH_TREES = [binary_trees.BinarySearchTree,
+                binary_trees.AVLTree,
+                binary_trees.RedBlackTree,
+                binary_trees.ScapegoatTree,
+                binary_trees.WeightBalancedTree,
+               ]
+
+def _height(tree):
+    heights = {None: 0}
+    for node in tree.nodes('post'):
+        heights[node] = 1 + max(heights[node.left], heights[node.right])
+
+    return heights[tree.root]
+
+def run_benchmark(count = 50000, unbalanced_count = 2000):
+    """Compare insert and lookup throughput of the search tree variants.
+    Each tree is loaded from a sorted, a random and a zigzag key stream and
+    then every key is looked up in random order. The unbalanced
+    BinarySearchTree degrades to O(n) per operation on the sorted and zigzag
+    streams, so it only gets unbalanced_count keys for those.
+    """
+    rows = []
+    for stream_name, stream in STREAMS:
+        for tree_class in SEARCH_TREES:
+            size = count
+            if (tree_class is binary_trees.BinarySearchTree and
+                    stream_name != 'random'):
+                size = unbalanced_count
+
+            keys = stream(size)
+            probes = random_keys(size, 1)
+
+            def load():
+                tree = tree_class()
+                insert = tree.insert
+                for key in keys:
+                    insert(key)
+
+                return tree
+
+            tree = load()
+
+            def lookup():
+                search = tree.search
+                for key in probes:
+                    search(key)
+
+            rows.append([tree_class.__name__,
+                         stream_name,
+                         size,
+                         _height(tree),
+                         '%.0f' % (size / best_time(load, 1)),
+                         '%.0f' % (size / best_time(lookup)),
+                        ])
+
+    report('Search tree throughput',
+           ['tree', 'stream', 'keys', 'height', 'inserts/s', 'lookups/s'],
+           rows,
+          )
+
+def run_bulk_load_benchmark(count = 200000):
+    """Compare from_sorted against inserting sorted keys one at a time.
+    from_sorted is given a bare generator, with and without its count, so
+    the keys are never held in a list.
+    """
+    rows = []
+    for tree_class in SEARCH_TREES[1:]:
+        def inserts():
+            tree = tree_class()
+            insert = tree.insert
+            for key in range(count):
+                insert(key)
+
+        counted = best_time(lambda: tree_class.from_sorted(
+            (key for key in range(count)), count), 1)
+        rows.append([tree_class.__name__,
+                     'insert',
+                     '%.0f' % (count / best_time(inserts, 1)),
+                    ])
+        rows.append([tree_class.__name__,
+                     'from_sorted',
+                     '%.0f' % (count / counted),
+                    ])
+
+    streamed = best_time(lambda: binary_trees.BinarySearchTree.from_sorted(
+        key for key in range(count)), 1)
+    rows.append(['BinarySearchTree',
+                 'from_sorted, no count',
+                 '%.0f' % (count / streamed),
+                ])
+    report('Bulk loading %d sorted keys' % count,
+           ['tree', 'method', 'keys/s'],
+           rows,
+          )
+
+def zipf_probes(keys, count, exponent, seed = 0):
+    """Draw count lookups from keys with Zipf distributed popularity.
+    The key of popularity rank r is drawn with weight 1 / r ** exponent, and
+    popularity ranks are assigned to keys at random.
+    """
+    generator = random.Random(seed)
+    ranked = list(keys)
+    generator.shuffle(ranked)
+    weights = accumulate(1 / (r ** exponent) for r in range(1, len(ranked) + 1))
+    return generator.choices(ranked, cum_weights = list(weights), k = count)
+
+def run_splay_benchmark(count = 100000, lookups = 200000):
+    """Compare SplayTree lookups against bisect on skewed workloads.
+    Keys are looked up with Zipf exponents from 0, which is uniform, to 1.5,
+    where a handful of keys take most lookups. A RedBlackTree shows what a
+    non-adaptive tree does on the same probes.
+    """
+    keys = list(range(0, 2 * count, 2))
+    rows = []
+    for exponent in (0.0, 0.8, 1.0, 1.2, 1.5):
+        probes = zipf_probes(keys, lookups, exponent)
+
+        def bisect_lookup():
+            for key in probes:
+                i = bisect_left(keys, key)
+                if i < count and keys[i] == key:
+                    pass
+
+        splay = binary_trees.SplayTree.from_sorted(keys)
+        red_black = binary_trees.RedBlackTree.from_sorted(keys)
+
+        def tree_lookup(tree):
+            search = tree.search
+            for key in probes:
+                search(key)
+
+        rows.append(['%.1f' % exponent,
+                     '%.0f' % (lookups / best_time(bisect_lookup)),
+                     '%.0f' % (lookups / best_time(lambda:
+                                                   tree_lookup(splay))),
+                     '%.0f' % (lookups / best_time(lambda:
+                                                   tree_lookup(red_black))),
+                    ])
+
+    report('Lookups per second over %d keys (Zipf workload)' % count,
+           ['exponent', 'bisect', 'SplayTree', 'RedBlackTree'],
+           rows,
+          )
+
+def run_treap_benchmark(count = 200000, shard_sizes = (100, 10000, 200000)):
+    """Compare treap set operations against rebuilding the result.
+    A treap of count keys is combined with shards of several sizes drawn
+    from an overlapping key range, by union_update, by inserting the shard's
+    keys one at a time and by rebuilding with from_sorted over a merged set.
+    """
+    generator = random.Random(0)
+    base = sorted(generator.sample(range(4 * count), count))
+    rows = []
+    for size in shard_sizes:
+        shard = sorted(generator.sample(range(4 * count), size))
+
+        def union():
+            tree = binary_trees.Treap.from_sorted(base, seed = 1)
+            other = binary_trees.Treap.from_sorted(shard, seed = 2)
+            start = time.perf_counter()
+            tree.union_update(other)
+            return time.perf_counter() - start
+
+        def inserts():
+            tree = binary_trees.Treap.from_sorted(base, seed = 1)
+            start = time.perf_counter()
+            tree.update(shard)
+            return time.perf_counter() - start
+
+        def rebuild():
+            start = time.perf_counter()
+            binary_trees.Treap.from_sorted(sorted(set(base).union(shard)),
+                                           seed = 1,
+                                          )
+            return time.perf_counter() - start
+
+        rows.append([size,
+                     '%.4f' % min(union() for each in range(3)),
+                     '%.4f' % min(inserts() for each in range(3)),
+                     '%.4f' % min(rebuild() for each in range(3)),
+                    ])
+
+    report('Seconds to add a shard to a %d key treap' % count,
+           ['shard', 'union_update', 'inserts', 'rebuild'],
+           rows,
+          )
+
+def _bi_binary_tree(keys, start, stop):
+    """Link keys[start:stop] into a balanced tree of BiBinaryNodes."""
+    if start >= stop:
+        return None
+
+    middle = (start + stop) // 2
+    node = nodes.BiBinaryNode(keys[middle],
+                              _bi_binary_tree(keys, middle + 1, stop),
+                              _bi_binary_tree(keys, start, middle),
+                             )
+    for child in (node.left, node.right):
+        if child is not None:
+            child.parent = node
+
+    return node
+
+def run_ttree_benchmark(count = 200000, lookups = 200000):
+    """Compare TTrees of several capacities with one key per node trees.
+    The BiBinaryNode row is a balanced tree of the validating nodes, searched
+    by a plain loop, and the AVLTree row is the same shape of tree made of
+    FastSizedBinaryNodes. Inserts are of the keys in random order into an
+    empty tree, lookups are of random present and absent keys, and memory is
+    measured on trees loaded from sorted keys.
+    """
+    rng = random.Random(0)
+    keys = random_keys(count)
+    ordered = sorted(keys)
+    probes = [rng.randrange(2 * count) for _ in range(lookups)]
+
+    def bi_binary_lookups(root):
+        for key in probes:
+            node = root
+            while node is not None and node.data != key:
+                node = node.left if key < node.data else node.right
+
+    root, size = bytes_allocated(lambda: _bi_binary_tree(ordered, 0, count))
+    rows = [['BiBinaryNode tree',
+             '-',
+             '%.0f' % (lookups / best_time(lambda: bi_binary_lookups(root))),
+             '%.1f' % (size / count),
+            ],
+           ]
+    root = None
+    variants = [('AVLTree', binary_trees.AVLTree, {})]
+    for capacity in (8, 32, 128):
+        variants.append(('TTree(%d)' % capacity,
+                         binary_trees.TTree,
+                         {'capacity': capacity},
+                        ))
+
+    variants.append(("TTree(32, 'q')",
+                     binary_trees.TTree,
+                     {'capacity': 32, 'typecode': 'q'},
+                    ))
+    for name, tree_class, options in variants:
+        def insert():
+            tree = tree_class(**options)
+            tree.update(keys)
+            return tree
+
+        tree = tree_class.from_sorted(ordered, **options)
+
+        def lookup():
+            for key in probes:
+                key in tree
+
+        _, size = bytes_allocated(lambda: tree_class.from_sorted(ordered,
+                                                                 **options))
+        rows.append([name,
+                     '%.0f' % (count / best_time(insert, repeat = 1)),
+                     '%.0f' % (lookups / best_time(lookup)),
+                     '%.1f' % (size / count),
+                    ])
+
+    report('TTree against one key per node (%d keys)' % count,
+           ['tree', 'inserts/s', 'lookups/s', 'bytes/key'],
+           rows,
+          )
+
+def run_threaded_benchmark(count = 200000, page = 100):
+    """Compare in-order scans of a ThreadedBinaryTree with BinaryTree.
+    Both trees are bulk loaded with the same keys. The full scans walk every
+    element, forwards and backwards, and the paged scan reads the whole tree
+    page elements at a time, resuming a cursor for the threaded tree and
+    restarting range at the last key seen for the plain search tree.
+    """
+    keys = range(count)
+    plain = binary_trees.BinarySearchTree.from_sorted(keys)
+    threaded = binary_trees.ThreadedBinaryTree.from_sorted(keys)
+
+    def scan(iterable):
+        for _ in iterable:
+            pass
+
+    def plain_pages():
+        low = None
+        while True:
+            data = list(islice(plain.range(low), page + (low is not None)))
+            if low is not None:
+                data = data[1:]
+
+            if not data:
+                return
+
+            low = data[-1]
+
+    def threaded_pages():
+        cursor = threaded.cursor()
+        while cursor.take(page):
+            pass
+
+    rows = [['BinaryTree in order',
+             '%.0f' % (count / best_time(lambda: scan(plain.traverse('in')))),
+            ],
+            ['BinaryTree reversed',
+             '%.0f' % (count / best_time(lambda: scan(reversed(list(
+                 plain.traverse('in')))))),
+            ],
+            ['BinaryTree range pages',
+             '%.0f' % (count / best_time(plain_pages)),
+            ],
+            ['ThreadedBinaryTree in order',
+             '%.0f' % (count / best_time(lambda: scan(threaded))),
+            ],
+            ['ThreadedBinaryTree reversed',
+             '%.0f' % (count / best_time(lambda: scan(reversed(threaded)))),
+            ],
+            ['ThreadedBinaryTree cursor pages',
+             '%.0f' % (count / best_time(threaded_pages)),
+            ],
+           ]
+    report('Elements scanned per second (%d elements, pages of %d)'
+           % (count, page),
+           ['scan', 'elements/s'],
+           rows,
+          )
+
+def run_cartesian_benchmark(count = 1000000,
+                            queries = 100000,
+                            slice_queries = 200,
+                           ):
+    """Measure CartesianTree construction and range minimum queries.
+    The series is a random walk of doubles held in an array('d'), which the
+    tree uses without copying. Queries over random ranges are timed against
+    min over a slice, which is O(length) but runs in C, on the first
+    slice_queries of the ranges.
+    """
+    rng = random.Random(0)
+    series = array('d', accumulate(rng.gauss(0, 1) for _ in range(count)))
+    ranges = []
+    for _ in range(queries):
+        start = rng.randrange(count)
+        ranges.append((start, rng.randrange(start + 1, count + 1)))
+
+    build = best_time(lambda: binary_trees.CartesianTree(series), repeat = 1)
+    tree, size = bytes_allocated(lambda: binary_trees.CartesianTree(series))
+
+    def slice_min():
+        for start, stop in ranges[:slice_queries]:
+            min(series[start:stop])
+
+    def tree_queries():
+        query_value = tree.query_value
+        for start, stop in ranges:
+            query_value(start, stop)
+
+    report('CartesianTree over %d doubles' % count,
+           ['measure', 'result'],
+           [['build seconds', '%.2f' % build],
+            ['index bytes per element', '%.1f' % (size / count)],
+            ['min over slice queries/s',
+             '%.0f' % (slice_queries / best_time(slice_min)),
+            ],
+            ['tree queries/s', '%.0f' % (queries / best_time(tree_queries))],
+           ],
+          )
+
+def run_link_cut_benchmark(count = 1000000, operations = 200000):
+    """Time a random sequence of forest changes and queries on a LinkCutTree.
+    Each step links two random vertices of different trees, cuts a random
+    existing edge, checks whether two random vertices are connected or sums
+    the path between the ends of two edges. The forest starts as count
+    single vertices, and the chain row runs path queries over one path of
+    count vertices, which is the worst case for walking parent links.
+    """
+    rng = random.Random(0)
+    tree, size = bytes_allocated(
+        lambda: binary_trees.LinkCutTree(rng.randrange(100)
+                                         for _ in range(count)))
+    edges = []
+    timings = {'link': [0, 0.0],
+               'cut': [0, 0.0],
+               'connected': [0, 0.0],
+               'path_sum': [0, 0.0],
+              }
+    clock = time.perf_counter
+    for _ in range(operations):
+        choice = rng.random()
+        if choice < 0.4 or not edges:
+            first, second = rng.randrange(count), rng.randrange(count)
+            start = clock()
+            if not tree.connected(first, second):
+                tree.link(first, second)
+                edges.append((first, second))
+
+            kind = 'link'
+
+        elif choice < 0.6:
+            i = rng.randrange(len(edges))
+            edges[i], edges[-1] = edges[-1], edges[i]
+            first, second = edges.pop()
+            start = clock()
+            tree.cut(first, second)
+            kind = 'cut'
+
+        elif choice < 0.8:
+            first, second = rng.randrange(count), rng.randrange(count)
+            start = clock()
+            tree.connected(first, second)
+            kind = 'connected'
+
+        else:
+            first = rng.choice(edges)[0]
+            second = rng.choice(edges)[1]
+            start = clock()
+            if tree.connected(first, second):
+                tree.path_sum(first, second)
+
+            kind = 'path_sum'
+
+        timing = timings[kind]
+        timing[0] += 1
+        timing[1] += clock() - start
+
+    chain = binary_trees.LinkCutTree(range(count))
+    for vertex in range(count - 1):
+        chain.link(vertex, vertex + 1)
+
+    probes = [(rng.randrange(count), rng.randrange(count))
+              for _ in range(operations // 10)]
+
+    def chain_queries():
+        for first, second in probes:
+            chain.path_max(first, second)
+
+    rows = [[kind, '%d' % number, '%.0f' % (number / seconds)]
+            for kind, (number, seconds) in timings.items()]
+    rows.append(['chain path_max',
+                 '%d' % len(probes),
+                 '%.0f' % (len(probes) / best_time(chain_queries, repeat = 1)),
+                ])
+    report('LinkCutTree over %d vertices (%.1f bytes per vertex)'
+           % (count, size / count),
+           ['operation', 'count', 'per second'],
+           rows,
+          )
+
+def run_van_emde_boas_benchmark(count = 100000, queries = 200000):
+    """Compare VanEmdeBoasTree against bisect on a sorted list.
+    The dense set takes every other key of a small range, while the sparse set
+    spreads the same number of keys over the whole 32 bit universe. Inserts go
+    into an empty structure in random order, so bisect pays for insort moving
+    the tail of its list.
+    """
+    rng = random.Random(0)
+    key_sets = [('dense', rng.sample(range(2 * count), count)),
+                ('sparse', [rng.getrandbits(32) for _ in range(count)]),
+               ]
+    rows = []
+    for name, keys in key_sets:
+        probes = [rng.getrandbits(32) if name == 'sparse'
+                  else rng.randrange(2 * count)
+                  for _ in range(queries)]
+
+        def list_insert():
+            ordered = []
+            for key in keys:
+                insort(ordered, key)
+
+            return ordered
+
+        def tree_insert():
+            tree = binary_trees.VanEmdeBoasTree()
+            tree.update(keys)
+            return tree
+
+        ordered = list_insert()
+        tree = tree_insert()
+        size = len(ordered)
+
+        def list_successor():
+            for key in probes:
+                i = bisect_right(ordered, key)
+                if i < size:
+                    ordered[i]
+
+        def tree_successor():
+            successor = tree.successor
+            for key in probes:
+                successor(key)
+
+        rows.append([name,
+                     '%.0f' % (count / best_time(list_insert)),
+                     '%.0f' % (count / best_time(tree_insert)),
+                     '%.0f' % (queries / best_time(list_successor)),
+                     '%.0f' % (queries / best_time(tree_successor)),
+                     '%.1f' % (bytes_allocated(tree_insert)[1] / count),
+                    ])
+
+    report('VanEmdeBoasTree against bisect (%d keys)' % count,
+           ['keys',
+            'insort/s',
+            'vEB insert/s',
+            'bisect succ/s',
+            'vEB succ/s',
+            'vEB bytes/key',
+           ],
+           rows,
+          )
+
+def run_rope_benchmark(size = 20000000, edits = 200):
+    """Compare Rope edits against rebuilding a str.
+    A buffer of size characters takes random inserts, deletes and reads. A
+    str must copy the whole buffer for every edit, while the rope only
+    rebuilds a path of nodes. Streaming the rope to a file through chunks
+    is timed against writing the flattened text.
+    """
+    rng = random.Random(0)
+    text = 'log line 0123456789\n' * (size // 20)
+    positions = [rng.randrange(len(text)) for _ in range(edits)]
+    reads = [rng.randrange(len(text) // 2) for _ in range(edits * 10)]
+
+    def str_edits():
+        buffer = text
+        for i in positions:
+            buffer = buffer[:i] + 'inserted' + buffer[i:]
+            buffer = buffer[:i // 2] + buffer[i // 2 + 8:]
+
+        return buffer
+
+    def rope_edits():
+        rope = binary_trees.Rope(text)
+        for i in positions:
+            rope.insert(i, 'inserted')
+            rope.delete(i // 2, i // 2 + 8)
+
+        return rope
+
+    rope = rope_edits()
+    assert rope.flatten() == str_edits()
+
+    def rope_reads():
+        for i in reads:
+            rope[i]
+
+    def write_flat():
+        with open(os.devnull, 'w') as devnull:
+            devnull.write(rope.flatten())
+
+    def write_chunks():
+        with open(os.devnull, 'w') as devnull:
+            devnull.writelines(rope.chunks())
+
+    rows = [['str', '%.0f' % (edits / best_time(str_edits, repeat = 1))],
+            ['Rope', '%.0f' % (edits / best_time(rope_edits, repeat = 1))],
+           ]
+    report('Insert and delete pairs per second (%d characters)' % size,
+           ['buffer', 'edits/s'],
+           rows,
+          )
+    report('Rope reads and writes (%d characters)' % size,
+           ['operation', 'result'],
+           [['index reads/s', '%.0f' % (len(reads) / best_time(rope_reads))],
+            ['write flattened ms', '%.1f' % (1000 * best_time(write_flat))],
+            ['write chunks ms', '%.1f' % (1000 * best_time(write_chunks))],
+            ['bytes held after flatten',
+             '%d' % bytes_allocated(rope.flatten)[1],
+            ],
+            ['bytes held after streaming',
+             '%d' % bytes_allocated(lambda: sum(map(len, rope.chunks())))[1],
+            ],
+           ],
+          )
+
+def run_memory_benchmark(count = 200000):
+    """Measure the bytes each tree spends per element.
+    Every tree is bulk loaded with count int keys, and the keys are charged to
+    the tree as they are to the plain BiBinaryNode baseline, which is a bare
+    node holding an int with no tree around it.
+    """
+    rows = [['BiBinaryNode (nodes only)',
+             '%.1f' % bytes_per_item(nodes.BiBinaryNode, count),
+            ],
+           ]
+    for tree_class in SEARCH_TREES + [binary_trees.SplayTree,
+                                      binary_trees.Treap,
+                                      binary_trees.ThreadedBinaryTree,
+                                     ]:
+        tree, size = bytes_allocated(lambda: tree_class.from_sorted(
+            range(count)))
+        rows.append([tree_class.__name__, '%.1f' % (size / count)])
+
+    report('Bytes per element (%d elements)' % count,
+           ['tree', 'bytes'],
+           rows,
+          )
+
+if __name__ == '__main__':
+    run_benchmark()
+    run_bulk_load_benchmark()
+    run_splay_benchmark()
+    run_treap_benchmark()
+    run_ttree_benchmark()
+    run_threaded_benchmark()
+    run_cartesian_benchmark()
+    run_van_emde_boas_benchmark()
+    run_link_cut_benchmark()
+    run_rope_benchmark()
+    run_memory_benchmark()
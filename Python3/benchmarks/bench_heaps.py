@@ -0,0 +1,578 @@
+﻿#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+# structs/benchmarks/bench_heaps.py
+#
+# Copyright (c) 2011 David J Felix
+#
+# MIT/X11 License
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import bisect
+import heapq
+import random
+import time
+from array import array
+
+from structs.benchmarks.timing import best_time, report
+from structs.trees import heaps
+
+def _variants():
+    """Return the heaps to compare as (name, factory) pairs, where factory
+    builds a heap from items. heapq itself is wrapped as a BinaryHeap
+    stand in so that every variant runs the same calls.
+    """
+    variants = [('heapq', _HeapqHeap),
+                ('BinaryHeap', heaps.BinaryHeap),
+                ('BinaryHeap(q)',
+                 lambda items = (): heaps.BinaryHeap(items, typecode = 'q')),
+               ]
+    for arity in (2, 3, 4, 8, 16):
+        variants.append(('DaryHeap(%d)' % arity,
+                         lambda items = (), arity = arity:
+                             heaps.DaryHeap(items, arity = arity)))
+
+    variants.append(('DaryHeap(4, q)',
+                     lambda items = (): heaps.DaryHeap(items, arity = 4,
+                                                       typecode = 'q')))
+    return variants
+
+class _HeapqHeap(object):
+    """The heapq functions on a list, with the methods of BinaryHeap."""
+
+    def __init__(self, items = ()):
+        self.heap = list(items)
+        heapq.heapify(self.heap)
+
+    def __len__(self):
+        return len(self.heap)
+
+    def pop(self):
+        return heapq.heappop(self.heap)
+
+    def push(self, item):
+        heapq.heappush(self.heap, item)
+
+    def pushpop(self, item):
+        return heapq.heappushpop(self.heap, item)
+
+def run_benchmark(count = 200000, window = 1000):
+    """Compare heaps with heapq on count random integers.
+    push is of every integer into an empty heap and pop drains it again.
+    heapify builds the heap in one go, and pushpop streams every integer
+    through a heap of the window largest seen. mixed pushes every integer
+    but pops only after every fourth push, which favours wider heaps since
+    pushes climb fewer levels.
+    """
+    rng = random.Random(0)
+    items = [rng.randrange(1 << 60) for _ in range(count)]
+    rows = []
+    for name, factory in _variants():
+        def push():
+            heap = factory()
+            for item in items:
+                heap.push(item)
+
+            return heap
+
+        def pop():
+            heap = factory(items)
+            started = time.perf_counter()
+            for _ in range(count):
+                heap.pop()
+
+            return time.perf_counter() - started
+
+        def pushpop():
+            heap = factory(items[:window])
+            for item in items:
+                heap.pushpop(item)
+
+        def mixed():
+            heap = factory()
+            for n, item in enumerate(items):
+                heap.push(item)
+                if n % 4 == 3:
+                    heap.pop()
+
+        pop_time = min(pop() for _ in range(3))
+        rows.append([name,
+                     '%.0f' % (count / best_time(push)),
+                     '%.0f' % (count / pop_time),
+                     '%.0f' % (count / best_time(lambda: factory(items))),
+                     '%.0f' % (count / best_time(pushpop)),
+                     '%.0f' % (count / best_time(mixed)),
+                    ])
+
+    report('Heaps against heapq (%d items)' % count,
+           ['heap', 'push/s', 'pop/s', 'heapify/s', 'pushpop/s', 'mixed/s'],
+           rows,
+          )
+
+def random_graph(nodes, edges, seed = 0):
+    """Return adjacency lists of (node, weight) pairs for a random directed
+    graph, with a path through every node so all of them are reachable.
+    """
+    rng = random.Random(seed)
+    graph = [[] for _ in range(nodes)]
+    for node in range(1, nodes):
+        graph[node - 1].append((node, rng.randrange(1, 1000)))
+
+    for _ in range(edges - nodes + 1):
+        graph[rng.randrange(nodes)].append((rng.randrange(nodes),
+                                            rng.randrange(1, 1000)))
+
+    return graph
+
+def _dijkstra_heapq(graph, source):
+    """Return distances and peak heap size with heapq, leaving stale
+    entries in the heap and skipping them when they come out.
+    """
+    distances = {source: 0}
+    heap = [(0, source)]
+    peak = 1
+    done = set()
+    while heap:
+        distance, node = heapq.heappop(heap)
+        if node in done:
+            continue
+
+        done.add(node)
+        for target, weight in graph[node]:
+            through = distance + weight
+            if through < distances.get(target, through + 1):
+                distances[target] = through
+                heapq.heappush(heap, (through, target))
+                if len(heap) > peak:
+                    peak = len(heap)
+
+    return distances, peak
+
+def _dijkstra_indexed(graph, source):
+    """Return distances and peak heap size with IndexedHeap, lowering the
+    priority of a node in place when a shorter path turns up.
+    """
+    distances = {source: 0}
+    heap = heaps.IndexedHeap([(source, 0)])
+    peak = 1
+    while heap:
+        node, distance = heap.pop()
+        for target, weight in graph[node]:
+            through = distance + weight
+            if through < distances.get(target, through + 1):
+                if target in heap:
+                    heap.update(target, through)
+
+                elif target not in distances:
+                    heap.push(target, through)
+                    if len(heap) > peak:
+                        peak = len(heap)
+
+                distances[target] = through
+
+    return distances, peak
+
+def _dijkstra_handles(graph, source, heap_class):
+    """Return distances and peak heap size with a heap of heap_class,
+    lowering the priority of a node through its handle.
+    """
+    distances = {source: 0}
+    heap = heap_class()
+    nodes = {source: heap.push(source, 0)}
+    peak = 1
+    while heap:
+        node, distance = heap.pop()
+        del nodes[node]
+        for target, weight in graph[node]:
+            through = distance + weight
+            if through < distances.get(target, through + 1):
+                handle = nodes.get(target)
+                if handle is not None:
+                    heap.decrease(handle, through)
+
+                elif target not in distances:
+                    nodes[target] = heap.push(target, through)
+                    if len(heap) > peak:
+                        peak = len(heap)
+
+                distances[target] = through
+
+    return distances, peak
+
+def _meld_heapq(groups, rng):
+    """Meld random pairs of heapq heaps by extending one with the other and
+    heapifying, popping once after each meld, until one heap is left.
+    """
+    pool = [list(group) for group in groups]
+    for heap in pool:
+        heapq.heapify(heap)
+
+    while len(pool) > 1:
+        first = pool.pop(rng.randrange(len(pool)))
+        second = pool.pop(rng.randrange(len(pool)))
+        if len(first) < len(second):
+            first, second = second, first
+
+        first += second
+        heapq.heapify(first)
+        heapq.heappop(first)
+        pool.append(first)
+
+def _meld_heaps(groups, rng, heap_class):
+    """Meld random pairs of heaps of heap_class, popping once after each
+    meld, until one heap is left.
+    """
+    pool = [heap_class((item, item) for item in group) for group in groups]
+    while len(pool) > 1:
+        first = pool.pop(rng.randrange(len(pool)))
+        second = pool.pop(rng.randrange(len(pool)))
+        first.meld(second)
+        first.pop()
+        pool.append(first)
+
+def _dijkstra_monotone(graph, source, queue):
+    """Return distances with queue, a RadixHeap or BucketQueue, leaving
+    stale entries in it and skipping them as heapq does.
+    """
+    distances = {source: 0}
+    queue.push(source, 0)
+    done = set()
+    while queue:
+        node, distance = queue.pop()
+        if node in done:
+            continue
+
+        done.add(node)
+        for target, weight in graph[node]:
+            through = distance + weight
+            if through < distances.get(target, through + 1):
+                distances[target] = through
+                queue.push(target, through)
+
+    return distances
+
+def monotone_trace(operations, span, size, seed = 0):
+    """Return an array of operations, where -1 is a pop and anything else
+    a push at that much above the last priority popped. Pushes and pops
+    alternate at random around a queue of size items.
+    """
+    rng = random.Random(seed)
+    trace = array('l')
+    held = 0
+    for _ in range(operations):
+        if held and rng.random() * 2 * size < held:
+            trace.append(-1)
+            held -= 1
+
+        else:
+            trace.append(rng.randrange(span))
+            held += 1
+
+    return trace
+
+def _run_trace_heapq(trace):
+    heap = []
+    last = 0
+    for delay in trace:
+        if delay < 0:
+            last = heapq.heappop(heap)
+
+        else:
+            heapq.heappush(heap, last + delay)
+
+def _run_trace(trace, queue):
+    last = 0
+    for delay in trace:
+        if delay < 0:
+            last = queue.pop()[1]
+
+        else:
+            queue.push(None, last + delay)
+
+def _reprioritise_heapq(pairs, changes):
+    """Apply changes to a heapq heap with the tombstone recipe of the heapq
+    documentation, then drain it. Return the peak heap size.
+    """
+    removed = object()
+    finder = {}
+    heap = []
+    for item, priority in pairs:
+        entry = [priority, item]
+        finder[item] = entry
+        heap.append(entry)
+
+    heapq.heapify(heap)
+    peak = len(heap)
+    for item, priority in changes:
+        finder.pop(item)[1] = removed
+        entry = [priority, item]
+        finder[item] = entry
+        heapq.heappush(heap, entry)
+        if len(heap) > peak:
+            peak = len(heap)
+
+    # Draining pops the stale entries as well as the live ones
+    while heap:
+        heapq.heappop(heap)
+
+    return peak
+
+def _reprioritise_indexed(pairs, changes):
+    """Apply changes to an IndexedHeap in place, then drain it."""
+    heap = heaps.IndexedHeap(pairs)
+    for item, priority in changes:
+        heap.update(item, priority)
+
+    while heap:
+        heap.pop()
+
+    return len(pairs)
+
+def run_indexed_benchmark(nodes = 100000, edges = 1000000, count = 100000,
+                          changes = 500000):
+    """Compare IndexedHeap with heapq and lazy deletion.
+    dijkstra finds shortest paths from one node of a random graph, and
+    reprioritise changes the priorities of random items of count, up or
+    down, and then drains the heap. The peak is the most entries the heap
+    held, stale ones included.
+    """
+    rng = random.Random(0)
+    graph = random_graph(nodes, edges)
+    pairs = [(item, rng.random()) for item in range(count)]
+    moves = [(rng.randrange(count), rng.random()) for _ in range(changes)]
+    expected, _ = _dijkstra_heapq(graph, 0)
+    rows = []
+    for name, dijkstra, reprioritise in (('heapq + tombstones',
+                                          _dijkstra_heapq,
+                                          _reprioritise_heapq,
+                                         ),
+                                         ('IndexedHeap',
+                                          _dijkstra_indexed,
+                                          _reprioritise_indexed,
+                                         ),
+                                        ):
+        found, peak = dijkstra(graph, 0)
+        if found != expected:
+            raise AssertionError('%s found different distances' % name)
+
+        rows.append([name,
+                     '%.3f' % best_time(lambda: dijkstra(graph, 0)),
+                     str(peak),
+                     '%.3f' % best_time(lambda: reprioritise(pairs, moves)),
+                     str(reprioritise(pairs, moves)),
+                    ])
+
+    report('Changing priorities (%d nodes and %d edges, %d changes to %d '
+           'items)' % (nodes, edges, changes, count),
+           ['heap', 'dijkstra s', 'peak', 'reprioritise s', 'peak'],
+           rows,
+          )
+
+def run_mergeable_benchmark(groups = 5000, size = 100, nodes = 100000,
+                            edges = 1000000):
+    """Compare PairingHeap and FibonacciHeap with heapq.
+    meld starts from groups heaps of size random integers and melds random
+    pairs, popping once after each, until one heap is left. heapq melds by
+    extending the larger list and heapifying it again. dijkstra finds
+    shortest paths in a random graph, lowering priorities through handles
+    where heapq leaves stale entries behind.
+    """
+    rng = random.Random(0)
+    items = [[rng.randrange(1 << 30) for _ in range(size)]
+             for _ in range(groups)]
+    graph = random_graph(nodes, edges)
+    expected, _ = _dijkstra_heapq(graph, 0)
+    rows = []
+    for name, meld, dijkstra in (('heapq',
+                                  _meld_heapq,
+                                  _dijkstra_heapq,
+                                 ),
+                                 ('PairingHeap',
+                                  lambda groups, rng:
+                                      _meld_heaps(groups, rng,
+                                                  heaps.PairingHeap),
+                                  lambda graph, source:
+                                      _dijkstra_handles(graph, source,
+                                                        heaps.PairingHeap),
+                                 ),
+                                 ('FibonacciHeap',
+                                  lambda groups, rng:
+                                      _meld_heaps(groups, rng,
+                                                  heaps.FibonacciHeap),
+                                  lambda graph, source:
+                                      _dijkstra_handles(graph, source,
+                                                        heaps.FibonacciHeap),
+                                 ),
+                                ):
+        found, peak = dijkstra(graph, 0)
+        if found != expected:
+            raise AssertionError('%s found different distances' % name)
+
+        rows.append([name,
+                     '%.3f' % best_time(lambda: meld(items,
+                                                     random.Random(1))),
+                     '%.3f' % best_time(lambda: dijkstra(graph, 0)),
+                     str(peak),
+                    ])
+
+    report('Mergeable heaps (%d heaps of %d; %d nodes and %d edges)' %
+           (groups, size, nodes, edges),
+           ['heap', 'meld s', 'dijkstra s', 'peak'],
+           rows,
+          )
+
+def run_monotone_benchmark(operations = 10000000, span = 1000, size = 10000,
+                           nodes = 100000, edges = 1000000):
+    """Compare RadixHeap and BucketQueue with heapq on monotone integers.
+    trace replays operations pushes and pops, each push at most span above
+    the last priority popped, around a queue of size items. dijkstra finds
+    shortest paths in a random graph with integer weights below 1000,
+    leaving stale entries behind in every queue.
+    """
+    trace = monotone_trace(operations, span, size)
+    graph = random_graph(nodes, edges)
+    expected, _ = _dijkstra_heapq(graph, 0)
+    rows = []
+    for name, run_trace, dijkstra in (('heapq',
+                                       _run_trace_heapq,
+                                       lambda: _dijkstra_heapq(graph, 0)[0],
+                                      ),
+                                      ('RadixHeap',
+                                       lambda trace:
+                                           _run_trace(trace,
+                                                      heaps.RadixHeap()),
+                                       lambda: _dijkstra_monotone(
+                                           graph, 0, heaps.RadixHeap()),
+                                      ),
+                                      ('BucketQueue',
+                                       lambda trace:
+                                           _run_trace(trace,
+                                                      heaps.BucketQueue(span)),
+                                       lambda: _dijkstra_monotone(
+                                           graph, 0, heaps.BucketQueue(1000)),
+                                      ),
+                                     ):
+        if dijkstra() != expected:
+            raise AssertionError('%s found different distances' % name)
+
+        rows.append([name,
+                     '%.0f' % (operations / best_time(lambda:
+                                                      run_trace(trace),
+                                                      repeat = 1)),
+                     '%.3f' % best_time(dijkstra),
+                    ])
+
+    report('Monotone integer priorities (%d operations; %d nodes and %d '
+           'edges)' % (operations, nodes, edges),
+           ['queue', 'trace ops/s', 'dijkstra s'],
+           rows,
+          )
+
+def _top_heapq(items, size):
+    heap = list(items[:size])
+    heapq.heapify(heap)
+    pushpop = heapq.heappushpop
+    for item in items[size:]:
+        pushpop(heap, item)
+
+    return sorted(heap)
+
+def _top_min_max(items, size):
+    heap = heaps.MinMaxHeap(maxlen = size)
+    push = heap.push
+    for item in items:
+        push(item)
+
+    return sorted(heap.heap)
+
+def _window_sorted(items, choices, size):
+    window = []
+    insort = bisect.insort
+    for item, choice in zip(items, choices):
+        insort(window, item)
+        if len(window) > size:
+            if choice:
+                window.pop()
+
+            else:
+                window.pop(0)
+
+    return window
+
+def _window_min_max(items, choices, size):
+    heap = heaps.MinMaxHeap()
+    for item, choice in zip(items, choices):
+        heap.push(item)
+        if len(heap) > size:
+            if choice:
+                heap.pop_max()
+
+            else:
+                heap.pop_min()
+
+    return sorted(heap.heap)
+
+def run_min_max_benchmark(count = 1000000, sizes = (10, 1000, 100000)):
+    """Compare MinMaxHeap with heapq and a sorted list on windows of size
+    items over a stream of count random items. top keeps the size greatest,
+    against heappushpop on a heap of that size. window keeps size items,
+    evicting from a randomly chosen end once full, against bisect.insort
+    into a sorted list.
+    """
+    rng = random.Random(0)
+    items = [rng.random() for _ in range(count)]
+    choices = [rng.random() < 0.5 for _ in range(count)]
+    rows = []
+    for size in sizes:
+        row = [size]
+        for top in (_top_heapq, _top_min_max):
+            if top(items, size) != sorted(items)[-size:]:
+                raise AssertionError('%s kept different items'
+                                     % top.__name__)
+
+            row.append('%.0f' % (count / best_time(lambda:
+                                                   top(items, size),
+                                                   repeat = 1)))
+
+        expected = _window_sorted(items, choices, size)
+        for window in (_window_sorted, _window_min_max):
+            if window(items, choices, size) != expected:
+                raise AssertionError('%s kept different items'
+                                     % window.__name__)
+
+            row.append('%.0f' % (count / best_time(lambda:
+                                                   window(items, choices,
+                                                          size),
+                                                   repeat = 1)))
+
+        rows.append(row)
+
+    report('Bounded windows over a stream of %d items (items/s)' % count,
+           ['size', 'top heapq', 'top MinMaxHeap', 'window sorted list',
+            'window MinMaxHeap'],
+           rows,
+          )
+
+if __name__ == '__main__':
+    run_benchmark()
+    run_indexed_benchmark()
+    run_mergeable_benchmark()
+    run_monotone_benchmark()
+    run_min_max_benchmark()
@@ -0,0 +1,242 @@
+﻿#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+# structs/benchmarks/bench_nodes.py
+#
+# Copyright (c) 2011 David J Felix
+#
+# MIT/X11 License
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import sys
+
+from structs import nodes
+from structs.benchmarks.timing import best_time, bytes_per_item, report
+
+def _chain(node_class, count):
+    """Build a right-linked chain of count nodes and return its head."""
+    head = None
+    for i in range(count):
+        head = node_class(i, head)
+
+    return head
+
+def _walk(head):
+    """Follow right links from head to the end of the chain."""
+    node = head
+    while node is not None:
+        node = node.right
+
+def _relink(head):
+    """Rewrite every right link of a chain with the link it already has."""
+    node = head
+    while node.right is not None:
+        node.right = node.right
+        node = node.right
+
+def _fresh(container_count, container_type):
+    """Return a factory building nodes with their own empty containers.
+    The plain multi nodes share a single default container between instances,
+    so both variants are given fresh containers to keep the comparison fair.
+    """
+    def factory(node_class):
+        return lambda i: node_class(i, *[container_type()
+                                         for each in range(container_count)])
+
+    return factory
+
+def _plain(node_class):
+    return node_class
+
+def _arena_chain(count):
+    """Build a right-linked chain of count arena nodes and return both."""
+    arena = nodes.NodeArena()
+    handles = arena.allocate_many(range(count))
+    right = arena.right
+    for i in range(1, count):
+        right[handles[i]] = handles[i - 1]
+
+    return arena, handles[-1]
+
+def _arena_walk(arena, head):
+    """Follow right handles from head to the end of the chain."""
+    right = arena.right
+    handle = head
+    while handle != arena.NULL:
+        handle = right[handle]
+
+PAIRS = [('Node', nodes.Node, nodes.FastNode, _plain),
+         ('LinkedNode', nodes.LinkedNode, nodes.FastLinkedNode, _plain),
+         ('BinaryNode', nodes.BinaryNode, nodes.FastBinaryNode, _plain),
+         ('BiBinaryNode', nodes.BiBinaryNode, nodes.FastBiBinaryNode, _plain),
+         ('MultiNode',
+          nodes.MultiNode,
+          nodes.FastMultiNode,
+          _fresh(1, set),
+         ),
+         ('BiMultiNode',
+          nodes.BiMultiNode,
+          nodes.FastBiMultiNode,
+          _fresh(2, set),
+         ),
+         ('OrderedMultiNode',
+          nodes.OrderedMultiNode,
+          nodes.FastOrderedMultiNode,
+          _fresh(1, list),
+         ),
+         ('BiOrderedMultiNode',
+          nodes.BiOrderedMultiNode,
+          nodes.FastBiOrderedMultiNode,
+          _fresh(2, list),
+         ),
+        ]
+
+def run_benchmark(count = 200000):
+    """Compare memory and throughput of the node classes and their Fast forms.
+    Memory is the average number of bytes allocated per node holding an int.
+    Throughput is measured by building, walking and relinking a chain of
+    linked nodes, which exercises __init__ and the right getter and setter.
+    """
+    rows = []
+    for name, node_class, fast_class, factory in PAIRS:
+        size = bytes_per_item(factory(node_class), count)
+        fast_size = bytes_per_item(factory(fast_class), count)
+        rows.append([name,
+                     '%.1f' % size,
+                     '%.1f' % fast_size,
+                     '%.2fx' % (size / fast_size),
+                    ])
+
+    report('Bytes per node (%d nodes)' % count,
+           ['class', 'plain', 'fast', 'saving'],
+           rows,
+          )
+
+    rows = []
+    for name, node_class, fast_class, factory in PAIRS[1:4]:
+        results = []
+        for each_class in (node_class, fast_class):
+            head = _chain(each_class, count)
+            results.append((best_time(lambda: _chain(each_class, count)),
+                            best_time(lambda: _walk(head)),
+                            best_time(lambda: _relink(head)),
+                           ))
+
+        for label, plain, fast in zip(('build', 'walk', 'relink'),
+                                      results[0],
+                                      results[1],
+                                     ):
+            rows.append([name + ' ' + label,
+                         '%.0f' % (count / plain),
+                         '%.0f' % (count / fast),
+                         '%.2fx' % (plain / fast),
+                        ])
+
+    report('Nodes per second (%d nodes)' % count,
+           ['operation', 'plain', 'fast', 'speedup'],
+           rows,
+          )
+
+def run_arena_benchmark(count = 200000):
+    """Compare a NodeArena against BiBinaryNode and FastBiBinaryNode.
+    Memory for the arena is its total size divided by its node count, which
+    includes the data since it is stored inline. Nodes of the other classes
+    are charged for their int data as well.
+    """
+    arena, head = _arena_chain(count)
+    fast_head = _chain(nodes.FastBiBinaryNode, count)
+    plain_head = _chain(nodes.BiBinaryNode, count)
+    rows = [['BiBinaryNode',
+             '%.1f' % bytes_per_item(nodes.BiBinaryNode, count),
+             '%.0f' % (count / best_time(lambda: _chain(nodes.BiBinaryNode,
+                                                         count))),
+             '%.0f' % (count / best_time(lambda: _walk(plain_head))),
+            ],
+            ['FastBiBinaryNode',
+             '%.1f' % bytes_per_item(nodes.FastBiBinaryNode, count),
+             '%.0f' % (count / best_time(lambda: _chain(nodes.FastBiBinaryNode,
+                                                         count))),
+             '%.0f' % (count / best_time(lambda: _walk(fast_head))),
+            ],
+            ['NodeArena',
+             '%.1f' % (sys.getsizeof(arena) / len(arena)),
+             '%.0f' % (count / best_time(lambda: _arena_chain(count))),
+             '%.0f' % (count / best_time(lambda: _arena_walk(arena, head))),
+            ],
+           ]
+    report('NodeArena against node objects (%d nodes)' % count,
+           ['storage', 'bytes/node', 'build/s', 'walk/s'],
+           rows,
+          )
+
+def _isinstance_loop(iterable):
+    """The per-item check that Node.are_nodes used before its type cache."""
+    for each in iterable:
+        if not isinstance(each, nodes.Node):
+            return False
+
+    return True
+
+def run_children_benchmark(count = 100000, rebuilds = 20):
+    """Compare ways of building and rebuilding large sets of children.
+    The children of one MultiNode are replaced rebuilds times, then grown from
+    empty in batches of 1000 nodes through add_children.
+    """
+    children = [nodes.Node(i) for i in range(count)]
+    child_set = set(children)
+    node = nodes.MultiNode()
+
+    def setter():
+        for each in range(rebuilds):
+            node.children = set(child_set)
+
+    def batches(trusted):
+        node.children = set()
+        for i in range(0, count, 1000):
+            node.add_children(children[i:i + 1000], trusted)
+
+    def replace_batches():
+        grown = set()
+        for i in range(0, count, 1000):
+            grown.update(children[i:i + 1000])
+            node.children = set(grown)
+
+    rows = [['isinstance loop',
+             '%.4f' % best_time(lambda: [_isinstance_loop(child_set)
+                                         for each in range(rebuilds)]),
+            ],
+            ['are_nodes',
+             '%.4f' % best_time(lambda: [nodes.Node.are_nodes(child_set)
+                                         for each in range(rebuilds)]),
+            ],
+            ['children setter', '%.4f' % best_time(setter)],
+            ['grow by replacing', '%.4f' % best_time(replace_batches)],
+            ['grow by add_children', '%.4f' % best_time(lambda: batches(False))],
+            ['grow trusted', '%.4f' % best_time(lambda: batches(True))],
+           ]
+    report('Seconds for %d children (%d rebuilds)' % (count, rebuilds),
+           ['operation', 'seconds'],
+           rows,
+          )
+
+if __name__ == '__main__':
+    run_benchmark()
+    run_arena_benchmark()
+    run_children_benchmark()
@@ -0,0 +1,99 @@
+﻿#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+# structs/benchmarks/timing.py
+#
+# Copyright (c) 2011 David J Felix
+#
+# MIT/X11 License
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import gc
+import time
+import tracemalloc
+
+def best_time(func, repeat = 3):
+    """Return the best wall clock time, in seconds, of calling func repeat times.
+    The garbage collector is disabled while func runs so that collections
+    triggered by earlier benchmarks do not pollute the measurement.
+    """
+    best = None
+    for each in range(repeat):
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best
+
+def bytes_per_item(factory, count):
+    """Return the average number of bytes allocated per call of factory.
+    factory is called count times with the call number as its only argument and
+    every result is kept alive until the measurement finishes.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        keep = [factory(i) for i in range(count)]
+        after = tracemalloc.get_traced_memory()[0]
+
+    finally:
+        tracemalloc.stop()
+
+    # Do not charge the list holding the results to the items themselves
+    overhead = keep.__sizeof__()
+    del keep
+    return (after - before - overhead) / count
+
+def bytes_allocated(func):
+    """Return the result of func and the number of bytes it left allocated."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = func()
+        after = tracemalloc.get_traced_memory()[0]
+
+    finally:
+        tracemalloc.stop()
+
+    return result, after - before
+
+def report(title, header, rows):
+    """Print a simple fixed width table of benchmark results."""
+    print(title)
+    print('=' * len(title))
+    widths = [max(len(str(row[i])) for row in [header] + rows)
+              for i in range(len(header))]
+    for row in [header] + rows:
+        print('  '.join(str(cell).rjust(width)
+                        for cell, width in zip(row, widths)))
+
+    print()
@@ -25,6 +25,8 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+from array import array
+
 class Node(object):
     """A container class which is used for creating complex data structures.
     Node is not inteded for any specific purpose but to be inherited when
@@ -49,6 +51,10 @@ class Node(object):
             ensure that they link to containers not directly to items.
     """
 
+    # Types already known to inherit Node, shared by every subclass so that
+    # are_nodes only runs issubclass once per type rather than once per item
+    _node_types = set()
+
     def __init__(self, data = None):
         self.node_err = 'linked nodes must be a ' + str(self.__class__)
         self._data = data
@@ -73,10 +79,15 @@ class Node(object):
         contains entirely objects which inherited the Node class. This method is
         useful for ensuring that structures, (no matter how complex) that derive
         from the Node class, can easily ensure that they link to containers not
-        directly to items.
+        directly to items. The types of the items are collected at C speed and
+        only types that have not been seen before are checked in Python.
         """
-        for each in iterable:
-            if not isinstance(each, Node):
+        node_types = Node._node_types
+        for each_type in set(map(type, iterable)) - node_types:
+            if issubclass(each_type, Node):
+                node_types.add(each_type)
+
+            else:
                 return False
 
         return True
@@ -116,7 +127,7 @@ class LinkedNode(Node):
 
     def __init__(self, data = None, right = None):
         super().__init__(data)
-        if right and isinstance(right, self.__class__):
+        if right is None or isinstance(right, self.__class__):
             self._right = right
 
         else:
@@ -182,7 +193,7 @@ class BinaryNode(LinkedNode):
 
     def __init__(self, data = None, right = None, left = None):
         super().__init__(data, right)
-        if left and isinstance(right, self.__class__):
+        if left is None or isinstance(left, self.__class__):
             self._left = left
 
         else:
@@ -206,7 +217,7 @@ class BinaryNode(LinkedNode):
         self._left = None
 
 # Alias BinaryNode by another familiar name, DoublyLinkedNode
-DoublyLinkedNode = Binary Node
+DoublyLinkedNode = BinaryNode
 
 class BiBinaryNode(BinaryNode):
     """A bidirectional container class with two children.
@@ -258,8 +269,8 @@ class BiBinaryNode(BinaryNode):
     """
 
     def __init__(self, data = None, right = None, left = None, parent = None):
-        super().__init__(data, left, right)
-        if parent and isinstance(parent, self.__class__):
+        super().__init__(data, right, left)
+        if parent is None or isinstance(parent, self.__class__):
             self._parent = parent
 
         else:
@@ -315,13 +326,20 @@ class MultiNode(Node):
             class. This method is useful for ensuring that structures, (no
             matter how complex) that derive from the Node class, can easily
             ensure that they link to containers not directly to items.
+
+        add_children:
+            add the nodes of an iterable to the children set, validating only
+            the added nodes unless trusted is True.
     """
 
     set_err = 'must be of type "set"'
-    def __init__(self, data = None, children = set()):
+    def __init__(self, data = None, children = None, trusted = False):
         super().__init__(data)
+        if children is None:
+            children = set()
+
         if isinstance(children, set):
-            if self.are_nodes(children):
+            if trusted or self.are_nodes(children):
                 self._children = children
 
             else:
@@ -350,6 +368,20 @@ class MultiNode(Node):
     def children(self):
         self._children = set()
 
+    def add_children(self, iterable, trusted = False):
+        """Add every node in the iterable to the children set.
+        Only the added nodes are validated, so growing a large set of children
+        does not recheck the children it already has. Validation can be
+        skipped entirely with trusted = True when the caller knows every item
+        is a node.
+        """
+        if not trusted:
+            iterable = tuple(iterable)
+            if not self.are_nodes(iterable):
+                raise TypeError(self.node_err)
+
+        self._children.update(iterable)
+
 class BiMultiNode(MultiNode):
     """A container class with any number of unordered children and parents.
     BiMultiNode has a set containing its children and a set containing its
@@ -389,12 +421,28 @@ class BiMultiNode(MultiNode):
             class. This method is useful for ensuring that structures, (no
             matter how complex) that derive from the Node class, can easily
             ensure that they link to containers not directly to items.
+
+        add_children:
+            add the nodes of an iterable to the children set, validating only
+            the added nodes unless trusted is True.
+
+        add_parents:
+            add the nodes of an iterable to the parents set, validating only
+            the added nodes unless trusted is True.
     """
 
-    def __init__(self, data = None, children = set(), parents = set()):
-        super().__init__(data, children)
+    def __init__(self,
+                 data = None,
+                 children = None,
+                 parents = None,
+                 trusted = False,
+                ):
+        super().__init__(data, children, trusted)
+        if parents is None:
+            parents = set()
+
         if isinstance(parents, set):
-            if self.are_nodes(parents):
+            if trusted or self.are_nodes(parents):
                 self._parents = parents
 
             else:
@@ -423,6 +471,18 @@ class BiMultiNode(MultiNode):
     def parents(self):
         self._parents = set()
 
+    def add_parents(self, iterable, trusted = False):
+        """Add every node in the iterable to the parents set.
+        Only the added nodes are validated, and validation can be skipped with
+        trusted = True, as with add_children.
+        """
+        if not trusted:
+            iterable = tuple(iterable)
+            if not self.are_nodes(iterable):
+                raise TypeError(self.node_err)
+
+        self._parents.update(iterable)
+
 class OrderedMultiNode(Node):
     """A container class with any number of ordered children.
     OrderedMultiNode has a list containing its children and can be used to
@@ -453,13 +513,20 @@ class OrderedMultiNode(Node):
             class. This method is useful for ensuring that structures, (no
             matter how complex) that derive from the Node class, can easily
             ensure that they link to containers not directly to items.
+
+        extend_children:
+            append the nodes of an iterable to the children list, validating
+            only the appended nodes unless trusted is True.
     """
 
     list_err = 'must be of type "list"'
-    def __init__(self, data = None, children = []):
+    def __init__(self, data = None, children = None, trusted = False):
         super().__init__(data)
+        if children is None:
+            children = []
+
         if isinstance(children, list):
-            if self.are_nodes(children):
+            if trusted or self.are_nodes(children):
                 self._children = children
 
             else:
@@ -489,6 +556,20 @@ class OrderedMultiNode(Node):
     def children(self):
         self._children = []
 
+    def extend_children(self, iterable, trusted = False):
+        """Append every node in the iterable to the end of the children list.
+        Only the appended nodes are validated, so growing a long list of
+        children does not recheck the children it already has. Validation can
+        be skipped entirely with trusted = True when the caller knows every
+        item is a node.
+        """
+        if not trusted:
+            iterable = tuple(iterable)
+            if not self.are_nodes(iterable):
+                raise TypeError(self.node_err)
+
+        self._children.extend(iterable)
+
 class BiOrderedMultiNode(OrderedMultiNode):
     """A bidirectional container class with any number of ordered children.
     BiOrderedMultiNode has a list containing its children and a list containing
@@ -528,12 +609,28 @@ class BiOrderedMultiNode(OrderedMultiNode):
             class. This method is useful for ensuring that structures, (no
             matter how complex) that derive from the Node class, can easily
             ensure that they link to containers not directly to items.
+
+        extend_children:
+            append the nodes of an iterable to the children list, validating
+            only the appended nodes unless trusted is True.
+
+        extend_parents:
+            append the nodes of an iterable to the parents list, validating
+            only the appended nodes unless trusted is True.
     """
 
-    def __init__(self, data = None, children = [], parents = []):
-        super().__init__(data, children)
+    def __init__(self,
+                 data = None,
+                 children = None,
+                 parents = None,
+                 trusted = False,
+                ):
+        super().__init__(data, children, trusted)
+        if parents is None:
+            parents = []
+
         if isinstance(parents, list):
-            if self.are_nodes(parents):
+            if trusted or self.are_nodes(parents):
                 self._parents = parents
 
             else:
@@ -563,6 +660,495 @@ class BiOrderedMultiNode(OrderedMultiNode):
     def parents(self):
         self._parents = []
 
+    def extend_parents(self, iterable, trusted = False):
+        """Append every node in the iterable to the end of the parents list.
+        Only the appended nodes are validated, and validation can be skipped
+        with trusted = True, as with extend_children.
+        """
+        if not trusted:
+            iterable = tuple(iterable)
+            if not self.are_nodes(iterable):
+                raise TypeError(self.node_err)
+
+        self._parents.extend(iterable)
+
+class FastNode(object):
+    """A slotted, validation-free counterpart of Node.
+    FastNode is intended for structures that create very large numbers of
+    nodes and manage their own links. It has no per-instance __dict__, does not
+    build an error string and exposes its attributes as plain slots instead of
+    validating properties, so it costs less memory and fewer function calls
+    per node. The price is that nothing stops a user from linking a FastNode to
+    an item that is not a node; structures built on it must keep their links
+    consistent themselves. Deleting an attribute leaves its slot unset, so set
+    it to None instead when a link should be cleared.
+
+    Attributes:
+        data:
+            where data is stored.
+    """
+
+    __slots__ = ('data',)
+
+    def __init__(self, data = None):
+        self.data = data
+
+class FastLinkedNode(FastNode):
+    """A slotted, validation-free counterpart of LinkedNode.
+
+    Attributes:
+        data:
+            where data is stored.
+
+        right:
+            the right node that is linked.
+    """
+
+    __slots__ = ('right',)
+
+    def __init__(self, data = None, right = None):
+        self.data = data
+        self.right = right
+
+class FastBinaryNode(FastLinkedNode):
+    """A slotted, validation-free counterpart of BinaryNode.
+
+    Attributes:
+        data:
+            where data is stored.
+
+        right:
+            the right node that is linked.
+
+        left:
+            the left node that is linked.
+    """
+
+    __slots__ = ('left',)
+
+    def __init__(self, data = None, right = None, left = None):
+        self.data = data
+        self.right = right
+        self.left = left
+
+# Alias FastBinaryNode by another familiar name, FastDoublyLinkedNode
+FastDoublyLinkedNode = FastBinaryNode
+
+class FastBiBinaryNode(FastBinaryNode):
+    """A slotted, validation-free counterpart of BiBinaryNode.
+
+    Attributes:
+        data:
+            where data is stored.
+
+        right:
+            the right node that is linked.
+
+        left:
+            the left node that is linked.
+
+        parent:
+            the parent node that is linked.
+    """
+
+    __slots__ = ('parent',)
+
+    def __init__(self, data = None, right = None, left = None, parent = None):
+        self.data = data
+        self.right = right
+        self.left = left
+        self.parent = parent
+
+# Alias FastBiBinaryNode by another familiar name, FastTrinaryNode
+FastTrinaryNode = FastBiBinaryNode
+
+class FastSizedBinaryNode(FastBiBinaryNode):
+    """A FastBiBinaryNode which also counts the nodes in its subtree.
+    The size attribute is the number of nodes in the subtree rooted at this
+    node, including itself. Trees built from FastSizedBinaryNode keep it up to
+    date so that they can answer size and order statistic queries without
+    walking whole subtrees.
+
+    Attributes:
+        data:
+            where data is stored.
+
+        right:
+            the right node that is linked.
+
+        left:
+            the left node that is linked.
+
+        parent:
+            the parent node that is linked.
+
+        size:
+            the number of nodes in the subtree rooted at this node.
+    """
+
+    __slots__ = ('size',)
+
+    def __init__(self,
+                 data = None,
+                 right = None,
+                 left = None,
+                 parent = None,
+                 size = 1,
+                ):
+        self.data = data
+        self.right = right
+        self.left = left
+        self.parent = parent
+        self.size = size
+
+class FastMultiNode(FastNode):
+    """A slotted, validation-free counterpart of MultiNode.
+    Unlike MultiNode, a FastMultiNode created without children gets its own
+    empty set rather than sharing a default one.
+
+    Attributes:
+        data:
+            where data is stored.
+
+        children:
+            the set of linked children.
+    """
+
+    __slots__ = ('children',)
+
+    def __init__(self, data = None, children = None):
+        self.data = data
+        self.children = set() if children is None else children
+
+class FastBiMultiNode(FastMultiNode):
+    """A slotted, validation-free counterpart of BiMultiNode.
+
+    Attributes:
+        data:
+            where data is stored.
+
+        children:
+            the set of linked children.
+
+        parents:
+            the set of linked parents.
+    """
+
+    __slots__ = ('parents',)
+
+    def __init__(self, data = None, children = None, parents = None):
+        self.data = data
+        self.children = set() if children is None else children
+        self.parents = set() if parents is None else parents
+
+class FastOrderedMultiNode(FastNode):
+    """A slotted, validation-free counterpart of OrderedMultiNode.
+    Unlike OrderedMultiNode, a FastOrderedMultiNode created without children
+    gets its own empty list rather than sharing a default one.
+
+    Attributes:
+        data:
+            where data is stored.
+
+        children:
+            the ordered list of linked children.
+    """
+
+    __slots__ = ('children',)
+
+    def __init__(self, data = None, children = None):
+        self.data = data
+        self.children = [] if children is None else children
+
+class FastBiOrderedMultiNode(FastOrderedMultiNode):
+    """A slotted, validation-free counterpart of BiOrderedMultiNode.
+
+    Attributes:
+        data:
+            where data is stored.
+
+        children:
+            the ordered list of linked children.
+
+        parents:
+            the ordered list of linked parents.
+    """
+
+    __slots__ = ('parents',)
+
+    def __init__(self, data = None, children = None, parents = None):
+        self.data = data
+        self.children = [] if children is None else children
+        self.parents = [] if parents is None else parents
+
+class NodeArena(object):
+    """A store for many linked nodes kept in parallel typed arrays.
+    NodeArena replaces one Python object per node with one row across four
+    array('q') columns, so a node costs a few dozen bytes instead of a few
+    hundred. Nodes are addressed by integer handles, which index the columns,
+    and a missing link is stored as NULL. Handles of freed nodes are kept on a
+    free-list and reused by later allocations. Data is stored as a signed 64
+    bit integer, which is enough for keys, counters or indexes into another
+    store.
+
+    Attributes:
+        data:
+            the array('q') column holding each node's data.
+
+        right:
+            the array('q') column holding each node's right handle.
+
+        left:
+            the array('q') column holding each node's left handle.
+
+        parent:
+            the array('q') column holding each node's parent handle.
+
+        The columns are public so that bulk traversals can follow links
+        without creating handle objects, but code should only write to them
+        for handles that are currently allocated.
+
+    Methods:
+        allocate:
+            create one node and return its handle.
+
+        allocate_many:
+            create a node for each item of an iterable and return the handles.
+
+        free:
+            release one node so that its handle can be reused.
+
+        free_many:
+            release a node for each handle of an iterable.
+
+        node:
+            return an ArenaNode wrapping a handle, for code which expects the
+            data/right/left/parent properties of the node classes.
+    """
+
+    NULL = -1
+    handle_err = 'handle is not allocated in this arena'
+
+    def __init__(self):
+        self.data = array('q')
+        self.right = array('q')
+        self.left = array('q')
+        self.parent = array('q')
+        self._free = array('q')
+        self._allocated = bytearray()
+
+    def __contains__(self, handle):
+        return (0 <= handle < len(self._allocated) and
+                self._allocated[handle] == 1)
+
+    def __getitem__(self, handle):
+        return self.node(handle)
+
+    def __len__(self):
+        return len(self.data) - len(self._free)
+
+    def __sizeof__(self):
+        return (object.__sizeof__(self) +
+                self.data.__sizeof__() +
+                self.right.__sizeof__() +
+                self.left.__sizeof__() +
+                self.parent.__sizeof__() +
+                self._free.__sizeof__() +
+                self._allocated.__sizeof__())
+
+    def allocate(self, data = 0, right = NULL, left = NULL, parent = NULL):
+        """Create a node and return its handle, reusing a freed slot if any."""
+        # Convert every value first, so one out of range leaves no trace.
+        data, right, left, parent = array('q', (data, right, left, parent))
+        if self._free:
+            handle = self._free.pop()
+            self.data[handle] = data
+            self.right[handle] = right
+            self.left[handle] = left
+            self.parent[handle] = parent
+            self._allocated[handle] = 1
+
+        else:
+            handle = len(self.data)
+            self.data.append(data)
+            self.right.append(right)
+            self.left.append(left)
+            self.parent.append(parent)
+            self._allocated.append(1)
+
+        return handle
+
+    def allocate_many(self, iterable):
+        """Create an unlinked node for each item and return a list of handles.
+        Freed slots are filled first. The remaining items are appended to the
+        columns in bulk, so no per-node Python work is done for them beyond
+        reading the iterable.
+        """
+        handles = []
+        items = iter(iterable)
+        free = self._free
+        while free:
+            for item in items:
+                handles.append(self.allocate(item))
+                break
+
+            else:
+                return handles
+
+        start = len(self.data)
+        try:
+            self.data.extend(items)
+
+        except BaseException:
+            # Leave the columns the same length, as they were before.
+            del self.data[start:]
+            raise
+
+        count = len(self.data) - start
+        links = array('q', [self.NULL]) * count
+        self.right.extend(links)
+        self.left.extend(links)
+        self.parent.extend(links)
+        self._allocated.extend(b'\x01' * count)
+        handles.extend(range(start, start + count))
+        return handles
+
+    def free(self, handle):
+        """Release a node so that its handle can be reused.
+        Links pointing at the released node are not cleared, so they should be
+        unlinked by the caller first.
+        """
+        if handle not in self:
+            raise ValueError(self.handle_err)
+
+        self._allocated[handle] = 0
+        self._free.append(handle)
+
+    def free_many(self, iterable):
+        """Release a node for each handle in the iterable."""
+        for handle in iterable:
+            self.free(handle)
+
+    def node(self, handle):
+        """Return an ArenaNode wrapping an allocated handle."""
+        if handle not in self:
+            raise ValueError(self.handle_err)
+
+        return ArenaNode(self, handle)
+
+class ArenaNode(object):
+    """A lightweight view of one node stored in a NodeArena.
+    ArenaNode exposes the same data, right, left and parent properties as
+    BiBinaryNode, reading and writing the arena's columns. Links are returned
+    as ArenaNode objects, or None when they are missing. Two ArenaNode objects
+    are equal when they view the same handle of the same arena.
+
+    Attributes:
+        arena:
+            the NodeArena which stores the node.
+
+        handle:
+            the integer handle of the node in the arena.
+
+    Properties:
+        data:
+            how code and users interact with the arena's data column.
+
+        right:
+            how code and users interact with the arena's right column.
+
+        left:
+            how code and users interact with the arena's left column.
+
+        parent:
+            how code and users interact with the arena's parent column.
+    """
+
+    __slots__ = ('arena', 'handle')
+    node_err = 'linked nodes must be an ArenaNode of the same arena'
+
+    def __init__(self, arena, handle):
+        self.arena = arena
+        self.handle = handle
+
+    def __eq__(self, other):
+        return (isinstance(other, ArenaNode) and
+                self.arena is other.arena and
+                self.handle == other.handle)
+
+    def __hash__(self):
+        return hash((id(self.arena), self.handle))
+
+    def __repr__(self):
+        return 'ArenaNode(' + str(self.handle) + ')'
+
+    def _wrap(self, handle):
+        if handle == NodeArena.NULL:
+            return None
+
+        return ArenaNode(self.arena, handle)
+
+    def _unwrap(self, value):
+        if value is None:
+            return NodeArena.NULL
+
+        if isinstance(value, ArenaNode) and value.arena is self.arena:
+            return value.handle
+
+        raise TypeError(self.node_err)
+
+    @property
+    def data(self):
+        """The data property stores what is contained in the node"""
+        return self.arena.data[self.handle]
+
+    @data.setter
+    def data(self, value):
+        self.arena.data[self.handle] = value
+
+    @data.deleter
+    def data(self):
+        self.arena.data[self.handle] = 0
+
+    @property
+    def right(self):
+        """The right property stores the right node that is linked"""
+        return self._wrap(self.arena.right[self.handle])
+
+    @right.setter
+    def right(self, value):
+        self.arena.right[self.handle] = self._unwrap(value)
+
+    @right.deleter
+    def right(self):
+        self.arena.right[self.handle] = NodeArena.NULL
+
+    @property
+    def left(self):
+        """The left property stores the left node that is linked"""
+        return self._wrap(self.arena.left[self.handle])
+
+    @left.setter
+    def left(self, value):
+        self.arena.left[self.handle] = self._unwrap(value)
+
+    @left.deleter
+    def left(self):
+        self.arena.left[self.handle] = NodeArena.NULL
+
+    @property
+    def parent(self):
+        """The parent property stores the parent node that is linked"""
+        return self._wrap(self.arena.parent[self.handle])
+
+    @parent.setter
+    def parent(self, value):
+        self.arena.parent[self.handle] = self._unwrap(value)
+
+    @parent.deleter
+    def parent(self):
+        self.arena.parent[self.handle] = NodeArena.NULL
+
 if __name__ == '__main__':
     from structs.tests import test_nodes
     test_nodes.run_test()
@@ -1265,6 +1265,345 @@ class BiOrderedMultiNodeTestCase(OrderedMultiNodeTestCase):
     def test_parents_set_improp(self):
         pass
 
+class FastNodeTestCase(unittest.TestCase):
+    """A test case for the FastNode class and its slotted subclasses.
+    FastNode trades validation for memory and speed, so these tests check that
+    the slotted classes store what they are given, carry no __dict__ and accept
+    links without checking them. Test cases for the other Fast classes inherit
+    this case and replace node_class.
+    """
+
+    node_class = nodes.FastNode
+    link_names = ()
+
+    def setUp(self):
+        self.test_obj_empty = self.node_class()
+        self.test_obj_full = self.node_class(1)
+
+    def test_data(self):
+        """Test that data is a plain attribute initialized by __init__."""
+        self.assertIsNone(self.test_obj_empty.data,
+                          'data should be initialized as None',
+                         )
+        self.assertEqual(self.test_obj_full.data,
+                         1,
+                         'data should be initialized as 1',
+                        )
+        self.test_obj_empty.data = 2
+        self.assertEqual(self.test_obj_empty.data,
+                         2,
+                         'data should return a 2 after being set to 2',
+                        )
+
+    def test_no_dict(self):
+        """Test that instances are slotted and reject unknown attributes."""
+        self.assertFalse(hasattr(self.test_obj_empty, '__dict__'),
+                         'Fast nodes should not carry a per-instance __dict__',
+                        )
+        with self.assertRaises(AttributeError):
+            self.test_obj_empty.node_err = 'no room for this'
+
+    def test_links_unvalidated(self):
+        """Test that links are initialized and accept any value."""
+        for name in self.link_names:
+            self.assertIn(getattr(self.test_obj_empty, name),
+                          (None, set(), []),
+                          name + ' should be initialized empty',
+                         )
+            setattr(self.test_obj_empty, name, 1)
+            self.assertEqual(getattr(self.test_obj_empty, name),
+                             1,
+                             name + ' should not be validated when set',
+                            )
+
+    def tearDown(self):
+        del self.test_obj_empty
+        del self.test_obj_full
+
+class FastLinkedNodeTestCase(FastNodeTestCase):
+    """A test case for the FastLinkedNode class."""
+
+    node_class = nodes.FastLinkedNode
+    link_names = ('right',)
+
+    def test_right_init(self):
+        """Test that right is set positionally by __init__."""
+        node = self.node_class(2, self.test_obj_full)
+        self.assertIs(node.right,
+                      self.test_obj_full,
+                      'right should be initialized as test_obj_full',
+                     )
+
+class FastBinaryNodeTestCase(FastLinkedNodeTestCase):
+    """A test case for the FastBinaryNode class."""
+
+    node_class = nodes.FastBinaryNode
+    link_names = ('right', 'left')
+
+    def test_left_init(self):
+        """Test that left follows right in the __init__ signature."""
+        node = self.node_class(2, self.test_obj_empty, self.test_obj_full)
+        self.assertIs(node.right, self.test_obj_empty)
+        self.assertIs(node.left, self.test_obj_full)
+
+class FastBiBinaryNodeTestCase(FastBinaryNodeTestCase):
+    """A test case for the FastBiBinaryNode class."""
+
+    node_class = nodes.FastBiBinaryNode
+    link_names = ('right', 'left', 'parent')
+
+    def test_parent_init(self):
+        """Test that parent follows left in the __init__ signature."""
+        node = self.node_class(2, None, None, self.test_obj_full)
+        self.assertIs(node.parent, self.test_obj_full)
+        self.assertIs(nodes.FastTrinaryNode, nodes.FastBiBinaryNode)
+
+class FastSizedBinaryNodeTestCase(FastBiBinaryNodeTestCase):
+    """A test case for the FastSizedBinaryNode class."""
+
+    node_class = nodes.FastSizedBinaryNode
+
+    def test_size_init(self):
+        """Test that size defaults to one and follows parent in __init__."""
+        self.assertEqual(self.test_obj_empty.size, 1)
+        node = self.node_class(2, None, None, None, 3)
+        self.assertEqual(node.size, 3)
+
+class FastMultiNodeTestCase(FastNodeTestCase):
+    """A test case for the FastMultiNode class."""
+
+    node_class = nodes.FastMultiNode
+    link_names = ('children',)
+
+    def test_children_not_shared(self):
+        """Test that default children sets are not shared between nodes."""
+        self.test_obj_empty.children.add(self.test_obj_full)
+        self.assertEqual(self.test_obj_full.children,
+                         set(),
+                         'default children should not be shared',
+                        )
+
+class FastBiMultiNodeTestCase(FastMultiNodeTestCase):
+    """A test case for the FastBiMultiNode class."""
+
+    node_class = nodes.FastBiMultiNode
+    link_names = ('children', 'parents')
+
+class FastOrderedMultiNodeTestCase(FastNodeTestCase):
+    """A test case for the FastOrderedMultiNode class."""
+
+    node_class = nodes.FastOrderedMultiNode
+    link_names = ('children',)
+
+    def test_children_not_shared(self):
+        """Test that default children lists are not shared between nodes."""
+        self.test_obj_empty.children.append(self.test_obj_full)
+        self.assertEqual(self.test_obj_full.children,
+                         [],
+                         'default children should not be shared',
+                        )
+
+class FastBiOrderedMultiNodeTestCase(FastOrderedMultiNodeTestCase):
+    """A test case for the FastBiOrderedMultiNode class."""
+
+    node_class = nodes.FastBiOrderedMultiNode
+    link_names = ('children', 'parents')
+
+class NodeArenaTestCase(unittest.TestCase):
+    """A test case for the NodeArena class and its ArenaNode views.
+    These tests check allocation, reuse of freed handles through the free-list
+    and that ArenaNode links read and write the arena's columns.
+    """
+
+    def setUp(self):
+        self.arena = nodes.NodeArena()
+        self.handles = self.arena.allocate_many(range(10, 15))
+
+    def test_allocate_many(self):
+        """Test that bulk allocation stores data and leaves links empty."""
+        self.assertEqual(self.handles, [0, 1, 2, 3, 4])
+        self.assertEqual(len(self.arena), 5)
+        self.assertEqual(list(self.arena.data), [10, 11, 12, 13, 14])
+        for column in (self.arena.right, self.arena.left, self.arena.parent):
+            self.assertEqual(list(column), [self.arena.NULL] * 5)
+
+    def test_allocate_many_fail(self):
+        """Test that a failing iterable leaves the columns as they were."""
+        def items():
+            yield 1
+            yield 2
+            raise RuntimeError
+
+        with self.assertRaises(RuntimeError):
+            self.arena.allocate_many(items())
+
+        with self.assertRaises(TypeError):
+            self.arena.allocate_many([3, 'four'])
+
+        self.assertEqual(list(self.arena.data), [10, 11, 12, 13, 14])
+        handle = self.arena.allocate(9)
+        self.assertEqual(handle, 5)
+        self.assertEqual(self.arena.right[handle], self.arena.NULL)
+        self.assertEqual(len(self.arena), 6)
+
+    def test_allocate_fail(self):
+        """Test that a value out of range leaves the arena as it was, whether
+        the node would reuse a freed slot or be appended.
+        """
+        arena = self.arena
+        arena.free(2)
+        with self.assertRaises(OverflowError):
+            arena.allocate(2 ** 70)
+
+        self.assertEqual(len(arena), 4)
+        self.assertEqual(list(arena._free), [2])
+        self.assertEqual(arena.allocate(20), 2)
+        with self.assertRaises(OverflowError):
+            arena.allocate(21, left = 2 ** 70)
+
+        self.assertEqual(len(arena), 5)
+        self.assertEqual(list(arena._free), [])
+        for column in (arena.data, arena.right, arena.left, arena.parent,
+                       arena._allocated):
+            self.assertEqual(len(column), 5)
+
+        self.assertEqual(arena.allocate(22), 5)
+
+    def test_free_and_reuse(self):
+        """Test that freed handles are reused before the columns grow."""
+        self.arena.free_many([1, 3])
+        self.assertEqual(len(self.arena), 3)
+        self.assertNotIn(1, self.arena)
+        reused = self.arena.allocate_many([20, 21, 22])
+        self.assertEqual(sorted(reused[:2]), [1, 3])
+        self.assertEqual(reused[2], 5)
+        self.assertEqual(len(self.arena), 6)
+        self.assertEqual(self.arena.data[reused[0]], 20)
+        self.assertEqual(self.arena.allocate(30), 6)
+
+    def test_free_fail(self):
+        """Test that freeing a handle twice or out of range fails."""
+        self.arena.free(0)
+        with self.assertRaises(ValueError):
+            self.arena.free(0)
+
+        with self.assertRaises(ValueError):
+            self.arena.free(99)
+
+        with self.assertRaises(ValueError):
+            self.arena.node(0)
+
+    def test_arena_node_links(self):
+        """Test the data, right, left and parent properties of ArenaNode."""
+        root = self.arena[0]
+        root.right = self.arena[1]
+        root.left = self.arena[2]
+        self.arena[1].parent = root
+        self.assertEqual(root.right, self.arena[1])
+        self.assertEqual(root.right.data, 11)
+        self.assertEqual(root.left.handle, 2)
+        self.assertEqual(self.arena[1].parent, root)
+        self.assertIsNone(root.parent)
+        self.assertEqual(self.arena.right[0], 1)
+        root.data = 7
+        self.assertEqual(self.arena.data[0], 7)
+        del root.right
+        self.assertIsNone(root.right)
+
+    def test_arena_node_link_fail(self):
+        """Test that links must be ArenaNodes of the same arena."""
+        other = nodes.NodeArena()
+        other.allocate()
+        with self.assertRaises(TypeError):
+            self.arena[0].right = 1
+
+        with self.assertRaises(TypeError):
+            self.arena[0].right = other[0]
+
+    def tearDown(self):
+        del self.arena
+        del self.handles
+
+class BulkChildrenTestCase(unittest.TestCase):
+    """A test case for bulk child and parent assignment on the multi nodes.
+    These tests check that add_children, add_parents, extend_children and
+    extend_parents validate only what they add, that trusted skips validation
+    and that nodes no longer share their default containers.
+    """
+
+    def setUp(self):
+        self.leaves = [nodes.Node(i) for i in range(3)]
+
+    def test_are_nodes_cached_types(self):
+        """Test are_nodes with subclasses, generators and repeated calls."""
+        self.assertTrue(nodes.Node.are_nodes(self.leaves))
+        self.assertTrue(nodes.Node.are_nodes(nodes.LinkedNode()
+                                             for i in range(3)))
+        self.assertTrue(nodes.Node.are_nodes([]))
+        self.assertFalse(nodes.Node.are_nodes(self.leaves + [1]))
+        self.assertFalse(nodes.Node.are_nodes(self.leaves + [1]))
+        self.assertFalse(nodes.Node.are_nodes([nodes.FastNode()]))
+
+    def test_add_children(self):
+        """Test that add_children validates and adds only the delta."""
+        node = nodes.MultiNode()
+        node.add_children(self.leaves[:2])
+        node.add_children(iter(self.leaves[1:]))
+        self.assertEqual(node.children, set(self.leaves))
+        with self.assertRaises(TypeError):
+            node.add_children([self.leaves[0], 1])
+
+        self.assertEqual(node.children, set(self.leaves))
+        node.add_children([1], trusted = True)
+        self.assertIn(1, node.children)
+
+    def test_add_parents(self):
+        """Test that add_parents validates and adds only the delta."""
+        node = nodes.BiMultiNode()
+        node.add_parents(self.leaves)
+        self.assertEqual(node.parents, set(self.leaves))
+        self.assertEqual(node.children, set())
+        with self.assertRaises(TypeError):
+            node.add_parents([1])
+
+    def test_extend_children(self):
+        """Test that extend_children keeps order and validates the delta."""
+        node = nodes.BiOrderedMultiNode()
+        node.extend_children(self.leaves)
+        node.extend_children(self.leaves[:1])
+        self.assertEqual(node.children, self.leaves + self.leaves[:1])
+        node.extend_parents(reversed(self.leaves))
+        self.assertEqual(node.parents, self.leaves[::-1])
+        with self.assertRaises(TypeError):
+            node.extend_children([1])
+
+        with self.assertRaises(TypeError):
+            node.extend_parents([1])
+
+        self.assertEqual(len(node.children), 4)
+
+    def test_trusted_init(self):
+        """Test that trusted skips validation of the initial containers."""
+        node = nodes.BiMultiNode(1, {1}, {2}, trusted = True)
+        self.assertEqual(node.children, {1})
+        self.assertEqual(node.parents, {2})
+        with self.assertRaises(TypeError):
+            nodes.OrderedMultiNode(1, [1])
+
+    def test_defaults_not_shared(self):
+        """Test that default containers are not shared between nodes."""
+        first = nodes.MultiNode()
+        second = nodes.MultiNode()
+        first.add_children(self.leaves)
+        self.assertEqual(second.children, set())
+        first = nodes.OrderedMultiNode()
+        second = nodes.OrderedMultiNode()
+        first.extend_children(self.leaves)
+        self.assertEqual(second.children, [])
+
+    def tearDown(self):
+        del self.leaves
+
 def get_test_suite():
     """A function which generates a test suite for the nodes.py file.
     In order to make a test active within the automated testing, implemented in
@@ -1285,6 +1624,17 @@ def get_test_suite():
     test_loader.loadTestsFromTestCase(BiMultiNodeTestCase)
     test_loader.loadTestsFromTestCase(OrderedMultiNodeTestCase)
     test_loader.loadTestsFromTestCase(BiOrderedMultiNodeTestCase)
+    test_loader.loadTestsFromTestCase(BulkChildrenTestCase)
+    test_loader.loadTestsFromTestCase(FastNodeTestCase)
+    test_loader.loadTestsFromTestCase(FastLinkedNodeTestCase)
+    test_loader.loadTestsFromTestCase(FastBinaryNodeTestCase)
+    test_loader.loadTestsFromTestCase(FastBiBinaryNodeTestCase)
+    test_loader.loadTestsFromTestCase(FastSizedBinaryNodeTestCase)
+    test_loader.loadTestsFromTestCase(FastMultiNodeTestCase)
+    test_loader.loadTestsFromTestCase(FastBiMultiNodeTestCase)
+    test_loader.loadTestsFromTestCase(FastOrderedMultiNodeTestCase)
+    test_loader.loadTestsFromTestCase(FastBiOrderedMultiNodeTestCase)
+    test_loader.loadTestsFromTestCase(NodeArenaTestCase)
     return nodes_test_suite
 
 def run_test():
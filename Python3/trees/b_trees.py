@@ -24,3 +24,1935 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
+
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from itertools import islice
+
+class BTreeNode(object):
+    """A node of a BTree.
+
+    Attributes:
+        keys:
+            the sorted keys of the node, in a list or an array.
+
+        values:
+            the values of the keys, in the same order, or None for the inner
+            nodes of a BPlusTree, whose keys only guide searches.
+
+        children:
+            the child nodes, one more than there are keys, or None for a leaf.
+            Every key in children[i] sorts before keys[i], and every key in
+            children[i + 1] after it.
+    """
+
+    __slots__ = ('keys', 'values', 'children')
+
+    def __init__(self, keys, values = None, children = None):
+        self.keys = keys
+        self.values = values
+        self.children = children
+
+class BPlusTreeNode(BTreeNode):
+    """A node of a BPlusTree, whose leaves are linked in key order.
+
+    Attributes:
+        next:
+            the leaf after this one, or None for the last leaf and for inner
+            nodes.
+    """
+
+    __slots__ = ('next',)
+
+    def __init__(self, keys, values = None, children = None):
+        super().__init__(keys, values, children)
+        self.next = None
+
+class BTree(object):
+    """A sorted mapping held in a balanced tree of many keys per node.
+    Every node but the root holds between (order - 1) // 2 and order - 1 keys,
+    and an inner node with n keys has n + 1 children, so a tree of a million
+    keys with the default order of 64 is only four levels deep. Each level
+    costs one bisect over the keys of a node, which runs in C, in place of the
+    many Python level hops of a binary tree. With a typecode the keys of each
+    node are kept in an array of that type, which packs numbers without a
+    Python object each.
+
+    Keys are unique, as in a dict. Iteration is in key order, and items, keys
+    and values take optional low and high bounds, both inclusive.
+    """
+
+    node_class = BTreeNode
+    order_err = 'order must be at least 3'
+    sorted_err = 'from_sorted needs keys in strictly ascending order'
+
+    # Whether inner nodes hold values for their keys, as well as leaves
+    inner_values = True
+
+    def __contains__(self, key):
+        node = self.root
+        while True:
+            keys = node.keys
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                return True
+
+            if node.children is None:
+                return False
+
+            node = node.children[i]
+
+    def __delitem__(self, key):
+        self.delete(key)
+
+    def __getitem__(self, key):
+        node, i = self._find(key)
+        if node is None:
+            raise KeyError(key)
+
+        return node.values[i]
+
+    def __init__(self, order = 64, typecode = None):
+        if order < 3:
+            raise ValueError(self.order_err)
+
+        self.order = order
+        self.max_keys = order - 1
+        self.min_keys = (order - 1) // 2
+        self.typecode = typecode
+        self.root = self.node_class(self._keys(), [])
+        self.length = 0
+
+    def __iter__(self):
+        for key, _ in self.items():
+            yield key
+
+    def __len__(self):
+        return self.length
+
+    def __setitem__(self, key, value):
+        self.insert(key, value)
+
+    def delete(self, key):
+        """Remove key and return its value, raising KeyError if it is absent.
+        A key in an inner node is replaced by its predecessor, which always
+        lies in a leaf, and nodes left short of keys on the way back up
+        borrow from a sibling or merge with one.
+        """
+        path = []
+        node = self.root
+        while True:
+            keys = node.keys
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                break
+
+            if node.children is None:
+                raise KeyError(key)
+
+            path.append((node, i))
+            node = node.children[i]
+
+        value = node.values[i]
+        if node.children is not None:
+            path.append((node, i))
+            leaf = node.children[i]
+            while leaf.children is not None:
+                path.append((leaf, len(leaf.children) - 1))
+                leaf = leaf.children[-1]
+
+            node.keys[i] = leaf.keys.pop()
+            node.values[i] = leaf.values.pop()
+            node = leaf
+
+        else:
+            del node.keys[i]
+            del node.values[i]
+
+        self.length -= 1
+        self._rebalance(node, path)
+        return value
+
+    @classmethod
+    def from_sorted(cls, items, **options):
+        """Build a tree from (key, value) pairs in ascending key order in
+        O(n), without any splits. The nodes are filled as evenly as the order
+        allows, which leaves them nearly full. Keyword options are passed on
+        to the constructor.
+        """
+        tree = cls(**options)
+        keys = []
+        values = []
+        for key, value in items:
+            if keys and not keys[-1] < key:
+                raise ValueError(tree.sorted_err)
+
+            keys.append(key)
+            values.append(value)
+
+        if keys:
+            tree.root = tree._load(keys, values)
+            tree.length = len(keys)
+
+        return tree
+
+    def get(self, key, default = None):
+        """Return the value of key, or default if it is absent."""
+        node, i = self._find(key)
+        if node is None:
+            return default
+
+        return node.values[i]
+
+    def insert(self, key, value = None):
+        """Set the value of key, adding it if it is absent.
+        The key goes into a leaf, and a node which overflows splits around
+        its middle key, which moves up into the parent.
+        """
+        path = []
+        node = self.root
+        while True:
+            keys = node.keys
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                node.values[i] = value
+                return
+
+            if node.children is None:
+                break
+
+            path.append((node, i))
+            node = node.children[i]
+
+        node.keys.insert(i, key)
+        node.values.insert(i, value)
+        self.length += 1
+        self._grow(node, path)
+
+    def items(self, low = None, high = None):
+        """Return a generator over the (key, value) pairs from low to high."""
+        stack = []
+        node = self.root
+        while node is not None:
+            i = 0 if low is None else bisect_left(node.keys, low)
+            stack.append([node, i])
+            node = node.children[i] if node.children is not None else None
+
+        while stack:
+            top = stack[-1]
+            node, i = top
+            keys = node.keys
+            if node.children is None:
+                stack.pop()
+                for key, value in zip(islice(keys, i, None),
+                                      islice(node.values, i, None)):
+                    if high is not None and high < key:
+                        return
+
+                    yield key, value
+
+                continue
+
+            if i == len(keys):
+                stack.pop()
+                continue
+
+            key = keys[i]
+            if high is not None and high < key:
+                return
+
+            yield key, node.values[i]
+            top[1] = i + 1
+            node = node.children[i + 1]
+            while node is not None:
+                stack.append([node, 0])
+                node = node.children[0] if node.children is not None else None
+
+    def keys(self, low = None, high = None):
+        """Return a generator over the keys from low to high."""
+        return (key for key, _ in self.items(low, high))
+
+    def update(self, items):
+        """Insert every (key, value) pair of items, or of a mapping."""
+        if hasattr(items, 'items'):
+            items = items.items()
+
+        for key, value in items:
+            self.insert(key, value)
+
+    def values(self, low = None, high = None):
+        """Return a generator over the values of the keys from low to high."""
+        return (value for _, value in self.items(low, high))
+
+    def _find(self, key):
+        """Return the node holding key and its index, or None and -1."""
+        node = self.root
+        while True:
+            keys = node.keys
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                return node, i
+
+            if node.children is None:
+                return None, -1
+
+            node = node.children[i]
+
+    def _fix(self, parent, i):
+        """Refill children[i] of parent, which is short of keys, by rotating a
+        key through parent from a sibling with keys to spare, or else by
+        merging it with a sibling and the key between them.
+        """
+        children = parent.children
+        node = children[i]
+        if i > 0 and len(children[i - 1].keys) > self.min_keys:
+            left = children[i - 1]
+            node.keys.insert(0, parent.keys[i - 1])
+            parent.keys[i - 1] = left.keys.pop()
+            if node.values is not None:
+                node.values.insert(0, parent.values[i - 1])
+                parent.values[i - 1] = left.values.pop()
+
+            if node.children is not None:
+                node.children.insert(0, left.children.pop())
+
+        elif i + 1 < len(children) and (len(children[i + 1].keys) >
+                                        self.min_keys):
+            right = children[i + 1]
+            node.keys.append(parent.keys[i])
+            parent.keys[i] = right.keys.pop(0)
+            if node.values is not None:
+                node.values.append(parent.values[i])
+                parent.values[i] = right.values.pop(0)
+
+            if node.children is not None:
+                node.children.append(right.children.pop(0))
+
+        else:
+            if i == len(children) - 1:
+                i -= 1
+
+            left = children[i]
+            right = children.pop(i + 1)
+            left.keys.append(parent.keys.pop(i))
+            left.keys += right.keys
+            if left.values is not None:
+                left.values.append(parent.values.pop(i))
+                left.values += right.values
+
+            if left.children is not None:
+                left.children += right.children
+
+    def _grow(self, node, path):
+        """Split node and its ancestors while they hold too many keys."""
+        while len(node.keys) > self.max_keys:
+            key, value, right = self._split(node)
+            if not path:
+                self.root = self.node_class(self._keys((key,)),
+                                            [value] if self.inner_values
+                                            else None,
+                                            [node, right],
+                                           )
+                return
+
+            node, i = path.pop()
+            node.keys.insert(i, key)
+            if node.values is not None:
+                node.values.insert(i, value)
+
+            node.children.insert(i + 1, right)
+
+    def _keys(self, items = ()):
+        """Return a new container of keys for a node."""
+        if self.typecode is None:
+            return list(items)
+
+        return array(self.typecode, items)
+
+    def _load(self, keys, values):
+        """Link sorted keys and values into leaves and the levels above."""
+        count = len(keys)
+        leaves = -(-(count + 1) // self.order)
+        nodes = []
+        separators = []
+        start = 0
+        for n in range(leaves):
+            stop = start + (count - leaves + 1 + n) // leaves
+            nodes.append(self.node_class(self._keys(keys[start:stop]),
+                                         values[start:stop],
+                                        ))
+            if stop < count:
+                separators.append((keys[stop], values[stop]))
+
+            start = stop + 1
+
+        return self._load_inner(nodes, separators)
+
+    def _load_inner(self, nodes, separators):
+        """Group each level of nodes under new parents until one is left.
+        separators[i] is the (key, value) pair between nodes[i] and
+        nodes[i + 1].
+        """
+        order = self.order
+        while len(nodes) > 1:
+            groups = -(-len(nodes) // order)
+            parents = []
+            above = []
+            start = 0
+            for n in range(groups):
+                stop = start + (len(nodes) + n) // groups
+                between = separators[start:stop - 1]
+                values = None
+                if self.inner_values:
+                    values = [value for _, value in between]
+
+                parents.append(self.node_class(self._keys(key for key, _
+                                                          in between),
+                                               values,
+                                               nodes[start:stop],
+                                              ))
+                if stop < len(nodes):
+                    above.append(separators[stop - 1])
+
+                start = stop
+
+            nodes = parents
+            separators = above
+
+        return nodes[0]
+
+    def _rebalance(self, node, path):
+        """Refill node and its ancestors after a key was taken from node."""
+        while path and len(node.keys) < self.min_keys:
+            node, i = path.pop()
+            self._fix(node, i)
+
+        root = self.root
+        if not root.keys and root.children is not None:
+            self.root = root.children[0]
+
+    def _split(self, node):
+        """Cut node around its middle key, keeping the lower half in node.
+        Return the middle key, its value or None, and the new node holding
+        the upper half.
+        """
+        middle = len(node.keys) // 2
+        keys = node.keys
+        right = self.node_class(keys[middle + 1:])
+        key = keys[middle]
+        del keys[middle:]
+        value = None
+        if node.values is not None:
+            value = node.values[middle]
+            right.values = node.values[middle + 1:]
+            del node.values[middle:]
+
+        if node.children is not None:
+            right.children = node.children[middle + 1:]
+            del node.children[middle + 1:]
+
+        return key, value, right
+
+class BPlusTree(BTree):
+    """A BTree which keeps every key and value in its leaves.
+    Inner nodes hold only copies of keys to guide searches, keys[i] being the
+    least key below children[i + 1], so more of them fit in each node and
+    the tree is shallower for the same order. The leaves are linked in key
+    order, so a range scan finds its first leaf in one descent and then walks
+    along the leaves without going back up the tree.
+    """
+
+    node_class = BPlusTreeNode
+    inner_values = False
+
+    def __contains__(self, key):
+        node = self.root
+        while node.children is not None:
+            node = node.children[bisect_right(node.keys, key)]
+
+        keys = node.keys
+        i = bisect_left(keys, key)
+        return i < len(keys) and keys[i] == key
+
+    def delete(self, key):
+        """Remove key and return its value, raising KeyError if it is absent.
+        Guide keys in inner nodes are left as they are, since they still
+        separate the subtrees on either side.
+        """
+        path = []
+        node = self.root
+        while node.children is not None:
+            i = bisect_right(node.keys, key)
+            path.append((node, i))
+            node = node.children[i]
+
+        keys = node.keys
+        i = bisect_left(keys, key)
+        if i == len(keys) or keys[i] != key:
+            raise KeyError(key)
+
+        del keys[i]
+        value = node.values.pop(i)
+        self.length -= 1
+        self._rebalance(node, path)
+        return value
+
+    def insert(self, key, value = None):
+        """Set the value of key, adding it if it is absent.
+        A leaf which overflows splits in two and a copy of the least key of
+        the upper half goes up into the parent.
+        """
+        path = []
+        node = self.root
+        while node.children is not None:
+            i = bisect_right(node.keys, key)
+            path.append((node, i))
+            node = node.children[i]
+
+        keys = node.keys
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            node.values[i] = value
+            return
+
+        keys.insert(i, key)
+        node.values.insert(i, value)
+        self.length += 1
+        self._grow(node, path)
+
+    def items(self, low = None, high = None):
+        """Return a generator over the (key, value) pairs from low to high.
+        Only the first leaf is found by searching, the rest by following
+        the links between leaves.
+        """
+        node = self.root
+        while node.children is not None:
+            node = node.children[0 if low is None
+                                 else bisect_right(node.keys, low)]
+
+        i = 0 if low is None else bisect_left(node.keys, low)
+        while node is not None:
+            keys = node.keys
+            if high is not None and keys and high < keys[-1]:
+                stop = bisect_right(keys, high, i)
+                yield from zip(islice(keys, i, stop),
+                               islice(node.values, i, stop))
+                return
+
+            yield from zip(islice(keys, i, None), islice(node.values, i, None))
+            node = node.next
+            i = 0
+
+    def _find(self, key):
+        node = self.root
+        while node.children is not None:
+            node = node.children[bisect_right(node.keys, key)]
+
+        keys = node.keys
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return node, i
+
+        return None, -1
+
+    def _fix(self, parent, i):
+        children = parent.children
+        node = children[i]
+        if node.children is not None:
+            super()._fix(parent, i)
+            return
+
+        if i > 0 and len(children[i - 1].keys) > self.min_keys:
+            left = children[i - 1]
+            node.keys.insert(0, left.keys.pop())
+            node.values.insert(0, left.values.pop())
+            parent.keys[i - 1] = node.keys[0]
+
+        elif i + 1 < len(children) and (len(children[i + 1].keys) >
+                                        self.min_keys):
+            right = children[i + 1]
+            node.keys.append(right.keys.pop(0))
+            node.values.append(right.values.pop(0))
+            parent.keys[i] = right.keys[0]
+
+        else:
+            if i == len(children) - 1:
+                i -= 1
+
+            left = children[i]
+            right = children.pop(i + 1)
+            del parent.keys[i]
+            left.keys += right.keys
+            left.values += right.values
+            left.next = right.next
+
+    def _load(self, keys, values):
+        count = len(keys)
+        leaves = -(-count // self.max_keys)
+        nodes = []
+        separators = []
+        start = 0
+        for n in range(leaves):
+            stop = start + (count + n) // leaves
+            leaf = self.node_class(self._keys(keys[start:stop]),
+                                   values[start:stop],
+                                  )
+            if nodes:
+                nodes[-1].next = leaf
+                separators.append((keys[start], None))
+
+            nodes.append(leaf)
+            start = stop
+
+        return self._load_inner(nodes, separators)
+
+    def _split(self, node):
+        if node.children is not None:
+            return super()._split(node)
+
+        middle = len(node.keys) // 2
+        right = self.node_class(node.keys[middle:], node.values[middle:])
+        del node.keys[middle:]
+        del node.values[middle:]
+        right.next = node.next
+        node.next = right
+        return right.keys[0], None, right
+
+class ConcurrentBPlusTreeNode(BPlusTreeNode):
+    """A node of a ConcurrentBPlusTree.
+
+    Attributes:
+        version:
+            a counter which a writer makes odd before changing the node and
+            even again once the change is complete, so a reader can tell if
+            the node changed under it. A node removed from the tree is left
+            odd for good.
+
+        latch:
+            a lock held by a writer which may change the node.
+    """
+
+    __slots__ = ('version', 'latch')
+
+    def __init__(self, keys, values = None, children = None):
+        super().__init__(keys, values, children)
+        self.version = 0
+        self.latch = threading.Lock()
+
+class ConcurrentBPlusTree(BPlusTree):
+    """A BPlusTree which threads may read and write at the same time.
+    Readers take no locks. They note the version of each node before reading
+    it and check it after, starting again from the root if the node changed,
+    so readers never wait for each other or block a writer. Writers latch
+    their way down from the root, keeping the latches of the nodes which a
+    split or merge could reach and letting go of them all as soon as they
+    come to a node which cannot pass a change up. Writers in different parts
+    of the tree therefore work side by side.
+
+    A scan sees each leaf as it was at one moment, so it returns keys in
+    order without repeats, and sees every key present for the whole scan.
+    """
+
+    node_class = ConcurrentBPlusTreeNode
+
+    def __contains__(self, key):
+        return self._read(key)[0]
+
+    def __getitem__(self, key):
+        found, value = self._read(key)
+        if not found:
+            raise KeyError(key)
+
+        return value
+
+    def __init__(self, order = 64, typecode = None):
+        super().__init__(order, typecode)
+        self._root_latch = threading.Lock()
+        self._length_latch = threading.Lock()
+
+    def delete(self, key):
+        """Remove key and return its value, raising KeyError if it is absent."""
+        path, node, root_held = self._latch_path(key, self._delete_safe)
+        held = [parent for parent, _ in path]
+        held.append(node)
+        changed = []
+        try:
+            keys = node.keys
+            i = bisect_left(keys, key)
+            if i == len(keys) or keys[i] != key:
+                raise KeyError(key)
+
+            self._begin(node, changed)
+            del keys[i]
+            value = node.values.pop(i)
+            with self._length_latch:
+                self.length -= 1
+
+            while path and len(node.keys) < self.min_keys:
+                parent, i = path.pop()
+                children = parent.children
+                siblings = children[max(i - 1, 0):i] + children[i + 1:i + 2]
+                for sibling in siblings:
+                    sibling.latch.acquire()
+                    held.append(sibling)
+                    self._begin(sibling, changed)
+
+                self._begin(parent, changed)
+                self._fix(parent, i)
+                for child in siblings + [node]:
+                    if child not in parent.children:
+                        changed.remove(child)
+
+                node = parent
+
+            root = self.root
+            if root_held and root.children is not None and not root.keys:
+                self._begin(root, changed)
+                self.root = root.children[0]
+                changed.remove(root)
+
+            return value
+
+        finally:
+            self._end(changed)
+            self._release(held, root_held)
+
+    def get(self, key, default = None):
+        """Return the value of key, or default if it is absent."""
+        found, value = self._read(key)
+        return value if found else default
+
+    def insert(self, key, value = None):
+        """Set the value of key, adding it if it is absent."""
+        path, node, root_held = self._latch_path(key, self._insert_safe)
+        held = [parent for parent, _ in path]
+        held.append(node)
+        changed = []
+        try:
+            keys = node.keys
+            i = bisect_left(keys, key)
+            self._begin(node, changed)
+            if i < len(keys) and keys[i] == key:
+                node.values[i] = value
+                return
+
+            keys.insert(i, key)
+            node.values.insert(i, value)
+            with self._length_latch:
+                self.length += 1
+
+            while len(node.keys) > self.max_keys:
+                key, _, right = self._split(node)
+                if not path:
+                    self.root = self.node_class(self._keys((key,)),
+                                                None,
+                                                [node, right],
+                                               )
+                    return
+
+                node, i = path.pop()
+                self._begin(node, changed)
+                node.keys.insert(i, key)
+                node.children.insert(i + 1, right)
+
+        finally:
+            self._end(changed)
+            self._release(held, root_held)
+
+    def items(self, low = None, high = None):
+        """Return a generator over the (key, value) pairs from low to high.
+        Each leaf is copied out and checked before its items are yielded.
+        Moving on to the next leaf checks that the last one has not changed
+        since, and if it has, the scan searches again from the last key it
+        yielded.
+        """
+        start = low
+        after = False
+        while True:
+            node, version = self._leaf(start)
+            previous = None
+            while True:
+                if previous is not None and (previous.version !=
+                                             previous_version):
+                    break
+
+                try:
+                    keys = node.keys
+                    if start is None:
+                        i = 0
+
+                    elif after:
+                        i = bisect_right(keys, start)
+
+                    else:
+                        i = bisect_left(keys, start)
+
+                    stop = len(keys)
+                    if high is not None:
+                        stop = bisect_right(keys, high, i)
+
+                    last = stop < len(keys)
+                    found = list(zip(keys[i:stop], node.values[i:stop]))
+                    following = node.next
+
+                except IndexError:
+                    break
+
+                if node.version != version:
+                    break
+
+                yield from found
+                if found:
+                    start = found[-1][0]
+                    after = True
+
+                if last or following is None:
+                    return
+
+                previous, previous_version = node, version
+                node = following
+                version = node.version
+                if version & 1:
+                    break
+
+            time.sleep(0)
+
+    def _begin(self, node, changed):
+        """Mark a latched node as being changed, once."""
+        if not node.version & 1:
+            node.version += 1
+            changed.append(node)
+
+    def _delete_safe(self, node, root):
+        """Whether taking a key from below node cannot change its parent."""
+        if root:
+            return node.children is None or len(node.keys) > 1
+
+        return len(node.keys) > self.min_keys
+
+    def _end(self, changed):
+        for node in changed:
+            node.version += 1
+
+    def _insert_safe(self, node, root):
+        """Whether adding a key below node cannot change its parent."""
+        return len(node.keys) < self.max_keys
+
+    def _latch_path(self, key, safe):
+        """Latch the nodes from the root to the leaf for key, letting go of
+        those above any node which is safe for the change. Return the path
+        of (node, index) pairs still latched above the leaf, the leaf, and
+        whether the latch on the root pointer is still held.
+        """
+        self._root_latch.acquire()
+        root_held = True
+        node = self.root
+        node.latch.acquire()
+        if safe(node, True):
+            self._root_latch.release()
+            root_held = False
+
+        path = []
+        while node.children is not None:
+            i = bisect_right(node.keys, key)
+            child = node.children[i]
+            child.latch.acquire()
+            path.append((node, i))
+            if safe(child, False):
+                self._release([parent for parent, _ in path], root_held)
+                path = []
+                root_held = False
+
+            node = child
+
+        return path, node, root_held
+
+    def _leaf(self, key):
+        """Return the leaf for key, or the first leaf if key is None, and the
+        version it had when it was reached from a parent which was unchanged.
+        """
+        while True:
+            node = self.root
+            version = node.version
+            if not version & 1 and node is self.root:
+                try:
+                    while node.children is not None:
+                        i = 0
+                        if key is not None:
+                            i = bisect_right(node.keys, key)
+
+                        child = node.children[i]
+                        child_version = child.version
+                        if (node.version != version or
+                            child_version & 1):
+                            break
+
+                        node = child
+                        version = child_version
+
+                    else:
+                        return node, version
+
+                except IndexError:
+                    pass
+
+            time.sleep(0)
+
+    def _read(self, key):
+        """Return whether key is present and its value, without latches."""
+        while True:
+            node, version = self._leaf(key)
+            try:
+                keys = node.keys
+                i = bisect_left(keys, key)
+                found = i < len(keys) and keys[i] == key
+                value = node.values[i] if found else None
+
+            except IndexError:
+                continue
+
+            if node.version == version:
+                return found, value
+
+    def _release(self, nodes, root_held):
+        for node in nodes:
+            node.latch.release()
+
+        if root_held:
+            self._root_latch.release()
+
+class DiskNode(object):
+    """A page of a DiskBPlusTree, decoded into Python lists.
+
+    Attributes:
+        page:
+            the number of the page in the file.
+
+        keys:
+            the sorted keys of the page.
+
+        values:
+            the values of the keys for a leaf, or None for an inner page.
+
+        children:
+            the page numbers of the children of an inner page, or None for a
+            leaf.
+
+        dirty:
+            whether the lists have changed since the page was last written.
+    """
+
+    __slots__ = ('page', 'keys', 'values', 'children', 'dirty')
+
+    def __init__(self, page, keys, values = None, children = None):
+        self.page = page
+        self.keys = keys
+        self.values = values
+        self.children = children
+        self.dirty = False
+
+class DiskBPlusTree(object):
+    """A B+ tree of fixed width keys and values kept in a single file.
+    The file is a sequence of pages of page_size bytes, mapped into memory
+    with mmap. Page 0 holds the header, and every other page is a node whose
+    keys and values, or child page numbers, are packed with struct using
+    key_format and value_format, which must each describe a single fixed
+    width item such as 'q', 'd' or '16s'. Pages are decoded straight from a
+    memoryview of the map, without copying them into bytes first. Decoded
+    pages are kept in a buffer pool of at most cache_pages pages, evicting
+    the least recently used, and hits and misses count how often a page was
+    found there or had to be read.
+
+    Changes are made copy on write: a page of the last committed tree is
+    never written over, a copy of it is changed instead, so the committed
+    tree stays whole on disk until commit flushes the new pages and then
+    writes a header pointing at the new root. The header is kept in two
+    checksummed slots which commits alternate between, so a crash at any
+    point, even halfway through writing a header, reopens as the last
+    commit. rollback goes back to it without reopening. Because leaves are
+    copied when they change, they do not link to each other, and range scans
+    walk the tree with a stack of inner pages instead.
+
+    Keys and values are normalised through their formats, so for example
+    bytes shorter than an 's' format come back padded with zero bytes.
+    """
+
+    LEAF = 1
+    INNER = 2
+    MAGIC = b'STRCTBPT'
+    VERSION = 1
+
+    format_err = 'formats must describe one item without a byte order'
+    header_err = 'file has no valid header'
+    item_err = 'key or value does not fit its format'
+    mismatch_err = 'file was created with different formats or page size'
+    page_err = 'page_size is too small for the formats'
+
+    _header = struct.Struct('<8sIIQQQQ16s16s')
+    _crc = struct.Struct('<I')
+    _page_head = struct.Struct('<BxH')
+    _slots = (0, 128)
+
+    def __contains__(self, key):
+        return self._find(self._pack_key(key)) is not None
+
+    def __delitem__(self, key):
+        self.delete(key)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        if kind is not None:
+            self.rollback()
+
+        self.close()
+
+    def __getitem__(self, key):
+        found = self._find(self._pack_key(key))
+        if found is None:
+            raise KeyError(key)
+
+        node, i = found
+        return node.values[i]
+
+    def __init__(self, path, key_format = None, value_format = None,
+                 page_size = None, cache_pages = 256):
+        self.path = path
+        self.cache_pages = max(cache_pages, 1)
+        self._file = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+        self._file.seek(0, os.SEEK_END)
+        if self._file.tell() == 0:
+            try:
+                self._create(key_format or 'q', value_format or 'q',
+                             page_size or 4096)
+
+            except ValueError:
+                self._file.close()
+                raise
+
+        else:
+            self._map = mmap.mmap(self._file.fileno(), 0)
+            self._view = memoryview(self._map)
+            self._read_header()
+            for given, stored in ((key_format, self.key_format),
+                                  (value_format, self.value_format),
+                                  (page_size, self.page_size),
+                                 ):
+                if given is not None and given != stored:
+                    self._close_files()
+                    raise ValueError(self.mismatch_err)
+
+            self._set_formats()
+            self._open()
+
+    def __iter__(self):
+        for key, _ in self.items():
+            yield key
+
+    def __len__(self):
+        return self.length
+
+    def __setitem__(self, key, value):
+        self.insert(key, value)
+
+    def close(self):
+        """Commit any changes and close the file."""
+        if self._file is not None:
+            self.commit()
+            self._close_files()
+
+    def commit(self):
+        """Make every change since the last commit durable.
+        The new pages are written and flushed before the header which points
+        at them, so the old tree is only let go once the new one is safe.
+        """
+        if not self._changed:
+            return
+
+        for node in self._cache.values():
+            if node.dirty:
+                self._write(node)
+
+        self._map.flush()
+        os.fsync(self._file.fileno())
+        self._sequence += 1
+        self._write_header()
+        self._map.flush(0, self.page_size)
+        self._free.extend(self._pending)
+        self._pending = []
+        self._fresh = set()
+        self._changed = False
+
+    def delete(self, key):
+        """Remove key and return its value, raising KeyError if it is absent."""
+        key = self._pack_key(key)
+        if self._find(key) is None:
+            raise KeyError(key)
+
+        path = []
+        node = self._root_for_write()
+        while node.children is not None:
+            i = bisect_right(node.keys, key)
+            path.append((node, i))
+            node = self._child_for_write(node, i)
+
+        i = bisect_left(node.keys, key)
+        del node.keys[i]
+        value = node.values.pop(i)
+        self._touch(node)
+        self.length -= 1
+        while path and len(node.keys) < self._minimum(node):
+            parent, i = path.pop()
+            self._fix(parent, i, node)
+            node = parent
+
+        root = self._load(self.root)
+        if root.children is not None and not root.keys:
+            self.root = root.children[0]
+            self._release(root.page)
+
+        return value
+
+    def get(self, key, default = None):
+        """Return the value of key, or default if it is absent."""
+        found = self._find(self._pack_key(key))
+        if found is None:
+            return default
+
+        node, i = found
+        return node.values[i]
+
+    def insert(self, key, value):
+        """Set the value of key, adding it if it is absent."""
+        key = self._pack_key(key)
+        value = self._pack_value(value)
+        path = []
+        node = self._root_for_write()
+        while node.children is not None:
+            i = bisect_right(node.keys, key)
+            path.append((node, i))
+            node = self._child_for_write(node, i)
+
+        keys = node.keys
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            node.values[i] = value
+            self._touch(node)
+            return
+
+        keys.insert(i, key)
+        node.values.insert(i, value)
+        self._touch(node)
+        self.length += 1
+        while len(node.keys) > self._capacity(node):
+            separator, right = self._split(node)
+            if not path:
+                root = DiskNode(self._allocate(),
+                                [separator],
+                                None,
+                                [node.page, right.page],
+                               )
+                self._touch(root)
+                self.root = root.page
+                return
+
+            parent, i = path.pop()
+            parent.keys.insert(i, separator)
+            parent.children.insert(i + 1, right.page)
+            self._touch(parent)
+            node = parent
+
+    def items(self, low = None, high = None):
+        """Return a generator over the (key, value) pairs from low to high.
+        Pages are read as the scan reaches them, so only the inner pages on
+        the current path and one leaf are held at a time. The tree must not
+        be changed while a scan is running.
+        """
+        if low is not None:
+            low = self._pack_key(low)
+
+        if high is not None:
+            high = self._pack_key(high)
+
+        stack = []
+        node = self._load(self.root)
+        while node.children is not None:
+            i = 0 if low is None else bisect_right(node.keys, low)
+            stack.append([node, i + 1])
+            node = self._load(node.children[i])
+
+        i = 0 if low is None else bisect_left(node.keys, low)
+        while True:
+            keys = node.keys
+            if high is not None and keys and high < keys[-1]:
+                stop = bisect_right(keys, high, i)
+                yield from zip(keys[i:stop], node.values[i:stop])
+                return
+
+            yield from zip(keys[i:], node.values[i:])
+            while stack and stack[-1][1] == len(stack[-1][0].children):
+                stack.pop()
+
+            if not stack:
+                return
+
+            top = stack[-1]
+            node = self._load(top[0].children[top[1]])
+            top[1] += 1
+            while node.children is not None:
+                stack.append([node, 1])
+                node = self._load(node.children[0])
+
+            i = 0
+
+    def keys(self, low = None, high = None):
+        """Return a generator over the keys from low to high."""
+        return (key for key, _ in self.items(low, high))
+
+    def rollback(self):
+        """Discard every change since the last commit."""
+        self._read_header()
+        self._open()
+
+    def update(self, items):
+        """Insert every (key, value) pair of items, or of a mapping."""
+        if hasattr(items, 'items'):
+            items = items.items()
+
+        for key, value in items:
+            self.insert(key, value)
+
+    def values(self, low = None, high = None):
+        """Return a generator over the values of the keys from low to high."""
+        return (value for _, value in self.items(low, high))
+
+    def _allocate(self):
+        """Return the number of a page which is free to be written."""
+        self._changed = True
+        if self._free:
+            page = self._free.pop()
+
+        else:
+            page = self.page_count
+            self.page_count += 1
+            size = self.page_count * self.page_size
+            if size > len(self._map):
+                self._view.release()
+                self._map.resize(max(size, 2 * len(self._map)))
+                self._view = memoryview(self._map)
+
+        self._fresh.add(page)
+        return page
+
+    def _cache_node(self, node):
+        """Put node at the recent end of the pool, evicting the oldest pages
+        past the pool's size and writing those which are dirty.
+        """
+        cache = self._cache
+        cache[node.page] = node
+        cache.move_to_end(node.page)
+        while len(cache) > self.cache_pages:
+            _, old = cache.popitem(last = False)
+            if old.dirty:
+                self._write(old)
+
+    def _capacity(self, node):
+        if node.children is None:
+            return self.leaf_capacity
+
+        return self.inner_capacity
+
+    def _child_for_write(self, parent, i):
+        """Return children[i] of parent, which must be writable, copying the
+        child first if it belongs to the committed tree.
+        """
+        node = self._load(parent.children[i])
+        if node.page not in self._fresh:
+            self._copy(node)
+            parent.children[i] = node.page
+            self._touch(parent)
+
+        return node
+
+    def _close_files(self):
+        self._cache = OrderedDict()
+        self._view.release()
+        self._map.close()
+        self._file.close()
+        self._file = None
+
+    def _copy(self, node):
+        """Move node to a fresh page, leaving its committed page untouched."""
+        self._cache.pop(node.page, None)
+        self._pending.append(node.page)
+        node.page = self._allocate()
+        self._touch(node)
+
+    def _create(self, key_format, value_format, page_size):
+        """Lay out a new file holding an empty tree and commit it."""
+        self.key_format = key_format
+        self.value_format = value_format
+        self.page_size = page_size
+        self._set_formats()
+        self._file.truncate(2 * page_size)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._view = memoryview(self._map)
+        self.root = 1
+        self.page_count = 2
+        self.length = 0
+        self._sequence = 0
+        self._structs = {}
+        self.writes = 0
+        self._write(DiskNode(1, [], []))
+        self._open()
+        self._changed = True
+        self.commit()
+
+    def _find(self, key):
+        """Return the leaf holding key and the index of key, or None."""
+        node = self._load(self.root)
+        while node.children is not None:
+            node = self._load(node.children[bisect_right(node.keys, key)])
+
+        keys = node.keys
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return node, i
+
+        return None
+
+    def _fix(self, parent, i, node):
+        """Refill node, children[i] of parent, which is short of keys, from
+        a sibling with keys to spare, or else merge it with a sibling.
+        """
+        children = parent.children
+        leaf = node.children is None
+        minimum = self._minimum(node)
+        if i > 0 and len(self._load(children[i - 1]).keys) > minimum:
+            left = self._child_for_write(parent, i - 1)
+            if leaf:
+                node.keys.insert(0, left.keys.pop())
+                node.values.insert(0, left.values.pop())
+                parent.keys[i - 1] = node.keys[0]
+
+            else:
+                node.keys.insert(0, parent.keys[i - 1])
+                parent.keys[i - 1] = left.keys.pop()
+                node.children.insert(0, left.children.pop())
+
+            self._touch(left)
+
+        elif (i + 1 < len(children) and
+              len(self._load(children[i + 1]).keys) > minimum):
+            right = self._child_for_write(parent, i + 1)
+            if leaf:
+                node.keys.append(right.keys.pop(0))
+                node.values.append(right.values.pop(0))
+                parent.keys[i] = right.keys[0]
+
+            else:
+                node.keys.append(parent.keys[i])
+                parent.keys[i] = right.keys.pop(0)
+                node.children.append(right.children.pop(0))
+
+            self._touch(right)
+
+        else:
+            if i > 0:
+                i -= 1
+                left = self._child_for_write(parent, i)
+                right = node
+
+            else:
+                left = node
+                right = self._load(children[i + 1])
+
+            separator = parent.keys.pop(i)
+            if not leaf:
+                left.keys.append(separator)
+                left.children += right.children
+
+            else:
+                left.values += right.values
+
+            left.keys += right.keys
+            del children[i + 1]
+            self._release(right.page)
+            # node may be the page just released, so only the survivor is
+            # marked as changed.
+            node = left
+
+        self._touch(node)
+        self._touch(parent)
+
+    def _inner_struct(self, count):
+        found = self._structs.get(-count)
+        if found is None:
+            found = struct.Struct('<BxH' + self.key_format * count +
+                                  'I' * (count + 1))
+            self._structs[-count] = found
+
+        return found
+
+    def _leaf_struct(self, count):
+        found = self._structs.get(count)
+        if found is None:
+            found = struct.Struct('<BxH' + self.key_format * count +
+                                  self.value_format * count)
+            self._structs[count] = found
+
+        return found
+
+    def _load(self, page):
+        """Return the decoded node of a page through the buffer pool."""
+        node = self._cache.get(page)
+        if node is not None:
+            self.hits += 1
+            self._cache.move_to_end(page)
+            return node
+
+        self.misses += 1
+        node = self._read(page)
+        self._cache_node(node)
+        return node
+
+    def _minimum(self, node):
+        return self._capacity(node) // 2
+
+    def _open(self):
+        """Reset the pool and find the free pages of the committed tree.
+        Every page which no inner page of the tree points to is free, so
+        only inner pages need to be read.
+        """
+        self._cache = OrderedDict()
+        self._structs = {}
+        self._fresh = set()
+        self._pending = []
+        self._changed = False
+        used = {self.root}
+        stack = [self.root]
+        while stack:
+            node = self._read(stack.pop())
+            if node.children is not None:
+                used.update(node.children)
+                stack.extend(node.children)
+
+        self._free = [page for page in range(self.page_count - 1, 0, -1)
+                      if page not in used]
+        self.hits = self.misses = self.writes = 0
+
+    def _pack_key(self, key):
+        try:
+            return self._key_struct.unpack(self._key_struct.pack(key))[0]
+
+        except struct.error:
+            raise ValueError(self.item_err) from None
+
+    def _pack_value(self, value):
+        try:
+            return self._value_struct.unpack(self._value_struct.pack(value))[0]
+
+        except struct.error:
+            raise ValueError(self.item_err) from None
+
+    def _read(self, page):
+        """Decode a page straight from the memory map."""
+        offset = page * self.page_size
+        kind, count = self._page_head.unpack_from(self._view, offset)
+        if kind == self.LEAF:
+            fields = self._leaf_struct(count).unpack_from(self._view, offset)
+            return DiskNode(page,
+                            list(fields[2:2 + count]),
+                            list(fields[2 + count:]),
+                           )
+
+        fields = self._inner_struct(count).unpack_from(self._view, offset)
+        return DiskNode(page,
+                        list(fields[2:2 + count]),
+                        None,
+                        list(fields[2 + count:]),
+                       )
+
+    def _read_header(self):
+        """Load the newest header slot whose checksum is good."""
+        best = None
+        for offset in self._slots:
+            size = self._header.size
+            data = self._view[offset:offset + size]
+            crc, = self._crc.unpack_from(self._view, offset + size)
+            if zlib.crc32(data) != crc:
+                continue
+
+            fields = self._header.unpack(data)
+            if fields[0] == self.MAGIC and (best is None or
+                                            fields[3] > best[3]):
+                best = fields
+
+        if best is None:
+            self._close_files()
+            raise ValueError(self.header_err)
+
+        (_, _, self.page_size, self._sequence, self.root, self.page_count,
+         self.length, key_format, value_format) = best
+        self.key_format = key_format.rstrip(b'\0').decode('ascii')
+        self.value_format = value_format.rstrip(b'\0').decode('ascii')
+
+    def _release(self, page):
+        """Give up a page which is no longer part of the tree."""
+        self._cache.pop(page, None)
+        if page in self._fresh:
+            self._fresh.discard(page)
+            self._free.append(page)
+
+        else:
+            self._pending.append(page)
+
+    def _root_for_write(self):
+        node = self._load(self.root)
+        if node.page not in self._fresh:
+            self._copy(node)
+            self.root = node.page
+
+        return node
+
+    def _set_formats(self):
+        """Check the formats and work out how many keys fit in a page."""
+        for item in (self.key_format, self.value_format):
+            if item[:1] in ('@', '=', '<', '>', '!'):
+                raise ValueError(self.format_err)
+
+            try:
+                if len(struct.unpack('<' + item,
+                                     bytes(struct.calcsize('<' + item)))) != 1:
+                    raise ValueError(self.format_err)
+
+            except struct.error:
+                raise ValueError(self.format_err) from None
+
+        self._key_struct = struct.Struct('<' + self.key_format)
+        self._value_struct = struct.Struct('<' + self.value_format)
+        key_size = self._key_struct.size
+        room = self.page_size - self._page_head.size
+        self.leaf_capacity = room // (key_size + self._value_struct.size)
+        self.inner_capacity = (room - 4) // (key_size + 4)
+        if self.page_size < 512 or min(self.leaf_capacity,
+                                       self.inner_capacity) < 3:
+            raise ValueError(self.page_err)
+
+    def _split(self, node):
+        """Move the upper half of node to a new page and return the key
+        which separates the halves and the new node.
+        """
+        middle = len(node.keys) // 2
+        if node.children is None:
+            right = DiskNode(self._allocate(),
+                             node.keys[middle:],
+                             node.values[middle:],
+                            )
+            separator = right.keys[0]
+            del node.values[middle:]
+
+        else:
+            right = DiskNode(self._allocate(),
+                             node.keys[middle + 1:],
+                             None,
+                             node.children[middle + 1:],
+                            )
+            separator = node.keys[middle]
+            del node.children[middle + 1:]
+
+        del node.keys[middle:]
+        self._touch(node)
+        self._touch(right)
+        return separator, right
+
+    def _touch(self, node):
+        """Mark node as changed, keeping it in the pool until it is written."""
+        self._changed = True
+        node.dirty = True
+        self._cache_node(node)
+
+    def _write(self, node):
+        """Encode a node into its page of the memory map."""
+        offset = node.page * self.page_size
+        count = len(node.keys)
+        if node.children is None:
+            self._leaf_struct(count).pack_into(self._view, offset,
+                                               self.LEAF, count,
+                                               *node.keys, *node.values)
+
+        else:
+            self._inner_struct(count).pack_into(self._view, offset,
+                                                self.INNER, count,
+                                                *node.keys, *node.children)
+
+        node.dirty = False
+        self.writes += 1
+
+    def _write_header(self):
+        """Write the header into the slot after the one last written."""
+        offset = self._slots[self._sequence % 2]
+        data = self._header.pack(self.MAGIC,
+                                 self.VERSION,
+                                 self.page_size,
+                                 self._sequence,
+                                 self.root,
+                                 self.page_count,
+                                 self.length,
+                                 self.key_format.encode('ascii'),
+                                 self.value_format.encode('ascii'),
+                                )
+        self._view[offset:offset + len(data)] = data
+        self._crc.pack_into(self._view, offset + len(data), zlib.crc32(data))
+
+class BEpsilonNode(object):
+    """A node of a BEpsilonTree.
+
+    Attributes:
+        keys:
+            the sorted keys of a leaf, or the pivots of an inner node, which
+            route a key to children[bisect_right(keys, key)].
+
+        values:
+            the values of the keys of a leaf, or None for an inner node.
+
+        children:
+            the child nodes of an inner node, or None for a leaf.
+
+        buffer:
+            a dict of the messages waiting to be flushed to the children of
+            an inner node, by key, or None for a leaf.
+    """
+
+    __slots__ = ('keys', 'values', 'children', 'buffer')
+
+    def __init__(self, keys, values = None, children = None):
+        self.keys = keys
+        self.values = values
+        self.children = children
+        self.buffer = None if children is None else {}
+
+class BEpsilonTree(object):
+    """A write optimised B-tree, whose inner nodes buffer changes as messages.
+    A write only adds a message to the buffer of the root. When a buffer
+    holds more than buffer_size messages, they all move down to the
+    children in sorted batches, so each message is handled once per level
+    in a batch rather than costing a search of its own.
+    Inner nodes have at most fanout children and leaves hold up to leaf_size
+    keys.
+
+    Messages put a value, delete a key, or upsert a key by applying a
+    function to its value, or to a default if it is absent, without reading
+    it first. A newer message for a key replaces or is combined with an
+    older one in the same buffer. Queries read the buffers on their path,
+    so they see every message at once.
+
+    Since a message cannot tell whether its key is present, the tree does not
+    track its size, and deletes are blind. Leaves which shrink are merged
+    into their neighbours, but inner nodes are not rebalanced.
+    """
+
+    PUT = 0
+    DELETE = 1
+    UPSERT = 2
+
+    size_err = 'fanout must be at least 3 and sizes at least 4'
+
+    def __contains__(self, key):
+        return self._lookup(key)[0]
+
+    def __delitem__(self, key):
+        if not self._lookup(key)[0]:
+            raise KeyError(key)
+
+        self.delete(key)
+
+    def __getitem__(self, key):
+        present, value = self._lookup(key)
+        if not present:
+            raise KeyError(key)
+
+        return value
+
+    def __init__(self, fanout = 16, buffer_size = 4096, leaf_size = 256):
+        if fanout < 3 or min(buffer_size, leaf_size) < 4:
+            raise ValueError(self.size_err)
+
+        self.fanout = fanout
+        self.buffer_size = buffer_size
+        self.leaf_size = leaf_size
+        self.root = BEpsilonNode([], [])
+
+    def __iter__(self):
+        return self.keys()
+
+    def __setitem__(self, key, value):
+        self.insert(key, value)
+
+    def delete(self, key):
+        """Delete key if it is present."""
+        self._send(key, (self.DELETE,))
+
+    def get(self, key, default = None):
+        """Return the value of key, or default if it is absent."""
+        present, value = self._lookup(key)
+        return value if present else default
+
+    def insert(self, key, value):
+        """Set the value of key, adding it if it is absent."""
+        self._send(key, (self.PUT, value))
+
+    def items(self, low = None, high = None):
+        """Return an iterator over the (key, value) pairs from low to high.
+        The range is gathered from the leaves below it, and the messages in
+        it are applied a level at a time on the way back up.
+        """
+        found = self._collect(self.root, low, high)
+        return iter(sorted(found.items()))
+
+    def keys(self, low = None, high = None):
+        """Return an iterator over the keys from low to high."""
+        return (key for key, _ in self.items(low, high))
+
+    def update(self, items):
+        """Insert every (key, value) pair of items, or of a mapping."""
+        if hasattr(items, 'items'):
+            items = items.items()
+
+        for key, value in items:
+            self.insert(key, value)
+
+    def upsert(self, key, function, default = None):
+        """Set key to function(value), using default if key is absent."""
+        self._send(key, (self.UPSERT, [function], default))
+
+    def values(self, low = None, high = None):
+        """Return an iterator over the values of the keys from low to high."""
+        return (value for _, value in self.items(low, high))
+
+    def _apply(self, message, present, value):
+        """Return (present, value) after applying message to a key."""
+        kind = message[0]
+        if kind == self.PUT:
+            return True, message[1]
+
+        if kind == self.DELETE:
+            return False, None
+
+        if not present:
+            value = message[2]
+
+        for function in message[1]:
+            value = function(value)
+
+        return True, value
+
+    def _collect(self, node, low, high):
+        """Return a dict of the items of node from low to high."""
+        if node.children is None:
+            keys = node.keys
+            start = 0 if low is None else bisect_left(keys, low)
+            stop = len(keys) if high is None else bisect_right(keys, high)
+            return dict(zip(keys[start:stop], node.values[start:stop]))
+
+        pivots = node.keys
+        start = 0 if low is None else bisect_right(pivots, low)
+        stop = len(pivots) if high is None else bisect_right(pivots, high)
+        found = {}
+        for child in node.children[start:stop + 1]:
+            found.update(self._collect(child, low, high))
+
+        for key, message in node.buffer.items():
+            if ((low is None or low <= key) and
+                (high is None or key <= high)):
+                present, value = self._apply(message,
+                                             key in found,
+                                             found.get(key),
+                                            )
+                if present:
+                    found[key] = value
+
+                else:
+                    found.pop(key, None)
+
+        return found
+
+    def _combine(self, old, new):
+        """Return the message with the effect of old followed by new."""
+        if old is None or new[0] != self.UPSERT:
+            return new
+
+        if old[0] == self.UPSERT:
+            return (self.UPSERT, old[1] + new[1], old[2])
+
+        return (self.PUT,) + self._apply(new, old[0] == self.PUT,
+                                         old[-1])[1:]
+
+    def _flush(self, node):
+        """Move every message in the buffer of node down to its children.
+        The keys are sorted once and cut into a batch per child at the
+        pivots, working from the right so that splitting or merging a leaf
+        does not move the children still to be reached.
+        """
+        buffer = node.buffer
+        keys = sorted(buffer)
+        node.buffer = {}
+        children = node.children
+        bounds = [0]
+        bounds += [bisect_left(keys, pivot) for pivot in node.keys]
+        bounds.append(len(keys))
+        for i in range(len(children) - 1, -1, -1):
+            start = bounds[i]
+            stop = bounds[i + 1]
+            if start == stop:
+                continue
+
+            child = children[i]
+            if child.children is None:
+                self._merge(child,
+                            [(key, buffer[key]) for key in keys[start:stop]],
+                           )
+                self._refit(node, i)
+                continue
+
+            below = child.buffer
+            for key in keys[start:stop]:
+                message = buffer[key]
+                if message[0] == self.UPSERT:
+                    message = self._combine(below.get(key), message)
+
+                below[key] = message
+
+            if len(below) > self.buffer_size:
+                self._flush(child)
+                if len(child.children) > self.fanout:
+                    self._split(node, i)
+
+    def _lookup(self, key):
+        """Return (present, value) for key, reading the buffers on its path."""
+        pending = []
+        node = self.root
+        while node.children is not None:
+            message = node.buffer.get(key)
+            if message is not None:
+                if message[0] != self.UPSERT:
+                    present, value = self._apply(message, False, None)
+                    break
+
+                pending.append(message)
+
+            node = node.children[bisect_right(node.keys, key)]
+
+        else:
+            keys = node.keys
+            i = bisect_left(keys, key)
+            present = i < len(keys) and keys[i] == key
+            value = node.values[i] if present else None
+
+        for message in reversed(pending):
+            present, value = self._apply(message, present, value)
+
+        return present, value
+
+    def _merge(self, leaf, messages):
+        """Apply a batch of messages to a leaf."""
+        found = dict(zip(leaf.keys, leaf.values))
+        for key, message in messages:
+            kind = message[0]
+            if kind == self.PUT:
+                found[key] = message[1]
+
+            elif kind == self.DELETE:
+                found.pop(key, None)
+
+            else:
+                found[key] = self._apply(message,
+                                         key in found,
+                                         found.get(key),
+                                        )[1]
+
+        leaf.keys = sorted(found)
+        leaf.values = list(map(found.__getitem__, leaf.keys))
+
+    def _refit(self, node, i):
+        """Split children[i] of node, a leaf, if it has grown too big, or
+        merge it into a neighbour if it has shrunk to a quarter.
+        """
+        children = node.children
+        pivots = node.keys
+        leaf = children[i]
+        size = len(leaf.keys)
+        if size > self.leaf_size:
+            pieces = -(-size // (self.leaf_size // 2))
+            bounds = [size * n // pieces for n in range(pieces + 1)]
+            leaves = [BEpsilonNode(leaf.keys[start:stop],
+                                   leaf.values[start:stop],
+                                  )
+                      for start, stop in zip(bounds, bounds[1:])]
+            children[i:i + 1] = leaves
+            pivots[i:i] = [piece.keys[0] for piece in leaves[1:]]
+
+        elif size < self.leaf_size // 4 and len(children) > 1:
+            j = i - 1 if i > 0 else i + 1
+            other = children[j]
+            if size + len(other.keys) > self.leaf_size and size:
+                return
+
+            left, right = (other, leaf) if j < i else (leaf, other)
+            left.keys += right.keys
+            left.values += right.values
+            del children[max(i, j)]
+            del pivots[min(i, j)]
+
+    def _send(self, key, message):
+        """Add a message to the root and flush whatever overflows."""
+        root = self.root
+        buffer = root.buffer
+        if buffer is None:
+            self._merge(root, [(key, message)])
+            if len(root.keys) > self.leaf_size:
+                self.root = BEpsilonNode([], None, [root])
+                self._refit(self.root, 0)
+
+            return
+
+        if message[0] == self.UPSERT:
+            message = self._combine(buffer.get(key), message)
+
+        buffer[key] = message
+        if len(buffer) > self.buffer_size:
+            self._flush(root)
+            if len(root.children) > self.fanout:
+                self.root = BEpsilonNode([], None, [root])
+                self._split(self.root, 0)
+
+            elif len(root.children) == 1:
+                self.root = root.children[0]
+
+    def _split(self, node, i):
+        """Split children[i] of node, an inner node, into as few pieces as
+        keep within the fanout, dividing its buffer between them.
+        """
+        child = node.children[i]
+        count = len(child.children)
+        pieces = -(-count // self.fanout)
+        bounds = [count * n // pieces for n in range(pieces + 1)]
+        separators = [child.keys[start - 1] for start in bounds[1:-1]]
+        nodes = [BEpsilonNode(child.keys[start:stop - 1],
+                              None,
+                              child.children[start:stop],
+                             )
+                 for start, stop in zip(bounds, bounds[1:])]
+        for key, message in child.buffer.items():
+            nodes[bisect_right(separators, key)].buffer[key] = message
+
+        node.keys[i:i] = separators
+        node.children[i:i + 1] = nodes
@@ -25,131 +25,3155 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from nodes import BiBinaryNode
+import math
+import operator
+import random
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from itertools import islice
+
+from structs.nodes import (FastBiBinaryNode,
+                           FastBinaryNode,
+                           FastSizedBinaryNode,
+                          )
 
 class BinaryTree(object):
-    """A tree data structure in which each node has at most two child nodes"""
+    """A tree data structure in which each node has at most two child nodes.
+    The tree is stored as linked nodes starting at root, which is None when the
+    tree is empty. Nodes are FastSizedBinaryNodes by default, so left, right and
+    parent are plain attributes holding a node or None and size counts the
+    nodes of each subtree. Iterating a tree yields the data of its nodes in the
+    order given by the 'order' attribute, which is one of 'in', 'pre', 'post' or
+    'level'. Every traversal keeps its own explicit stack or queue, so deep or
+    degenerate trees use constant Python stack depth and several traversals can
+    run at once.
 
-    def __contains__(self, item):
-        if item == self.data:
-            return True
+    Subtree sizes are kept up to date by every method which changes the shape
+    of the tree, which makes len() O(1) and lets the tree be indexed by in-order
+    position in O(height). Code which links nodes by hand should call recount()
+    afterwards.
+    """
 
-        if self.left:
-            if item in self.left:
-                return True
+    node_class = FastSizedBinaryNode
+    orders = ('in', 'pre', 'post', 'level')
+    count_err = 'iterable length does not match count'
+
+    # Whether from_sorted may build this tree in one pass without knowing the
+    # number of elements, which gives minimum height but not balance
+    _streaming_load = True
 
-        if self.right:
-            if item in self.right:
+    def __contains__(self, item):
+        for node in self.nodes('pre'):
+            if node.data == item:
                 return True
 
         return False
 
     def __getitem__(self, key):
-        pass
+        return self.select(key).data
 
     def __len__(self):
-        """A recurse function which determines the number of elements."""
-        if self.store_len:
-            return self.length
-
-        elif data:
-            length = 1
-            if self.left:
-                length += len(self.left)
-
-            if self.right:
-                length += len(self.left)
-
-            return length
-
-        else:
+        """Return the number of elements, which is the size of the root."""
+        if self.root is None:
             return 0
 
-    def __init__(self, data = None, order = 'in', store_len = False);
+        return self.root.size
+
+    def __init__(self, data = None, order = 'in'):
         self.binary_tree_err = 'linked trees must be BinaryTree type'
-        self.root = BiBinaryNode(data)
-        self.store_len = store_len
-        if store_len:
-            if data:
-                self.length = 1
+        if data is None:
+            self.root = None
 
-            else:
-                self.lendth = 0
+        else:
+            self.root = self.node_class(data)
 
-        if order in ['in', 'post', 'pre', 'level']:
+        if order in self.orders:
             self.order = order
 
         else:
             self.order = 'in'
 
     def __iter__(self):
-        return self
+        for node in self.nodes(self.order):
+            yield node.data
 
-    def __next__(self):
+    def __setitem__(self, key, value):
+        self.select(key).data = value
+
+    def delete_at(self, index):
+        """Remove the element at an in-order position and return its data."""
+        node = self.select(index)
+        data = node.data
+        self._remove(node)
+        return data
+
+    @classmethod
+    def from_sorted(cls, iterable, count = None, order = 'in', **options):
+        """Build a tree whose in-order sequence is the iterable in O(n).
+        Each element is read exactly once and no rotations are done, so a
+        generator can be passed without building a list first. When the
+        number of elements is known, from count or from len(iterable), the two
+        subtrees of every node differ in size by at most one. Otherwise the
+        tree is built in a single pass with the minimum possible height, though
+        nodes on its right edge may be lighter on the right than on the left.
+        Trees which keep balance information on their nodes need to know the
+        count to build in linear time, and otherwise insert the elements one at
+        a time. Any other keyword options are passed on to the constructor.
+        """
+        tree = cls(order = order, **options)
+        if count is None:
+            try:
+                count = len(iterable)
+
+            except TypeError:
+                pass
+
+        items = tree._checked(iter(iterable))
+        if count is not None:
+            try:
+                tree.root = tree._build_balanced(items, count)
+
+            except StopIteration:
+                raise ValueError(tree.count_err) from None
+
+            for each in items:
+                raise ValueError(tree.count_err)
+
+        elif cls._streaming_load:
+            tree.root = tree._build_spine(items)
+
+        else:
+            tree.update(items)
+            return tree
+
+        tree._loaded()
+        return tree
+
+    def insert_at(self, index, data):
+        """Insert data so that it becomes the element at an in-order position.
+        Like list.insert, an index past either end inserts at that end. The
+        tree is not rebalanced, so the cost is O(height).
+        """
+        size = len(self)
+        if index < 0:
+            index = max(index + size, 0)
+
+        new = self.node_class(data)
+        if self.root is None:
+            self.root = new
+            return new
+
+        if index >= size:
+            parent = self._last(self.root)
+            parent.right = new
+
+        else:
+            parent = self.select(index)
+            if parent.left is None:
+                parent.left = new
+
+            else:
+                parent = self._last(parent.left)
+                parent.right = new
+
+        new.parent = parent
+        self._grow(parent, 1)
+        return new
+
+    def position(self, node):
+        """Return the in-order position of a node of this tree in O(height)."""
+        left = node.left
+        index = left.size if left is not None else 0
+        parent = node.parent
+        while parent is not None:
+            if node is parent.right:
+                left = parent.left
+                index += left.size + 1 if left is not None else 1
+
+            node = parent
+            parent = node.parent
+
+        return index
+
+    def rank(self, item):
+        """Return the number of elements less than item in O(height).
+        The answer is only meaningful when the in-order sequence of the tree is
+        sorted, as it is for search trees. rank and select together answer
+        percentile queries, for example tree[tree.rank(x)] is the smallest
+        element which is not less than x.
+        """
+        rank = 0
+        node = self.root
+        while node is not None:
+            if item <= node.data:
+                node = node.left
+
+            else:
+                left = node.left
+                rank += left.size + 1 if left is not None else 1
+                node = node.right
+
+        return rank
+
+    def recount(self):
+        """Recompute the size of every subtree after linking nodes by hand."""
+        for node in self._post_order(self.root):
+            self._update(node)
+
+    def select(self, index):
+        """Return the node at an in-order position in O(height).
+        Negative positions count from the end, as they do for lists.
+        """
+        size = len(self)
+        if index < 0:
+            index += size
+
+        if not 0 <= index < size:
+            raise IndexError('tree index out of range')
+
+        node = self.root
+        while True:
+            left = node.left
+            left_size = left.size if left is not None else 0
+            if index < left_size:
+                node = left
+
+            elif index == left_size:
+                return node
+
+            else:
+                index -= left_size + 1
+                node = node.right
+
+    def _build_balanced(self, items, count):
+        """Build a size balanced subtree of count elements read in order.
+        The recursion depth is the height of the result, which is O(log n).
+        """
+        node_class = self.node_class
+        update = self._update
+
+        def build(count):
+            if count == 0:
+                return None
+
+            left_count = count // 2
+            left = build(left_count)
+            node = node_class(next(items))
+            right = build(count - 1 - left_count)
+            node.left = left
+            node.right = right
+            if left is not None:
+                left.parent = node
+
+            if right is not None:
+                right.parent = node
+
+            update(node)
+            return node
+
+        return build(count)
+
+    def _build_spine(self, items):
+        """Build a minimum height tree from items of unknown number.
+        Complete subtrees are combined like the digits of a binary counter:
+        each element either starts a new one node subtree or becomes the parent
+        of the complete subtree just finished, waiting on a stack for a right
+        subtree of the same height. Whatever is left on the stack at the end is
+        linked into a right edge.
+        """
+        node_class = self.node_class
+        update = self._update
+        waiting = []
+        heights = []
+        done = None
+        height = 0
+        for item in items:
+            node = node_class(item)
+            if done is not None:
+                node.left = done
+                done.parent = node
+                waiting.append(node)
+                heights.append(height)
+                done = None
+
+            else:
+                done = node
+                height = 1
+                while heights and heights[-1] == height:
+                    parent = waiting.pop()
+                    heights.pop()
+                    parent.right = done
+                    done.parent = parent
+                    update(parent)
+                    done = parent
+                    height += 1
+
+        while waiting:
+            parent = waiting.pop()
+            parent.right = done
+            if done is not None:
+                done.parent = parent
+
+            update(parent)
+            done = parent
+
+        return done
+
+    @staticmethod
+    def _checked(items):
+        """Return items, checked for order by trees which need sorted input."""
+        return items
+
+    @staticmethod
+    def _first(node):
+        while node.left is not None:
+            node = node.left
+
+        return node
+
+    @staticmethod
+    def _grow(node, amount):
+        """Add amount to the size of node and every ancestor of node."""
+        while node is not None:
+            node.size += amount
+            node = node.parent
+
+    @staticmethod
+    def _last(node):
+        while node.right is not None:
+            node = node.right
+
+        return node
+
+    def _rotate_left(self, node):
+        """Lift the right child of node above it and return the child.
+        The in-order sequence is unchanged. Sizes and any other augmentation
+        kept by _update are recomputed for the two nodes that moved.
+        """
+        child = node.right
+        node.right = child.left
+        if child.left is not None:
+            child.left.parent = node
+
+        self._replace(node, child)
+        child.left = node
+        node.parent = child
+        self._update(node)
+        self._update(child)
+        return child
+
+    def _rotate_right(self, node):
+        """Lift the left child of node above it and return the child."""
+        child = node.left
+        node.left = child.right
+        if child.right is not None:
+            child.right.parent = node
+
+        self._replace(node, child)
+        child.right = node
+        node.parent = child
+        self._update(node)
+        self._update(child)
+        return child
+
+    def _loaded(self):
+        """Called after from_sorted links the nodes, to set balance fields."""
         pass
 
+    def _remove(self, node):
+        """Unlink a node from the tree and return the node it was under.
+        A node with two children first trades data with its in-order successor,
+        which is then unlinked in its place, so the node object that leaves the
+        tree may not be the one passed in. The returned parent is where any
+        rebalancing should start.
+        """
+        if node.left is not None and node.right is not None:
+            successor = self._first(node.right)
+            node.data = successor.data
+            node = successor
+
+        child = node.left if node.left is not None else node.right
+        parent = node.parent
+        self._replace(node, child)
+        self._grow(parent, -1)
+        node.parent = node.left = node.right = None
+        return parent
+
+    def _replace(self, node, new):
+        """Put new where node hangs from its parent, or at the root."""
+        parent = node.parent
+        if parent is None:
+            self.root = new
+
+        elif parent.left is node:
+            parent.left = new
+
+        else:
+            parent.right = new
+
+        if new is not None:
+            new.parent = parent
+
+    @staticmethod
+    def _update(node):
+        """Recompute the size of node from the sizes of its children."""
+        size = 1
+        if node.left is not None:
+            size += node.left.size
+
+        if node.right is not None:
+            size += node.right.size
+
+        node.size = size
+
+    def nodes(self, order = None):
+        """Return a generator over the nodes of the tree.
+        order is one of 'in', 'pre', 'post' or 'level' and defaults to the
+        tree's own order.
+        """
+        if order is None:
+            order = self.order
+
+        if order == 'in':
+            return self._in_order(self.root)
+
+        if order == 'pre':
+            return self._pre_order(self.root)
+
+        if order == 'post':
+            return self._post_order(self.root)
+
+        if order == 'level':
+            return self._level_order(self.root)
+
+        raise ValueError('order must be one of ' + ', '.join(self.orders))
+
+    def traverse(self, order = None):
+        """Return a generator over the data of the tree in the given order."""
+        return (node.data for node in self.nodes(order))
+
+    @staticmethod
+    def _in_order(node):
+        stack = []
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+
+            node = stack.pop()
+            yield node
+            node = node.right
+
+    @staticmethod
+    def _pre_order(node):
+        if node is None:
+            return
+
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            yield node
+            if node.right is not None:
+                stack.append(node.right)
+
+            if node.left is not None:
+                stack.append(node.left)
+
+    @staticmethod
+    def _post_order(node):
+        stack = []
+        last = None
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node.left
+
+            else:
+                top = stack[-1]
+                if top.right is not None and top.right is not last:
+                    node = top.right
+
+                else:
+                    last = stack.pop()
+                    yield last
+
+    @staticmethod
+    def _level_order(node):
+        if node is None:
+            return
+
+        queue = deque([node])
+        while queue:
+            node = queue.popleft()
+            yield node
+            if node.left is not None:
+                queue.append(node.left)
+
+            if node.right is not None:
+                queue.append(node.right)
+
+class BinarySearchTree(BinaryTree):
+    """An ordered or sorted binary tree.
+    The in-order sequence of the tree is always sorted: every element in the
+    left subtree of a node is less than or equal to it and every element in the
+    right subtree is greater than or equal to it. Equal keys may be inserted
+    more than once and keep their insertion order. Elements
+    must be mutually comparable. This class does no balancing of its own, so
+    its operations cost O(height), which is O(n) for sorted input; AVLTree and
+    RedBlackTree keep the height at O(log n).
+
+    Since positions follow from the keys, insert_at and item assignment are not
+    supported, but delete_at, select and rank work as they do for BinaryTree.
+    """
+
+    order_err = 'search trees are ordered by key, use insert instead'
+    sorted_err = 'from_sorted needs elements in ascending order'
+
+    # Whether each key may be held only once, as in a set
+    distinct = False
+
+    def __contains__(self, item):
+        return self.search(item) is not None
+
+    def __init__(self, data = None, order = 'in'):
+        super().__init__(None, order)
+        if data is not None:
+            self.insert(data)
+
     def __setitem__(self, key, value):
+        raise TypeError(self.order_err)
+
+    def ceiling(self, key):
+        """Return the smallest element greater than or equal to key, or None."""
+        best = None
+        node = self.root
+        while node is not None:
+            if node.data < key:
+                node = node.right
+
+            else:
+                best = node
+                node = node.left
+
+        return best.data if best is not None else None
+
+    def delete(self, key):
+        """Remove one element equal to key, raising KeyError if there is none."""
+        node = self.search(key)
+        if node is None:
+            raise KeyError(key)
+
+        self._delete_node(node)
+
+    def delete_at(self, index):
+        """Remove the element at an in-order position and return it."""
+        node = self.select(index)
+        data = node.data
+        self._delete_node(node)
+        return data
+
+    def floor(self, key):
+        """Return the greatest element less than or equal to key, or None."""
+        best = None
+        node = self.root
+        while node is not None:
+            if key < node.data:
+                node = node.left
+
+            else:
+                best = node
+                node = node.right
+
+        return best.data if best is not None else None
+
+    def insert(self, key):
+        """Add key to the tree and return the node which holds it."""
+        parent = None
+        node = self.root
+        while node is not None:
+            parent = node
+            if key < node.data:
+                node = node.left
+
+            else:
+                node = node.right
+
+        new = self.node_class(key)
+        new.parent = parent
+        if parent is None:
+            self.root = new
+
+        elif key < parent.data:
+            parent.left = new
+
+        else:
+            parent.right = new
+
+        self._grow(parent, 1)
+        self._inserted(new)
+        return new
+
+    def insert_at(self, index, data):
+        raise TypeError(self.order_err)
+
+    def range(self, low = None, high = None):
+        """Return a generator over the elements from low to high inclusive.
+        Either bound may be None to leave that end open. Only the nodes on the
+        path to low and the nodes yielded are visited.
+        """
+        stack = []
+        node = self.root
+        while stack or node is not None:
+            while node is not None:
+                if low is not None and node.data < low:
+                    node = node.right
+
+                else:
+                    stack.append(node)
+                    node = node.left
+
+            if not stack:
+                return
+
+            node = stack.pop()
+            if high is not None and high < node.data:
+                return
+
+            yield node.data
+            node = node.right
+
+    def search(self, key):
+        """Return the first node in order whose data equals key, or None."""
+        found = None
+        node = self.root
+        while node is not None:
+            if key < node.data:
+                node = node.left
+
+            elif node.data < key:
+                node = node.right
+
+            else:
+                found = node
+                node = node.left
+
+        return found
+
+    def update(self, iterable):
+        """Insert every element of the iterable."""
+        for key in iterable:
+            self.insert(key)
+
+    def _checked(self, items):
+        for previous in items:
+            yield previous
+            for item in items:
+                if item < previous or self.distinct and item == previous:
+                    raise ValueError(self.sorted_err)
+
+                yield item
+                previous = item
+
+    def _delete_node(self, node):
+        self._remove(node)
+
+    def _inserted(self, node):
+        """Called after node is linked into the tree, to restore balance."""
         pass
 
-'''class AATree(RedBlackTree):
-    """A variation of the red-black tree in which red nodes can only be added to
-a right subchild"""
+class AVLNode(FastSizedBinaryNode):
+    """A FastSizedBinaryNode which also records the height of its subtree."""
 
-    pass
+    __slots__ = ('height',)
+
+    def __init__(self, data = None, right = None, left = None, parent = None):
+        super().__init__(data, right, left, parent)
+        self.height = 1
 
 class AVLTree(BinarySearchTree):
-    """A self-balancing binary search tree"""
+    """A self-balancing binary search tree.
+    The heights of the two subtrees of every node differ by at most one, which
+    keeps the height of the whole tree under 1.45 log2(n). Each node stores its
+    height and the tree rebalances with rotations on the way back up from every
+    insert and delete.
+    """
 
-    pass
+    node_class = AVLNode
+    _streaming_load = False
 
-class BinarySearchTree(BinaryTree):
-    """An ordered or sorted binary tree"""
+    def _delete_node(self, node):
+        self._rebalance(self._remove(node))
 
-    pass
+    def _inserted(self, node):
+        self._rebalance(node.parent)
 
-class CartesianTree(): #needs lookup
-    """"""
+    def _rebalance(self, node):
+        """Restore the AVL property on the path from node up to the root."""
+        while node is not None:
+            self._update(node)
+            left = node.left.height if node.left is not None else 0
+            right = node.right.height if node.right is not None else 0
+            if left > right + 1:
+                child = node.left
+                if self._height(child.left) < self._height(child.right):
+                    self._rotate_left(child)
 
-    pass
+                node = self._rotate_right(node)
 
-class RandomizedBinarySearchTree(): #may be similar to treap
-    pass
+            elif right > left + 1:
+                child = node.right
+                if self._height(child.right) < self._height(child.left):
+                    self._rotate_right(child)
+
+                node = self._rotate_left(node)
+
+            node = node.parent
+
+    @staticmethod
+    def _height(node):
+        return node.height if node is not None else 0
+
+    @staticmethod
+    def _update(node):
+        size = 1
+        height = 0
+        if node.left is not None:
+            size += node.left.size
+            height = node.left.height
+
+        if node.right is not None:
+            size += node.right.size
+            if node.right.height > height:
+                height = node.right.height
+
+        node.size = size
+        node.height = height + 1
+
+class RedBlackNode(FastSizedBinaryNode):
+    """A FastSizedBinaryNode which also records whether it is red."""
+
+    __slots__ = ('red',)
+
+    def __init__(self, data = None, right = None, left = None, parent = None):
+        super().__init__(data, right, left, parent)
+        self.red = True
 
 class RedBlackTree(BinarySearchTree):
-    """A self-balancing binary search tree."""
+    """A self-balancing binary search tree.
+    Every node is red or black, no red node has a red child and every path from
+    a node down to a missing child passes the same number of black nodes, which
+    keeps the height under 2 log2(n + 1). Rebalancing needs at most three
+    rotations per operation, so updates are cheaper than in an AVLTree while
+    lookups are slightly slower.
+    """
 
-    pass
+    node_class = RedBlackNode
+    _streaming_load = False
 
-class Rope(): #needs lookup, more informations
-    pass
+    def _delete_node(self, node):
+        if node.left is not None and node.right is not None:
+            successor = self._first(node.right)
+            node.data = successor.data
+            node = successor
 
-class ScapegoatTree(): #needs more information
-    pass
+        child = node.left if node.left is not None else node.right
+        if child is None and not node.red:
+            # Rebalance around the black leaf while it still holds its place,
+            # then unlink it once the missing black has been made up for
+            self._delete_fixup(node)
 
-class SelfBalancingBinarySearchTree(): #a group of trees, consisting of aa, avl, r/b. scape, splay, treap
-    pass
+        self._remove(node)
+        if child is not None:
+            child.red = False
 
-class SplayTree(): #may not have a place in python implementation
-    pass
+    def _delete_fixup(self, node):
+        while node is not self.root and not node.red:
+            parent = node.parent
+            if node is parent.left:
+                sibling = parent.right
+                if sibling.red:
+                    sibling.red = False
+                    parent.red = True
+                    self._rotate_left(parent)
+                    sibling = parent.right
 
-class TTree(): #may not have a place in python implementation
-    pass
+                if not self._red(sibling.left) and not self._red(sibling.right):
+                    sibling.red = True
+                    node = parent
 
-class TangoTree(): #needs more information
-    pass
+                else:
+                    if not self._red(sibling.right):
+                        sibling.left.red = False
+                        sibling.red = True
+                        self._rotate_right(sibling)
+                        sibling = parent.right
 
-class ThreadedBinaryTree(): #possible in python, need more info
-    pass
+                    sibling.red = parent.red
+                    parent.red = False
+                    sibling.right.red = False
+                    self._rotate_left(parent)
+                    node = self.root
 
-class TopTree():
-    pass
+            else:
+                sibling = parent.left
+                if sibling.red:
+                    sibling.red = False
+                    parent.red = True
+                    self._rotate_right(parent)
+                    sibling = parent.left
 
-class Treap():
-    pass
+                if not self._red(sibling.left) and not self._red(sibling.right):
+                    sibling.red = True
+                    node = parent
 
-class VanEmdeBoasTree():
-    pass
+                else:
+                    if not self._red(sibling.left):
+                        sibling.right.red = False
+                        sibling.red = True
+                        self._rotate_left(sibling)
+                        sibling = parent.left
+
+                    sibling.red = parent.red
+                    parent.red = False
+                    sibling.left.red = False
+                    self._rotate_right(parent)
+                    node = self.root
+
+        node.red = False
+
+    def _inserted(self, node):
+        parent = node.parent
+        while parent is not None and parent.red:
+            grandparent = parent.parent
+            if parent is grandparent.left:
+                uncle = grandparent.right
+                if uncle is not None and uncle.red:
+                    parent.red = uncle.red = False
+                    grandparent.red = True
+                    node = grandparent
+
+                else:
+                    if node is parent.right:
+                        self._rotate_left(parent)
+                        node, parent = parent, node
+
+                    parent.red = False
+                    grandparent.red = True
+                    self._rotate_right(grandparent)
+
+            else:
+                uncle = grandparent.left
+                if uncle is not None and uncle.red:
+                    parent.red = uncle.red = False
+                    grandparent.red = True
+                    node = grandparent
+
+                else:
+                    if node is parent.left:
+                        self._rotate_right(parent)
+                        node, parent = parent, node
+
+                    parent.red = False
+                    grandparent.red = True
+                    self._rotate_left(grandparent)
+
+            parent = node.parent
+
+        self.root.red = False
+
+    def _loaded(self):
+        """Color a size balanced tree from from_sorted.
+        Every missing child of such a tree is on one of its last two levels, so
+        making the last level red, unless it is full, leaves the same number of
+        black nodes on every path.
+        """
+        size = len(self)
+        levels = size.bit_length()
+        red_depth = levels - 1 if size != (1 << levels) - 1 else -1
+        depth = 0
+        level = [self.root] if self.root is not None else []
+        while level:
+            below = []
+            for node in level:
+                node.red = depth == red_depth
+                if node.left is not None:
+                    below.append(node.left)
+
+                if node.right is not None:
+                    below.append(node.right)
+
+            level = below
+            depth += 1
+
+    @staticmethod
+    def _red(node):
+        return node is not None and node.red
+
+class SplayTree(BinarySearchTree):
+    """A self-adjusting binary search tree.
+    Every search, insert and delete moves the node it reaches to the root, so
+    keys that were used recently are found in a few steps and any sequence of
+    operations costs O(log n) amortized each. This suits skewed workloads where
+    a few keys take most of the lookups. Splaying is done top-down in a single
+    pass without recursion: nodes passed on the way down are set aside as the
+    left and right parts of the new root and linked back under it at the end.
+
+    Keys are distinct, so inserting a key which is already present returns its
+    node. Lookups, including 'in', change the shape of the tree, so they should
+    not be interleaved with a traversal. floor, ceiling, range, rank and select
+    only read the tree and do not splay.
+    """
+
+    distinct = True
+    join_err = 'joined trees must hold only greater elements'
+
+    def delete(self, key):
+        root = self._splay(key)
+        if root is None or root.data != key:
+            raise KeyError(key)
+
+        self._delete_root()
+
+    def insert(self, key):
+        root = self._splay(key)
+        if root is not None and root.data == key:
+            return root
+
+        new = self.node_class(key)
+        if root is not None:
+            if key < root.data:
+                new.left = root.left
+                new.right = root
+                root.left = None
+
+            else:
+                new.right = root.right
+                new.left = root
+                root.right = None
+
+            if new.left is not None:
+                new.left.parent = new
+
+            if new.right is not None:
+                new.right.parent = new
+
+            self._update(root)
+            self._update(new)
+
+        self.root = new
+        return new
+
+    def join(self, other):
+        """Move every element of other onto the end of this tree.
+        Every element of other must be greater than every element of this tree.
+        The work is one splay of this tree's greatest element, after which the
+        other tree hangs from the root.
+        """
+        if other.root is None:
+            return
+
+        if self.root is not None:
+            top = self._splay(self._last(self.root).data)
+            if not top.data < other._first(other.root).data:
+                raise ValueError(self.join_err)
+
+            top.right = other.root
+            other.root.parent = top
+            self._update(top)
+
+        else:
+            self.root = other.root
+
+        other.root = None
+
+    def search(self, key):
+        root = self._splay(key)
+        if root is not None and root.data == key:
+            return root
+
+        return None
+
+    def split(self, key):
+        """Move every element greater than or equal to key into a new tree.
+        The new tree is returned and this tree keeps the elements less than
+        key. The work is one splay, after which one link is cut at the root.
+        """
+        upper = self.__class__(order = self.order)
+        root = self._splay(key)
+        if root is None:
+            return upper
+
+        if root.data < key:
+            top = root.right
+            root.right = None
+
+        else:
+            top = root
+            self.root = root.left
+            root.left = None
+            if self.root is not None:
+                self.root.parent = None
+
+        if top is not None:
+            top.parent = None
+
+        upper.root = top
+        self._update(root)
+        return upper
+
+    def _delete_node(self, node):
+        self._splay(node.data)
+        self._delete_root()
+
+    def _delete_root(self):
+        """Remove the root by joining its two subtrees."""
+        root = self.root
+        left = root.left
+        right = root.right
+        root.left = root.right = None
+        if left is None:
+            self.root = right
+            if right is not None:
+                right.parent = None
+
+            return
+
+        # Every key on the left is less than the root's, so splaying for the
+        # root's key lifts the greatest of them, which has no right child
+        left.parent = None
+        self.root = left
+        top = self._splay(root.data)
+        top.right = right
+        if right is not None:
+            right.parent = top
+
+        self._update(top)
+
+    def _splay(self, key):
+        """Move the node holding key, or the last node before it would be
+        found, to the root and return it.
+        """
+        node = self.root
+        if node is None:
+            return None
+
+        update = self._update
+        lesser = []
+        greater = []
+        while True:
+            if key < node.data:
+                child = node.left
+                if child is None:
+                    break
+
+                if key < child.data:
+                    node.left = child.right
+                    if child.right is not None:
+                        child.right.parent = node
+
+                    child.right = node
+                    node.parent = child
+                    update(node)
+                    node = child
+                    if node.left is None:
+                        break
+
+                greater.append(node)
+                node = node.left
+
+            elif node.data < key:
+                child = node.right
+                if child is None:
+                    break
+
+                if child.data < key:
+                    node.right = child.left
+                    if child.left is not None:
+                        child.left.parent = node
+
+                    child.left = node
+                    node.parent = child
+                    update(node)
+                    node = child
+                    if node.right is None:
+                        break
+
+                lesser.append(node)
+                node = node.right
+
+            else:
+                break
+
+        # Link the set aside nodes into chains under the new root, deepest
+        # first so that each size is computed from finished children
+        left = node.left
+        for parent in reversed(lesser):
+            parent.right = left
+            if left is not None:
+                left.parent = parent
+
+            update(parent)
+            left = parent
+
+        right = node.right
+        for parent in reversed(greater):
+            parent.left = right
+            if right is not None:
+                right.parent = parent
+
+            update(parent)
+            right = parent
+
+        node.left = left
+        node.right = right
+        if left is not None:
+            left.parent = node
+
+        if right is not None:
+            right.parent = node
+
+        node.parent = None
+        update(node)
+        self.root = node
+        return node
+
+class TreapNode(FastSizedBinaryNode):
+    """A FastSizedBinaryNode which also holds a random heap priority."""
+
+    __slots__ = ('priority',)
+
+    def __init__(self,
+                 data = None,
+                 right = None,
+                 left = None,
+                 parent = None,
+                 priority = 0.0,
+                ):
+        self.data = data
+        self.right = right
+        self.left = left
+        self.parent = parent
+        self.size = 1
+        self.priority = priority
+
+class Treap(BinarySearchTree):
+    """A randomized binary search tree.
+    Every node gets a random priority when it is created and the tree is kept
+    in heap order on the priorities as well as in search order on the keys, so
+    it has the shape of a search tree built by inserting in random order and an
+    expected height of O(log n) whatever order the keys arrive in.
+
+    Keys are distinct, which lets treaps work as sorted sets: split and merge
+    cut and join trees at a key in expected O(log n), and union_update,
+    intersection_update and difference_update combine a treap of n elements
+    with one of m elements in expected O(m log(n / m)) by reusing the nodes of
+    both, which leaves the other treap empty. Pass seed to make the priorities,
+    and so the shape of the tree, reproducible. Split, merge and the set
+    operations recurse once per level, which is O(log n) deep.
+    """
+
+    distinct = True
+    merge_err = 'merged trees must hold only greater elements'
+
+    def __init__(self, data = None, order = 'in', seed = None):
+        self._random = random.Random(seed).random
+        super().__init__(data, order)
+
+    def difference_update(self, other):
+        """Remove every element of other from this tree, leaving other empty."""
+        self._adopt(self._difference(self.root, other.root))
+        other.root = None
+
+    def insert(self, key):
+        node = self.search(key)
+        if node is not None:
+            return node
+
+        return super().insert(key)
+
+    def intersection_update(self, other):
+        """Keep only elements also in other, leaving other empty."""
+        self._adopt(self._intersection(self.root, other.root))
+        other.root = None
+
+    def merge(self, other):
+        """Move every element of other, which must all be greater than the
+        elements of this tree, onto the end of this tree.
+        """
+        if self.root is not None and other.root is not None:
+            if not self._last(self.root).data < other._first(other.root).data:
+                raise ValueError(self.merge_err)
+
+        self._adopt(self._merge(self.root, other.root))
+        other.root = None
+
+    def node_class(self, data):
+        """Create a node for data with a fresh random priority."""
+        return TreapNode(data, None, None, None, self._random())
 
-class WeightBalancedTree():
+    def split(self, key):
+        """Move every element greater than or equal to key into a new tree.
+        The new tree is returned and this tree keeps the elements less than
+        key. The new tree draws its priorities from this tree's generator.
+        """
+        lesser, equal, greater = self._split(self.root, key)
+        if equal is not None:
+            greater = self._merge(equal, greater)
+
+        upper = self.__class__(order = self.order)
+        upper._random = self._random
+        upper._adopt(greater)
+        self._adopt(lesser)
+        return upper
+
+    def union_update(self, other):
+        """Add every element of other to this tree, leaving other empty."""
+        self._adopt(self._union(self.root, other.root))
+        other.root = None
+
+    def _adopt(self, root):
+        self.root = root
+        if root is not None:
+            root.parent = None
+
+    def _build_balanced(self, items, count):
+        # Priorities decide the shape, so knowing the count does not help
+        root = self._build_spine(islice(items, count))
+        if (root.size if root is not None else 0) != count:
+            raise ValueError(self.count_err)
+
+        return root
+
+    def _build_spine(self, items):
+        """Build a treap from sorted items in O(n) with a stack.
+        The stack holds the right edge of the tree built so far. Each new node
+        pops every node on it with a lower priority, which becomes its left
+        subtree, and is then hung as the right child of the node left on top.
+        """
+        node_class = self.node_class
+        update = self._update
+        stack = []
+        for item in items:
+            node = node_class(item)
+            last = None
+            while stack and stack[-1].priority < node.priority:
+                last = stack.pop()
+                update(last)
+
+            node.left = last
+            if last is not None:
+                last.parent = node
+
+            if stack:
+                stack[-1].right = node
+                node.parent = stack[-1]
+
+            stack.append(node)
+
+        root = stack[0] if stack else None
+        while stack:
+            update(stack.pop())
+
+        return root
+
+    def _delete_node(self, node):
+        parent = node.parent
+        self._replace(node, self._merge(node.left, node.right))
+        self._grow(parent, -1)
+        node.parent = node.left = node.right = None
+
+    def _difference(self, node, other):
+        if node is None or other is None:
+            return node
+
+        lesser, equal, greater = self._split(other, node.data)
+        left = self._difference(node.left, lesser)
+        right = self._difference(node.right, greater)
+        if equal is not None:
+            return self._merge(left, right)
+
+        return self._join(node, left, right)
+
+    def _inserted(self, node):
+        parent = node.parent
+        while parent is not None and parent.priority < node.priority:
+            if node is parent.left:
+                self._rotate_right(parent)
+
+            else:
+                self._rotate_left(parent)
+
+            parent = node.parent
+
+    def _intersection(self, node, other):
+        if node is None or other is None:
+            return None
+
+        if node.priority < other.priority:
+            node, other = other, node
+
+        lesser, equal, greater = self._split(other, node.data)
+        left = self._intersection(node.left, lesser)
+        right = self._intersection(node.right, greater)
+        if equal is not None:
+            return self._join(node, left, right)
+
+        return self._merge(left, right)
+
+    def _join(self, node, left, right):
+        """Make left and right the children of node and return node."""
+        node.left = left
+        node.right = right
+        if left is not None:
+            left.parent = node
+
+        if right is not None:
+            right.parent = node
+
+        self._update(node)
+        return node
+
+    def _merge(self, left, right):
+        """Join two subtrees, every key of left less than every key of right."""
+        if left is None:
+            return right
+
+        if right is None:
+            return left
+
+        if left.priority > right.priority:
+            return self._join(left, left.left, self._merge(left.right, right))
+
+        return self._join(right, self._merge(left, right.left), right.right)
+
+    def _split(self, node, key):
+        """Split a subtree into the parts less than, equal to and greater than
+        key. The equal part is a single detached node, or None.
+        """
+        if node is None:
+            return None, None, None
+
+        if node.data < key:
+            lesser, equal, greater = self._split(node.right, key)
+            return self._join(node, node.left, lesser), equal, greater
+
+        if key < node.data:
+            lesser, equal, greater = self._split(node.left, key)
+            return lesser, equal, self._join(node, greater, node.right)
+
+        lesser = node.left
+        greater = node.right
+        node.left = node.right = None
+        node.size = 1
+        return lesser, node, greater
+
+    def _union(self, node, other):
+        if node is None:
+            return other
+
+        if other is None:
+            return node
+
+        if node.priority < other.priority:
+            node, other = other, node
+
+        lesser, equal, greater = self._split(other, node.data)
+        return self._join(node,
+                          self._union(node.left, lesser),
+                          self._union(node.right, greater),
+                         )
+
+# Alias Treap by another familiar name, RandomizedBinarySearchTree
+RandomizedBinarySearchTree = Treap
+
+class ScapegoatTree(BinarySearchTree):
+    """A self-balancing binary search tree which stores nothing on its nodes
+    beyond data, left and right.
+    Nodes are FastBinaryNodes, with no parent, size or balance fields, which
+    makes this the smallest tree per node here. Balance is checked on the
+    search path instead: when an insert lands deeper than log base 1 / alpha
+    of the number of elements, the nearest ancestor above the new node whose
+    subtree has become too lopsided (the scapegoat) has its subtree rebuilt
+    perfectly balanced in linear time. When deletes shrink the tree below alpha times its largest
+    size since the last full rebuild, the whole tree is rebuilt. Updates cost
+    O(log n) amortized and lookups O(log n) in the worst case.
+
+    alpha is between 0.5 and 1; lower values keep the tree shallower at the
+    cost of more rebuilding. Since nodes carry no sizes, select, rank and
+    position walk the tree in O(n), and no parent links mean a node can only
+    be removed through delete or delete_at.
+    """
+
+    node_class = FastBinaryNode
+    _streaming_load = False
+
+    def __init__(self, data = None, order = 'in', alpha = 0.7):
+        if not 0.5 <= alpha < 1:
+            raise ValueError('alpha must be at least 0.5 and less than 1')
+
+        self.alpha = alpha
+        self._log_base = math.log(1 / alpha)
+        self._size = 0
+        self._max_size = 0
+        super().__init__(data, order)
+
+    def __len__(self):
+        return self._size
+
+    def delete(self, key):
+        parent = None
+        found = None
+        found_parent = None
+        node = self.root
+        while node is not None:
+            if key < node.data:
+                parent = node
+                node = node.left
+
+            elif node.data < key:
+                parent = node
+                node = node.right
+
+            else:
+                found = node
+                found_parent = parent
+                parent = node
+                node = node.left
+
+        if found is None:
+            raise KeyError(key)
+
+        node = found
+        parent = found_parent
+        if node.left is not None and node.right is not None:
+            parent = node
+            successor = node.right
+            while successor.left is not None:
+                parent = successor
+                successor = successor.left
+
+            node.data = successor.data
+            node = successor
+
+        child = node.left if node.left is not None else node.right
+        if parent is None:
+            self.root = child
+
+        elif parent.left is node:
+            parent.left = child
+
+        else:
+            parent.right = child
+
+        node.left = node.right = None
+        self._size -= 1
+        if self._size < self.alpha * self._max_size:
+            self.root = self._rebuild(self.root)
+            self._max_size = self._size
+
+    def delete_at(self, index):
+        data = self.select(index).data
+        self.delete(data)
+        return data
+
+    def insert(self, key):
+        path = []
+        node = self.root
+        while node is not None:
+            path.append(node)
+            if key < node.data:
+                node = node.left
+
+            else:
+                node = node.right
+
+        new = self.node_class(key)
+        if not path:
+            self.root = new
+
+        elif key < path[-1].data:
+            path[-1].left = new
+
+        else:
+            path[-1].right = new
+
+        self._size += 1
+        if self._size > self._max_size:
+            self._max_size = self._size
+
+        if len(path) > math.log(self._size) / self._log_base:
+            self._rebuild_scapegoat(path, new)
+
+        return new
+
+    def position(self, node):
+        for index, each in enumerate(self._in_order(self.root)):
+            if each is node:
+                return index
+
+        raise ValueError('node is not in this tree')
+
+    def rank(self, item):
+        rank = 0
+        for each in self.range(high = item):
+            if not each < item:
+                break
+
+            rank += 1
+
+        return rank
+
+    def recount(self):
+        self._size = self._max_size = sum(1 for each in
+                                          self._pre_order(self.root))
+
+    def select(self, index):
+        size = self._size
+        if index < 0:
+            index += size
+
+        if not 0 <= index < size:
+            raise IndexError('tree index out of range')
+
+        return next(islice(self._in_order(self.root), index, None))
+
+    def _build_balanced(self, items, count):
+        node_class = self.node_class
+
+        def build(count):
+            if count == 0:
+                return None
+
+            left_count = count // 2
+            left = build(left_count)
+            node = node_class(next(items))
+            node.left = left
+            node.right = build(count - 1 - left_count)
+            return node
+
+        return build(count)
+
+    def _loaded(self):
+        self.recount()
+
+    def _rebuild(self, node):
+        """Relink the nodes of a subtree perfectly balanced and return it."""
+        nodes = list(self._in_order(node))
+
+        def build(low, high):
+            if low >= high:
+                return None
+
+            middle = (low + high) // 2
+            node = nodes[middle]
+            node.left = build(low, middle)
+            node.right = build(middle + 1, high)
+            return node
+
+        return build(0, len(nodes))
+
+    def _rebuild_scapegoat(self, path, node):
+        """Find the scapegoat above a deep new node and rebuild its subtree.
+        Sizes are counted on the way up, each from the size below plus a walk
+        of the sibling subtree, so the cost is paid only when rebuilding.
+        """
+        size = 1
+        for depth in range(len(path) - 1, -1, -1):
+            parent = path[depth]
+            sibling = parent.right if parent.left is node else parent.left
+            parent_size = size + 1 + sum(1 for each in
+                                         self._pre_order(sibling))
+            if size > self.alpha * parent_size:
+                rebuilt = self._rebuild(parent)
+                if depth == 0:
+                    self.root = rebuilt
+
+                elif path[depth - 1].left is parent:
+                    path[depth - 1].left = rebuilt
+
+                else:
+                    path[depth - 1].right = rebuilt
+
+                return
+
+            node = parent
+            size = parent_size
+
+class WeightBalancedTree(BinarySearchTree):
+    """A self-balancing binary search tree kept balanced by subtree sizes.
+    The size of each subtree, plus one, is its weight, and neither child of a
+    node may weigh more than delta times its sibling. The size every
+    FastSizedBinaryNode already keeps for len, select and rank is the only
+    balance information, so this tree costs no more per node than an
+    unbalanced BinarySearchTree while keeping O(log n) height. delta = 3 with
+    gamma = 2, which picks single or double rotations, is the standard
+    parameter pair known to keep the balance invariant.
+    """
+
+    delta = 3
+    gamma = 2
+    _streaming_load = False
+
+    def _delete_node(self, node):
+        self._rebalance(self._remove(node))
+
+    def _inserted(self, node):
+        self._rebalance(node.parent)
+
+    def _rebalance(self, node):
+        """Restore weight balance on the path from node up to the root."""
+        delta = self.delta
+        gamma = self.gamma
+        weight = self._weight
+        while node is not None:
+            left = weight(node.left)
+            right = weight(node.right)
+            if right > delta * left:
+                child = node.right
+                if weight(child.left) >= gamma * weight(child.right):
+                    self._rotate_right(child)
+
+                node = self._rotate_left(node)
+
+            elif left > delta * right:
+                child = node.left
+                if weight(child.right) >= gamma * weight(child.left):
+                    self._rotate_left(child)
+
+                node = self._rotate_right(node)
+
+            node = node.parent
+
+    @staticmethod
+    def _weight(node):
+        return node.size + 1 if node is not None else 1
+
+class VanEmdeBoasNode(object):
+    """One level of a VanEmdeBoasTree over a universe of 2 ** bits keys.
+
+    Attributes:
+        min:
+            the least key at this level, which is not stored in any cluster,
+            or None when the level is empty.
+
+        max:
+            the greatest key at this level.
+
+        summary:
+            a VanEmdeBoasNode over the high halves of the keys which have a
+            cluster, or None when there are no clusters.
+
+        clusters:
+            a dict from the high half of keys to the VanEmdeBoasNode holding
+            their low halves. Clusters exist only while they hold keys.
+    """
+
+    __slots__ = ('min', 'max', 'summary', 'clusters')
+
+    def __init__(self):
+        self.min = None
+        self.max = None
+        self.summary = None
+        self.clusters = {}
+
+class VanEmdeBoasTree(object):
+    """A set of integer keys from 0 to 2 ** bits - 1 with O(log log U)
+    operations, where U = 2 ** bits is the size of the universe.
+    Each level splits a key into a high half, which picks a cluster, and a low
+    half, which is stored in that cluster, so a 32 bit key passes through only
+    five levels. Membership, insert, delete, successor and predecessor each
+    recurse into at most one cluster or summary per level. Clusters are kept
+    in dicts and created only when a key first lands in them, so memory grows
+    with the number of keys rather than with the size of the universe.
+    """
+
+    key_err = 'keys must be integers from 0 to 2 ** bits - 1'
+
+    def __contains__(self, key):
+        node = self.root
+        bits = self.bits
+        if not isinstance(key, int) or not 0 <= key < 1 << bits:
+            return False
+
+        while True:
+            if key == node.min or key == node.max:
+                return True
+
+            if bits == 1 or node.min is None:
+                return False
+
+            low_bits = bits >> 1
+            node = node.clusters.get(key >> low_bits)
+            if node is None:
+                return False
+
+            key &= (1 << low_bits) - 1
+            bits = low_bits
+
+    def __init__(self, bits = 32):
+        if bits < 1:
+            raise ValueError('bits must be at least 1')
+
+        self.bits = bits
+        self.root = VanEmdeBoasNode()
+        self.length = 0
+
+    def __iter__(self):
+        key = self.root.min
+        while key is not None:
+            yield key
+            key = self.successor(key)
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def maximum(self):
+        """The greatest key, or None when the tree is empty"""
+        return self.root.max
+
+    @property
+    def minimum(self):
+        """The least key, or None when the tree is empty"""
+        return self.root.min
+
+    def delete(self, key):
+        """Remove key, raising KeyError if it is not present."""
+        if key not in self:
+            raise KeyError(key)
+
+        self._delete(self.root, key, self.bits)
+        self.length -= 1
+
+    def insert(self, key):
+        """Add key, doing nothing if it is already present."""
+        if not isinstance(key, int) or not 0 <= key < 1 << self.bits:
+            raise ValueError(self.key_err)
+
+        if key not in self:
+            self._insert(self.root, key, self.bits)
+            self.length += 1
+
+    def predecessor(self, key):
+        """Return the greatest key less than key, or None."""
+        if key <= 0:
+            return None
+
+        return self._predecessor(self.root, min(key, 1 << self.bits), self.bits)
+
+    def successor(self, key):
+        """Return the least key greater than key, or None."""
+        if key < 0:
+            return self.root.min
+
+        if key >= (1 << self.bits) - 1:
+            return None
+
+        return self._successor(self.root, key, self.bits)
+
+    def update(self, iterable):
+        """Insert every key of the iterable."""
+        for key in iterable:
+            self.insert(key)
+
+    def _delete(self, node, key, bits):
+        if node.min == node.max:
+            node.min = node.max = None
+            return
+
+        if bits == 1:
+            node.min = node.max = 1 - key
+            return
+
+        low_bits = bits >> 1
+        if key == node.min:
+            # Pull the least clustered key up to replace the minimum
+            high = node.summary.min
+            key = (high << low_bits) | node.clusters[high].min
+            node.min = key
+
+        high = key >> low_bits
+        cluster = node.clusters[high]
+        self._delete(cluster, key & ((1 << low_bits) - 1), low_bits)
+        if cluster.min is None:
+            del node.clusters[high]
+            self._delete(node.summary, high, bits - low_bits)
+            if node.summary.min is None:
+                node.summary = None
+
+            if key == node.max:
+                if node.summary is None:
+                    node.max = node.min
+
+                else:
+                    high = node.summary.max
+                    node.max = (high << low_bits) | node.clusters[high].max
+
+        elif key == node.max:
+            node.max = (high << low_bits) | cluster.max
+
+    def _insert(self, node, key, bits):
+        if node.min is None:
+            node.min = node.max = key
+            return
+
+        if key < node.min:
+            key, node.min = node.min, key
+
+        if bits > 1:
+            low_bits = bits >> 1
+            high = key >> low_bits
+            low = key & ((1 << low_bits) - 1)
+            cluster = node.clusters.get(high)
+            if cluster is None:
+                cluster = node.clusters[high] = VanEmdeBoasNode()
+                cluster.min = cluster.max = low
+                if node.summary is None:
+                    node.summary = VanEmdeBoasNode()
+
+                self._insert(node.summary, high, bits - low_bits)
+
+            else:
+                self._insert(cluster, low, low_bits)
+
+        if key > node.max:
+            node.max = key
+
+    def _predecessor(self, node, key, bits):
+        if node.min is None or key <= node.min:
+            return None
+
+        if key > node.max:
+            return node.max
+
+        if bits == 1:
+            return node.min
+
+        low_bits = bits >> 1
+        high = key >> low_bits
+        low = key & ((1 << low_bits) - 1)
+        cluster = node.clusters.get(high)
+        if cluster is not None and low > cluster.min:
+            return (high << low_bits) | self._predecessor(cluster,
+                                                          low,
+                                                          low_bits,
+                                                         )
+
+        if node.summary is not None:
+            high = self._predecessor(node.summary, high, bits - low_bits)
+            if high is not None:
+                return (high << low_bits) | node.clusters[high].max
+
+        return node.min
+
+    def _successor(self, node, key, bits):
+        if node.min is None or key >= node.max:
+            return None
+
+        if key < node.min:
+            return node.min
+
+        if bits == 1:
+            return node.max
+
+        low_bits = bits >> 1
+        high = key >> low_bits
+        low = key & ((1 << low_bits) - 1)
+        cluster = node.clusters.get(high)
+        if cluster is not None and low < cluster.max:
+            return (high << low_bits) | self._successor(cluster,
+                                                        low,
+                                                        low_bits,
+                                                       )
+
+        high = self._successor(node.summary, high, bits - low_bits)
+        return (high << low_bits) | node.clusters[high].min
+
+class RopeNode(object):
+    """A node of a Rope, which is never changed once it has been built.
+    Because nodes are immutable, ropes and the ropes split from them can share
+    whole subtrees without copying any text.
+
+    Attributes:
+        left, right:
+            the two subtrees of an inner node, both None for a leaf.
+
+        chunk:
+            the str or bytes held by a leaf, None for an inner node.
+
+        length:
+            the number of characters or bytes below this node.
+
+        height:
+            1 for a leaf, otherwise one more than the taller subtree.
+    """
+
+    __slots__ = ('left', 'right', 'chunk', 'length', 'height')
+
+    def __init__(self, left = None, right = None, chunk = None):
+        self.left = left
+        self.right = right
+        self.chunk = chunk
+        if chunk is not None:
+            self.length = len(chunk)
+            self.height = 1
+
+        else:
+            self.length = left.length + right.length
+            self.height = max(left.height, right.height) + 1
+
+class Rope(object):
+    """A mutable sequence of text or bytes held as a balanced tree of chunks.
+    Leaves hold str or bytes chunks of at most chunk_size items, and inner
+    nodes are kept AVL balanced, so indexing, concatenation, split, insert and
+    delete all take O(log n) steps and copy at most a couple of chunks,
+    however large the rope grows. The full string is only built when it is
+    asked for, through flatten, str or bytes. chunks streams the text instead,
+    so a rope can be written to a file without ever being joined.
+    """
+
+    type_err = 'a rope holds only str or only bytes'
+
+    def __add__(self, other):
+        rope = self.copy()
+        rope.append(other)
+        return rope
+
+    def __bytes__(self):
+        return bytes(self.flatten())
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError('ropes only delete contiguous slices')
+
+            self.delete(start, stop)
+
+        else:
+            index = self._index(index)
+            self.delete(index, index + 1)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return self.flatten()[index]
+
+            rope = self.__class__(self.type(), self.chunk_size)
+            rope.root = self._slice(self.root, start, stop)
+            return rope
+
+        index = self._index(index)
+        node = self.root
+        while node.chunk is None:
+            if index < node.left.length:
+                node = node.left
+
+            else:
+                index -= node.left.length
+                node = node.right
+
+        return node.chunk[index]
+
+    def __iadd__(self, other):
+        self.append(other)
+        return self
+
+    def __init__(self, data = '', chunk_size = 1024):
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be at least 1')
+
+        self.chunk_size = chunk_size
+        self.type = str if isinstance(data, str) else bytes
+        data = self._coerce(data, self.type)
+        self.root = self._build(data)
+
+    def __iter__(self):
+        for chunk in self.chunks():
+            yield from chunk
+
+    def __len__(self):
+        return 0 if self.root is None else self.root.length
+
+    def __radd__(self, other):
+        rope = self.__class__(other, self.chunk_size)
+        rope.append(self)
+        return rope
+
+    def __str__(self):
+        if self.type is str:
+            return self.flatten()
+
+        return object.__str__(self)
+
+    def append(self, data):
+        """Add data, a str, bytes or Rope, to the end of this rope."""
+        self.root = self._join(self.root, self._tree(data))
+
+    def chunks(self, start = 0, stop = None):
+        """Yield the text from start to stop as a series of chunks.
+        Only the chunks at either end are sliced, every other chunk is yielded
+        as it is stored.
+        """
+        start, stop, _ = slice(start, stop).indices(len(self))
+        stack = [(self.root, 0)] if self.root is not None else []
+        while stack:
+            node, offset = stack.pop()
+            if offset >= stop or offset + node.length <= start:
+                continue
+
+            if node.chunk is not None:
+                if start <= offset and offset + node.length <= stop:
+                    yield node.chunk
+
+                else:
+                    yield node.chunk[max(start - offset, 0):stop - offset]
+
+            else:
+                stack.append((node.right, offset + node.left.length))
+                stack.append((node.left, offset))
+
+    def copy(self):
+        """Return a new rope with the same text, sharing every node."""
+        rope = self.__class__(self.type(), self.chunk_size)
+        rope.root = self.root
+        return rope
+
+    def delete(self, start, stop):
+        """Remove the text from start to stop."""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if start < stop:
+            left, rest = self._split(self.root, start)
+            _, right = self._split(rest, stop - start)
+            self.root = self._join(left, right)
+
+    def flatten(self):
+        """Return the whole text as a single str or bytes."""
+        return self.type().join(self.chunks())
+
+    def insert(self, index, data):
+        """Insert data, a str, bytes or Rope, before index."""
+        index, _, _ = slice(index, None).indices(len(self))
+        left, right = self._split(self.root, index)
+        self.root = self._join(self._join(left, self._tree(data)), right)
+
+    def split(self, index):
+        """Move the text from index onwards into a new rope.
+        The new rope is returned and this rope keeps the text before index.
+        """
+        index, _, _ = slice(index, None).indices(len(self))
+        rope = self.__class__(self.type(), self.chunk_size)
+        self.root, rope.root = self._split(self.root, index)
+        return rope
+
+    def _balance(self, left, right):
+        """Join two subtrees whose heights differ by at most two."""
+        if left.height > right.height + 1:
+            if left.left.height >= left.right.height:
+                return RopeNode(left.left, RopeNode(left.right, right))
+
+            middle = left.right
+            return RopeNode(RopeNode(left.left, middle.left),
+                            RopeNode(middle.right, right),
+                           )
+
+        if right.height > left.height + 1:
+            if right.right.height >= right.left.height:
+                return RopeNode(RopeNode(left, right.left), right.right)
+
+            middle = right.left
+            return RopeNode(RopeNode(left, middle.left),
+                            RopeNode(middle.right, right.right),
+                           )
+
+        return RopeNode(left, right)
+
+    def _build(self, data):
+        """Return a balanced tree of chunks holding data."""
+        size = self.chunk_size
+        leaves = [RopeNode(chunk = data[i:i + size])
+                  for i in range(0, len(data), size)]
+        while len(leaves) > 1:
+            pairs = [RopeNode(leaves[i], leaves[i + 1])
+                     for i in range(0, len(leaves) - 1, 2)]
+            if len(leaves) % 2:
+                pairs[-1] = self._balance(pairs[-1], leaves[-1])
+
+            leaves = pairs
+
+        return leaves[0] if leaves else None
+
+    def _coerce(self, data, kind):
+        if isinstance(data, (bytearray, memoryview)):
+            data = bytes(data)
+
+        if not isinstance(data, (str, bytes)) or type(data) is not kind:
+            raise TypeError(self.type_err)
+
+        return data
+
+    def _index(self, index):
+        if index < 0:
+            index += len(self)
+
+        if not 0 <= index < len(self):
+            raise IndexError('rope index out of range')
+
+        return index
+
+    def _join(self, left, right):
+        """Concatenate two trees, merging small neighbouring leaves."""
+        if left is None:
+            return right
+
+        if right is None:
+            return left
+
+        if left.height > right.height + 1:
+            return self._balance(left.left, self._join(left.right, right))
+
+        if right.height > left.height + 1:
+            return self._balance(self._join(left, right.left), right.right)
+
+        size = self.chunk_size
+        if right.chunk is not None:
+            if left.chunk is not None:
+                if left.length + right.length <= size:
+                    return RopeNode(chunk = left.chunk + right.chunk)
+
+            elif (left.right.chunk is not None and
+                  left.right.length + right.length <= size):
+                return RopeNode(left.left,
+                                RopeNode(chunk = left.right.chunk +
+                                                 right.chunk),
+                               )
+
+        elif (left.chunk is not None and right.left.chunk is not None and
+              left.length + right.left.length <= size):
+            return RopeNode(RopeNode(chunk = left.chunk + right.left.chunk),
+                            right.right,
+                           )
+
+        return RopeNode(left, right)
+
+    def _slice(self, node, start, stop):
+        """Return the tree holding the text from start to stop below node."""
+        if node is None or start >= stop:
+            return None
+
+        if start <= 0 and stop >= node.length:
+            return node
+
+        if node.chunk is not None:
+            return RopeNode(chunk = node.chunk[start:stop])
+
+        middle = node.left.length
+        if stop <= middle:
+            return self._slice(node.left, start, stop)
+
+        if start >= middle:
+            return self._slice(node.right, start - middle, stop - middle)
+
+        return self._join(self._slice(node.left, start, middle),
+                          self._slice(node.right, 0, stop - middle),
+                         )
+
+    def _split(self, node, index):
+        """Split the tree below node into the text before index and after."""
+        if node is None:
+            return None, None
+
+        if index <= 0:
+            return None, node
+
+        if index >= node.length:
+            return node, None
+
+        if node.chunk is not None:
+            return (RopeNode(chunk = node.chunk[:index]),
+                    RopeNode(chunk = node.chunk[index:]),
+                   )
+
+        middle = node.left.length
+        if index < middle:
+            left, right = self._split(node.left, index)
+            return left, self._join(right, node.right)
+
+        left, right = self._split(node.right, index - middle)
+        return self._join(node.left, left), right
+
+    def _tree(self, data):
+        """Return the tree for data, a str, bytes or Rope, to be added."""
+        if isinstance(data, Rope):
+            if data.root is not None and data.type is not self.type:
+                raise TypeError(self.type_err)
+
+            return data.root
+
+        return self._build(self._coerce(data, self.type))
+
+class ThreadedNode(FastSizedBinaryNode):
+    """A FastSizedBinaryNode which also links to its in-order neighbours.
+    successor and predecessor are the threads of a ThreadedBinaryTree, the
+    nodes which come directly after and before this one in order, or None at
+    either end.
+    """
+
+    __slots__ = ('successor', 'predecessor')
+
+    def __init__(self, data = None, right = None, left = None, parent = None):
+        super().__init__(data, right, left, parent)
+        self.successor = None
+        self.predecessor = None
+
+class ThreadedCursor(object):
+    """A resumable iterator over a range of a ThreadedBinaryTree.
+    The cursor holds only the next node to visit and the bound to stop at, so
+    it can be put aside after any number of steps and carried on later in O(1).
+    Each step follows a single thread, without a stack or any allocation.
+    Elements inserted into the tree ahead of the cursor are seen by it, but
+    deleting the element the cursor will visit next may leave it to be visited
+    once more.
+    """
+
+    def __init__(self, node, bound = None, reverse = False):
+        self.node = node
+        self.bound = bound
+        self.reverse = reverse
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        node = self.node
+        if node is None:
+            raise StopIteration
+
+        data = node.data
+        bound = self.bound
+        if self.reverse:
+            if bound is not None and data < bound:
+                self.node = None
+                raise StopIteration
+
+            self.node = node.predecessor
+
+        else:
+            if bound is not None and bound < data:
+                self.node = None
+                raise StopIteration
+
+            self.node = node.successor
+
+        return data
+
+    def take(self, count):
+        """Return a list of up to count more elements, as one page of a scan."""
+        return list(islice(self, count))
+
+class ThreadedBinaryTree(BinarySearchTree):
+    """A binary search tree whose nodes are threaded in order.
+    Every node links to its in-order successor and predecessor, so iterating
+    in order, in either direction, takes one attribute lookup per element
+    instead of the stack of a plain traversal. The threads live in their own
+    slots rather than in empty child links, which leaves left and right with
+    their usual meaning for every inherited method. They are kept in step by
+    insert and delete and are not affected by rotations.
+
+    cursor returns a ThreadedCursor over a range of keys, which can be paused
+    and resumed. Like BinarySearchTree, this class does no balancing of its
+    own; from_sorted builds a balanced tree.
+    """
+
+    node_class = ThreadedNode
+
+    def __iter__(self):
+        if self.order != 'in':
+            return super().__iter__()
+
+        return self.cursor()
+
+    def __reversed__(self):
+        return self.cursor(reverse = True)
+
+    def cursor(self, low = None, high = None, reverse = False):
+        """Return a ThreadedCursor over the elements from low to high.
+        Both bounds are inclusive and either may be None to leave that end
+        open. A reversed cursor starts at high and walks down to low.
+        """
+        if reverse:
+            if high is None:
+                node = (self._last(self.root)
+                        if self.root is not None else None)
+
+            else:
+                node = self._floor_node(high)
+
+            return ThreadedCursor(node, low, True)
+
+        if low is None:
+            node = (self._first(self.root)
+                    if self.root is not None else None)
+
+        else:
+            node = self._ceiling_node(low)
+
+        return ThreadedCursor(node, high)
+
+    def nodes(self, order = None):
+        if (order or self.order) != 'in':
+            return super().nodes(order)
+
+        if self.root is None:
+            return self._threaded(None)
+
+        return self._threaded(self._first(self.root))
+
+    def range(self, low = None, high = None):
+        """Return a cursor over the elements from low to high inclusive."""
+        return self.cursor(low, high)
+
+    def _ceiling_node(self, key):
+        best = None
+        node = self.root
+        while node is not None:
+            if node.data < key:
+                node = node.right
+
+            else:
+                best = node
+                node = node.left
+
+        return best
+
+    def _floor_node(self, key):
+        best = None
+        node = self.root
+        while node is not None:
+            if key < node.data:
+                node = node.left
+
+            else:
+                best = node
+                node = node.right
+
+        return best
+
+    def _inserted(self, node):
+        parent = node.parent
+        if parent is not None:
+            if parent.left is node:
+                before, after = parent.predecessor, parent
+
+            else:
+                before, after = parent, parent.successor
+
+            node.predecessor = before
+            node.successor = after
+            if before is not None:
+                before.successor = node
+
+            if after is not None:
+                after.predecessor = node
+
+        super()._inserted(node)
+
+    def _loaded(self):
+        previous = None
+        for node in self._in_order(self.root):
+            node.predecessor = previous
+            if previous is not None:
+                previous.successor = node
+
+            previous = node
+
+        super()._loaded()
+
+    def _remove(self, node):
+        # The node which leaves the tree is the successor when node has two
+        # children. Its own threads are left in place for any cursor on it.
+        if node.left is not None and node.right is not None:
+            gone = node.successor
+
+        else:
+            gone = node
+
+        if gone.predecessor is not None:
+            gone.predecessor.successor = gone.successor
+
+        if gone.successor is not None:
+            gone.successor.predecessor = gone.predecessor
+
+        return super()._remove(node)
+
+    @staticmethod
+    def _threaded(node):
+        while node is not None:
+            yield node
+            node = node.successor
+
+class CartesianTree(object):
+    """A static binary tree over a sequence, heap ordered by value.
+    The root is the position of the least value, and the left and right
+    subtrees are the Cartesian trees of the values before and after it, so an
+    in-order walk gives back the positions in order. With reverse set, the
+    root holds the greatest value instead. Equal values keep the leftmost one
+    highest.
+
+    The tree is built in O(n) with a stack and kept in flat arrays: values
+    holds the sequence, which is used as it is when it is already an array,
+    and left and right hold the positions of the children of each position,
+    with NULL for no child. Built alongside the tree is a range minimum index:
+    for every position a bitmask records which earlier positions of its
+    64 element block are still on the stack, and a sparse table covers the
+    minimum of each block. query then finds the position of the least value
+    of any range in O(1), which is also the lowest common ancestor of the two
+    ends of the range. Apart from the values, the tree costs 16 or 24 bytes per
+    element and the sparse table well under one.
+    """
+
+    NULL = -1
+    block_bits = 6
+    range_err = 'query range must not be empty'
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def __init__(self, values = (), typecode = None, reverse = False):
+        if isinstance(values, array) and typecode is None:
+            self.values = values
+
+        elif typecode is not None:
+            self.values = array(typecode, values)
+
+        else:
+            self.values = list(values)
+
+        self.reverse = reverse
+        self._build()
+
+    def __len__(self):
+        return len(self.values)
+
+    def lowest_common_ancestor(self, first, second):
+        """Return the lowest common ancestor of two positions."""
+        if second < first:
+            first, second = second, first
+
+        return self.query(first, second + 1)
+
+    def query(self, start, stop):
+        """Return the position of the least value from start up to stop.
+        The range is a half open slice, like values[start:stop], and the
+        leftmost position wins ties. For a reverse tree it is the greatest
+        value instead.
+        """
+        start, stop, _ = slice(start, stop).indices(len(self.values))
+        if start >= stop:
+            raise ValueError(self.range_err)
+
+        stop -= 1
+        bits = self.block_bits
+        first = start >> bits
+        last = stop >> bits
+        masks = self.masks
+        if first == last:
+            return self._in_block(start, stop, masks[stop])
+
+        end = start | ((1 << bits) - 1)
+        best = self._in_block(start, end, masks[end])
+        values = self.values
+        better = self._better
+        if first + 1 < last:
+            level = (last - first - 1).bit_length() - 1
+            table = self.table[level]
+            for candidate in (table[first + 1], table[last - (1 << level)]):
+                if better(values[candidate], values[best]):
+                    best = candidate
+
+        candidate = self._in_block(last << bits, stop, masks[stop])
+        if better(values[candidate], values[best]):
+            best = candidate
+
+        return best
+
+    def query_value(self, start, stop):
+        """Return the least value from start up to stop."""
+        return self.values[self.query(start, stop)]
+
+    def _build(self):
+        """Link the tree and build the range index in one stack pass."""
+        values = self.values
+        count = len(values)
+        typecode = 'i' if count < 1 << 31 else 'q'
+        left = array(typecode, [self.NULL]) * count
+        right = array(typecode, [self.NULL]) * count
+        masks = array('Q', bytes(8 * count))
+        worse = operator.lt if self.reverse else operator.gt
+        self._better = operator.gt if self.reverse else operator.lt
+        bits = self.block_bits
+        block_mask = (1 << bits) - 1
+        stack = []
+        mask = 0
+        for i, value in enumerate(values):
+            offset = i & block_mask
+            if not offset:
+                mask = 0
+
+            last = self.NULL
+            while stack and worse(values[stack[-1]], value):
+                last = stack.pop()
+                if last >> bits == i >> bits:
+                    mask ^= 1 << (last & block_mask)
+
+            left[i] = last
+            if stack:
+                right[stack[-1]] = i
+
+            stack.append(i)
+            mask |= 1 << offset
+            masks[i] = mask
+
+        self.left = left
+        self.right = right
+        self.masks = masks
+        self.root = stack[0] if stack else self.NULL
+        ends = (min(i | block_mask, count - 1)
+                for i in range(0, count, 1 << bits))
+        blocks = array(typecode, (self._in_block(end & ~block_mask,
+                                                 end,
+                                                 masks[end],
+                                                )
+                                  for end in ends))
+        self.table = [blocks]
+        better = self._better
+        span = 1
+        while 2 * span <= len(blocks):
+            previous = self.table[-1]
+            level = array(typecode, previous[:len(previous) - span])
+            for i in range(len(level)):
+                other = previous[i + span]
+                if better(values[other], values[level[i]]):
+                    level[i] = other
+
+            self.table.append(level)
+            span *= 2
+
+    def _in_block(self, start, stop, mask):
+        """Return the best position from start to stop inclusive, which are
+        in one block, given the stack mask at stop.
+        """
+        mask >>= start & ((1 << self.block_bits) - 1)
+        return start + (mask & -mask).bit_length() - 1
+
+class LinkCutNode(FastBiBinaryNode):
+    """A vertex of a LinkCutTree and a node of the splay tree of its path.
+    data is the value of the vertex, and total and maximum are the sum and
+    greatest of the values in this node's splay subtree. flipped marks a
+    subtree whose left and right children are still to be swapped. parent is
+    either the splay tree parent or, for the root of a splay tree, the path
+    parent, which is the vertex the top of this path hangs from.
+    """
+
+    __slots__ = ('total', 'maximum', 'flipped')
+
+    def __init__(self, data = 0):
+        super().__init__(data)
+        self.total = data
+        self.maximum = data
+        self.flipped = False
+
+class LinkCutTree(object):
+    """A forest of vertices, addressed by index, under link and cut.
+    The forest is stored as a set of vertex disjoint paths, each held in a
+    splay tree keyed by depth. Accessing a vertex splices the path from it to
+    the root of its tree into one splay tree, after which connectivity and
+    the sum or greatest value along the path can be read off a single node.
+    Any vertex can be made the root by reversing its path, so edges have no
+    direction. link, cut, connected, path_sum and path_max each take
+    O(log n) amortized time.
+    """
+
+    connected_err = 'vertices are already connected'
+    edge_err = 'vertices are not joined by an edge'
+    path_err = 'vertices are not connected'
+
+    def __getitem__(self, index):
+        return self.vertices[index].data
+
+    def __init__(self, values = ()):
+        self.vertices = [LinkCutNode(value) for value in values]
+
+    def __len__(self):
+        return len(self.vertices)
+
+    def __setitem__(self, index, value):
+        node = self.vertices[index]
+        self._access(node)
+        node.data = value
+        self._update(node)
+
+    def add(self, value = 0):
+        """Add a new vertex with no edges and return its index."""
+        self.vertices.append(LinkCutNode(value))
+        return len(self.vertices) - 1
+
+    def connected(self, first, second):
+        """Return whether two vertices are in the same tree."""
+        first = self.vertices[first]
+        second = self.vertices[second]
+        return first is second or self._root(first) is self._root(second)
+
+    def cut(self, first, second):
+        """Remove the edge between two vertices."""
+        first = self.vertices[first]
+        second = self.vertices[second]
+        self._evert(first)
+        self._access(second)
+        if second.left is not first:
+            raise ValueError(self.edge_err)
+
+        self._push(first)
+        if first.right is not None:
+            raise ValueError(self.edge_err)
+
+        second.left = None
+        first.parent = None
+        self._update(second)
+
+    def link(self, first, second):
+        """Join two vertices of different trees with an edge."""
+        first = self.vertices[first]
+        second = self.vertices[second]
+        self._evert(first)
+        if first is second or self._root(second) is first:
+            raise ValueError(self.connected_err)
+
+        first.parent = second
+
+    def path_max(self, first, second):
+        """Return the greatest vertex value on the path between two vertices."""
+        return self._path(first, second).maximum
+
+    def path_sum(self, first, second):
+        """Return the sum of the vertex values on the path between two
+        vertices, including both ends.
+        """
+        return self._path(first, second).total
+
+    def _access(self, node):
+        """Make the path from the root to node preferred, ending at node, and
+        splay node to the top of its splay tree.
+        """
+        last = None
+        top = node
+        while top is not None:
+            self._splay(top)
+            top.right = last
+            self._update(top)
+            last = top
+            top = top.parent
+
+        self._splay(node)
+
+    def _evert(self, node):
+        """Make node the root of its tree by reversing its root path."""
+        self._access(node)
+        node.flipped = not node.flipped
+
+    def _path(self, first, second):
+        """Return the node whose splay tree holds exactly the path between
+        two vertices.
+        """
+        first = self.vertices[first]
+        second = self.vertices[second]
+        self._evert(first)
+        if first is not second and self._root(second) is not first:
+            raise ValueError(self.path_err)
+
+        self._access(second)
+        return second
+
+    @staticmethod
+    def _push(node):
+        if node.flipped:
+            node.left, node.right = node.right, node.left
+            if node.left is not None:
+                node.left.flipped = not node.left.flipped
+
+            if node.right is not None:
+                node.right.flipped = not node.right.flipped
+
+            node.flipped = False
+
+    def _root(self, node):
+        self._access(node)
+        self._push(node)
+        while node.left is not None:
+            node = node.left
+            self._push(node)
+
+        self._splay(node)
+        return node
+
+    @staticmethod
+    def _rotate(node):
+        parent = node.parent
+        grandparent = parent.parent
+        if grandparent is not None:
+            if grandparent.left is parent:
+                grandparent.left = node
+
+            elif grandparent.right is parent:
+                grandparent.right = node
+
+        node.parent = grandparent
+        if parent.left is node:
+            parent.left = node.right
+            if node.right is not None:
+                node.right.parent = parent
+
+            node.right = parent
+
+        else:
+            parent.right = node.left
+            if node.left is not None:
+                node.left.parent = parent
+
+            node.left = parent
+
+        parent.parent = node
+        LinkCutTree._update(parent)
+        LinkCutTree._update(node)
+
+    def _splay(self, node):
+        # Push pending flips down from the top of the splay tree first, so
+        # every rotation sees true left and right children
+        path = [node]
+        top = node
+        while not self._splay_root(top):
+            top = top.parent
+            path.append(top)
+
+        for top in reversed(path):
+            self._push(top)
+
+        rotate = self._rotate
+        while not self._splay_root(node):
+            parent = node.parent
+            if not self._splay_root(parent):
+                grandparent = parent.parent
+                if (grandparent.left is parent) == (parent.left is node):
+                    rotate(parent)
+
+                else:
+                    rotate(node)
+
+            rotate(node)
+
+    @staticmethod
+    def _splay_root(node):
+        parent = node.parent
+        return parent is None or (parent.left is not node and
+                                  parent.right is not node)
+
+    @staticmethod
+    def _update(node):
+        total = maximum = node.data
+        for child in (node.left, node.right):
+            if child is not None:
+                total += child.total
+                if child.maximum > maximum:
+                    maximum = child.maximum
+
+        node.total = total
+        node.maximum = maximum
+
+class TTree(AVLTree):
+    """An AVL tree whose nodes each hold a sorted run of up to capacity keys.
+    Most of a lookup is spent in the few hops down to the node whose first and
+    last keys bound the key, after which bisect finishes the search in C. The
+    keys of a node are kept in a list, or in an array when a typecode is
+    given, which packs numbers without a Python object each. A full node
+    passes its least key down to the greatest node of its left subtree. When
+    a delete leaves a node with two children under half full, it borrows
+    back from that node, and a leaf which fits into its parent is merged
+    into it.
+
+    size counts keys rather than nodes, so len(), indexing, rank and delete_at
+    work on keys, while nodes() and select() give the nodes themselves.
+    """
+
+    capacity_err = 'capacity must be at least 2'
+
+    def __getitem__(self, index):
+        node, offset = self._locate(index)
+        return node.data[offset]
+
+    def __init__(self, data = None, order = 'in', capacity = 32,
+                 typecode = None):
+        if capacity < 2:
+            raise ValueError(self.capacity_err)
+
+        self.capacity = capacity
+        self.min_fill = capacity // 2
+        self.typecode = typecode
+        super().__init__(data, order)
+
+    def __iter__(self):
+        for node in self.nodes(self.order):
+            yield from node.data
+
+    def ceiling(self, key):
+        """Return the smallest key greater than or equal to key, or None."""
+        best = None
+        node = self.root
+        while node is not None:
+            data = node.data
+            if data[-1] < key:
+                node = node.right
+
+            elif key <= data[0]:
+                best = data[0]
+                node = node.left
+
+            else:
+                return data[bisect_left(data, key)]
+
+        return best
+
+    def delete(self, key):
+        """Remove one key equal to key, raising KeyError if there is none."""
+        node = self.search(key)
+        if node is None:
+            raise KeyError(key)
+
+        data = node.data
+        del data[bisect_left(data, key)]
+        self._shrunk(node)
+
+    def delete_at(self, index):
+        """Remove the key at an in-order position and return it."""
+        node, offset = self._locate(index)
+        key = node.data.pop(offset)
+        self._shrunk(node)
+        return key
+
+    def floor(self, key):
+        """Return the greatest key less than or equal to key, or None."""
+        best = None
+        node = self.root
+        while node is not None:
+            data = node.data
+            if key < data[0]:
+                node = node.left
+
+            elif data[-1] <= key:
+                best = data[-1]
+                node = node.right
+
+            else:
+                return data[bisect_right(data, key) - 1]
+
+        return best
+
+    def insert(self, key):
+        """Add key to the tree and return the node which holds it."""
+        node = self.root
+        if node is None:
+            self.root = self.node_class(self._keys((key,)))
+            return self.root
+
+        while True:
+            data = node.data
+            if key < data[0]:
+                if node.left is None:
+                    break
+
+                node = node.left
+
+            elif data[-1] < key:
+                if node.right is None:
+                    break
+
+                node = node.right
+
+            else:
+                i = bisect_right(data, key)
+                data.insert(i, key)
+                if len(data) <= self.capacity:
+                    self._grow(node, 1)
+                    return node
+
+                # Pass the least key down to the greatest node on the left
+                holder = self._insert_last(node.left, node, data.pop(0))
+                return holder if i == 0 else node
+
+        if len(data) < self.capacity:
+            if key < data[0]:
+                data.insert(0, key)
+
+            else:
+                data.append(key)
+
+            self._grow(node, 1)
+            return node
+
+        new = self.node_class(self._keys((key,)))
+        if key < data[0]:
+            node.left = new
+
+        else:
+            node.right = new
+
+        new.parent = node
+        self._rebalance(node)
+        return new
+
+    def position(self, node):
+        """Return the in-order position of the first key of a node."""
+        left = node.left
+        index = left.size if left is not None else 0
+        parent = node.parent
+        while parent is not None:
+            if node is parent.right:
+                left = parent.left
+                index += len(parent.data)
+                if left is not None:
+                    index += left.size
+
+            node = parent
+            parent = node.parent
+
+        return index
+
+    def range(self, low = None, high = None):
+        """Return a generator over the keys from low to high inclusive."""
+        stack = []
+        node = self.root
+        while stack or node is not None:
+            while node is not None:
+                if low is not None and node.data[-1] < low:
+                    node = node.right
+
+                else:
+                    stack.append(node)
+                    node = node.left
+
+            if not stack:
+                return
+
+            node = stack.pop()
+            data = node.data
+            start = 0
+            if low is not None and data[0] < low:
+                start = bisect_left(data, low)
+
+            if high is not None and high < data[-1]:
+                yield from islice(data, start, bisect_right(data, high))
+                return
+
+            yield from islice(data, start, None)
+            node = node.right
+
+    def rank(self, item):
+        """Return the number of keys less than item in O(height)."""
+        rank = 0
+        node = self.root
+        while node is not None:
+            data = node.data
+            if item <= data[0]:
+                node = node.left
+
+            else:
+                if node.left is not None:
+                    rank += node.left.size
+
+                if data[-1] < item:
+                    rank += len(data)
+                    node = node.right
+
+                else:
+                    return rank + bisect_left(data, item)
+
+        return rank
+
+    def search(self, key):
+        """Return a node holding a key equal to key, or None."""
+        node = self.root
+        while node is not None:
+            data = node.data
+            if key < data[0]:
+                node = node.left
+
+            elif data[-1] < key:
+                node = node.right
+
+            else:
+                i = bisect_left(data, key)
+                return node if data[i] == key else None
+
+        return None
+
+    def select(self, index):
+        """Return the node holding the key at an in-order position."""
+        return self._locate(index)[0]
+
+    def traverse(self, order = None):
+        """Return a generator over the keys of the nodes in the given order."""
+        return (key for node in self.nodes(order) for key in node.data)
+
+    def _build_balanced(self, items, count):
+        """Pack count sorted keys into as few nodes as possible, spread
+        evenly, and link the nodes into a balanced tree.
+        """
+        node_class = self.node_class
+        update = self._update
+
+        def build(nodes, keys):
+            if nodes == 0:
+                return None
+
+            left_nodes = nodes // 2
+            share, extra = divmod(keys, nodes)
+            left_keys = share * left_nodes + min(extra, left_nodes)
+            left = build(left_nodes, left_keys)
+            own = share + (extra > left_nodes)
+            node = node_class(self._keys(islice(items, own)))
+            if len(node.data) != own:
+                raise ValueError(self.count_err)
+
+            right = build(nodes - 1 - left_nodes, keys - left_keys - own)
+            node.left = left
+            node.right = right
+            if left is not None:
+                left.parent = node
+
+            if right is not None:
+                right.parent = node
+
+            update(node)
+            return node
+
+        return build(-(-count // self.capacity), count)
+
+    def _insert_last(self, node, parent, key):
+        """Add key after every key below node, the left child of parent, and
+        return the node which holds it.
+        """
+        if node is not None:
+            node = self._last(node)
+            if len(node.data) < self.capacity:
+                node.data.append(key)
+                self._rebalance(node)
+                return node
+
+            parent = node
+
+        new = self.node_class(self._keys((key,)))
+        if node is None:
+            parent.left = new
+
+        else:
+            parent.right = new
+
+        new.parent = parent
+        self._rebalance(parent)
+        return new
+
+    def _keys(self, items):
+        """Return a new container of keys for a node."""
+        if self.typecode is None:
+            return list(items)
+
+        return array(self.typecode, items)
+
+    def _locate(self, index):
+        """Return the node holding an in-order position and the offset of
+        the position within it.
+        """
+        size = len(self)
+        if index < 0:
+            index += size
+
+        if not 0 <= index < size:
+            raise IndexError('tree index out of range')
+
+        node = self.root
+        while True:
+            left = node.left
+            left_size = left.size if left is not None else 0
+            if index < left_size:
+                node = left
+                continue
+
+            index -= left_size
+            if index < len(node.data):
+                return node, index
+
+            index -= len(node.data)
+            node = node.right
+
+    def _shrunk(self, node):
+        """Restore the fill rules after a key was taken out of node."""
+        if node.left is not None and node.right is not None:
+            if len(node.data) >= self.min_fill:
+                self._grow(node, -1)
+                return
+
+            donor = self._last(node.left)
+            node.data.insert(0, donor.data.pop())
+            node = donor
+
+        if not node.data:
+            child = node.left if node.left is not None else node.right
+            parent = node.parent
+            self._replace(node, child)
+            node.parent = node.left = node.right = None
+            self._rebalance(parent)
+            return
+
+        child = node.left if node.left is not None else node.right
+        if (child is not None and
+            child.left is None and child.right is None and
+            len(node.data) + len(child.data) <= self.capacity):
+            if child is node.left:
+                node.data = child.data + node.data
+
+            else:
+                node.data += child.data
+
+            node.left = node.right = child.parent = None
+
+        self._rebalance(node)
+
+    @staticmethod
+    def _update(node):
+        size = len(node.data)
+        height = 0
+        if node.left is not None:
+            size += node.left.size
+            height = node.left.height
+
+        if node.right is not None:
+            size += node.right.size
+            if node.right.height > height:
+                height = node.right.height
+
+        node.size = size
+        node.height = height + 1
+
+'''class AATree(RedBlackTree):
+    """A variation of the red-black tree in which red nodes can only be added to
+a right subchild"""
+
+    pass
+
+class SelfBalancingBinarySearchTree(): #a group of trees, consisting of aa, avl, r/b. scape, splay, treap
+    pass
+
+class TangoTree(): #needs more information
     pass
 '''
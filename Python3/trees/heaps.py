@@ -24,3 +24,1199 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
+
+import heapq
+from array import array
+from itertools import count
+from structs.nodes import FastNode
+
+class DaryHeap(object):
+    """A min-heap of arity children per node, kept in one flat sequence.
+    The children of the entry at index i are at arity * i + 1 up to
+    arity * (i + 1), so there are no node objects and a heap of typed
+    numbers can live in an array of the given typecode. A wider heap is
+    shallower, so a push climbs fewer levels, while a pop compares more
+    children on each level on the way down, with min over a slice of them
+    in C.
+
+    With a key, each item is kept in a (key, n, item) tuple, where n counts
+    the pushes, so the key is worked out once per push and ties are broken
+    in push order without comparing the items themselves.
+    """
+
+    arity_err = 'arity must be at least 2'
+    empty_err = 'heap is empty'
+    typecode_err = 'a heap with a key cannot use a typecode'
+
+    def __bool__(self):
+        return bool(self.heap)
+
+    def __init__(self, items = (), arity = 4, key = None, typecode = None):
+        if arity < 2:
+            raise ValueError(self.arity_err)
+
+        if key is not None and typecode is not None:
+            raise ValueError(self.typecode_err)
+
+        self.arity = arity
+        self.key = key
+        self.typecode = typecode
+        self._counter = count()
+        if typecode is not None:
+            self.heap = array(typecode, items)
+
+        else:
+            self.heap = self._entries(items)
+
+        self._heapify()
+
+    def __len__(self):
+        return len(self.heap)
+
+    def clear(self):
+        """Remove every item."""
+        del self.heap[:]
+
+    def extend(self, items):
+        """Push every item of items, heapifying again if there are many."""
+        heap = self.heap
+        start = len(heap)
+        if self.typecode is not None:
+            heap.extend(items)
+
+        else:
+            heap += self._entries(items)
+
+        added = len(heap) - start
+        if added * self.arity > len(heap):
+            self._heapify()
+
+        else:
+            for i in range(start, len(heap)):
+                self._sift_up(i)
+
+    def peek(self):
+        """Return the least item without removing it."""
+        if not self.heap:
+            raise IndexError(self.empty_err)
+
+        if self.key is None:
+            return self.heap[0]
+
+        return self.heap[0][2]
+
+    def pop(self):
+        """Remove and return the least item."""
+        heap = self.heap
+        if not heap:
+            raise IndexError(self.empty_err)
+
+        last = heap.pop()
+        if heap:
+            top = heap[0]
+            heap[0] = last
+            self._sift_down(0)
+
+        else:
+            top = last
+
+        return top if self.key is None else top[2]
+
+    def push(self, item):
+        """Add item to the heap."""
+        heap = self.heap
+        if self.key is None:
+            heap.append(item)
+
+        else:
+            heap.append((self.key(item), next(self._counter), item))
+
+        self._sift_up(len(heap) - 1)
+
+    def pushpop(self, item):
+        """Push item and then pop the least item, faster than doing both.
+        If item is no greater than the least item it comes straight back,
+        without touching the heap.
+        """
+        heap = self.heap
+        entry = item
+        if self.key is not None:
+            entry = (self.key(item), next(self._counter), item)
+
+        if heap and heap[0] < entry:
+            entry, heap[0] = heap[0], entry
+            self._sift_down(0)
+
+        return entry if self.key is None else entry[2]
+
+    def replace(self, item):
+        """Pop the least item and then push item, faster than doing both.
+        Unlike pushpop, the item returned may be greater than item.
+        """
+        heap = self.heap
+        if not heap:
+            raise IndexError(self.empty_err)
+
+        top = heap[0]
+        if self.key is None:
+            heap[0] = item
+
+        else:
+            heap[0] = (self.key(item), next(self._counter), item)
+
+        self._sift_down(0)
+        return top if self.key is None else top[2]
+
+    def _entries(self, items):
+        """Return a list of the entries to store for items."""
+        key = self.key
+        if key is None:
+            return list(items)
+
+        return [(key(item), n, item) for n, item in zip(self._counter, items)]
+
+    def _heapify(self):
+        """Restore the heap order of the whole heap in O(n)."""
+        for i in range((len(self.heap) - 2) // self.arity, -1, -1):
+            self._sift_down(i)
+
+    def _sift_down(self, i):
+        """Move the entry at i down past every child less than it."""
+        heap = self.heap
+        arity = self.arity
+        size = len(heap)
+        entry = heap[i]
+        first = arity * i + 1
+        while first < size:
+            children = heap[first:first + arity]
+            least = min(children)
+            if not least < entry:
+                break
+
+            heap[i] = least
+            i = first + children.index(least)
+            first = arity * i + 1
+
+        heap[i] = entry
+
+    def _sift_up(self, i):
+        """Move the entry at i up past every parent greater than it."""
+        heap = self.heap
+        arity = self.arity
+        entry = heap[i]
+        while i:
+            parent = (i - 1) // arity
+            above = heap[parent]
+            if not entry < above:
+                break
+
+            heap[i] = above
+            i = parent
+
+        heap[i] = entry
+
+class BinaryHeap(DaryHeap):
+    """A DaryHeap of two children per node.
+    When the entries are kept in a list, every operation is left to the C
+    functions of heapq, so this is heapq behind an object, with the key
+    mode and typed storage of DaryHeap on top.
+    """
+
+    def __init__(self, items = (), key = None, typecode = None):
+        super().__init__(items, 2, key, typecode)
+
+    def pop(self):
+        heap = self.heap
+        if self.typecode is not None:
+            return super().pop()
+
+        if not heap:
+            raise IndexError(self.empty_err)
+
+        top = heapq.heappop(heap)
+        return top if self.key is None else top[2]
+
+    def push(self, item):
+        if self.key is not None:
+            heapq.heappush(self.heap,
+                           (self.key(item), next(self._counter), item))
+
+        elif self.typecode is None:
+            heapq.heappush(self.heap, item)
+
+        else:
+            super().push(item)
+
+    def pushpop(self, item):
+        if self.typecode is not None:
+            return super().pushpop(item)
+
+        if self.key is None:
+            return heapq.heappushpop(self.heap, item)
+
+        return heapq.heappushpop(self.heap,
+                                 (self.key(item), next(self._counter),
+                                  item))[2]
+
+    def replace(self, item):
+        if self.typecode is not None:
+            return super().replace(item)
+
+        if not self.heap:
+            raise IndexError(self.empty_err)
+
+        if self.key is None:
+            return heapq.heapreplace(self.heap, item)
+
+        return heapq.heapreplace(self.heap,
+                                 (self.key(item), next(self._counter),
+                                  item))[2]
+
+    def _heapify(self):
+        if self.typecode is None:
+            heapq.heapify(self.heap)
+
+        else:
+            super()._heapify()
+
+class IndexedHeap(object):
+    """A min-heap of distinct hashable items, each with its own priority,
+    which can change or remove any item in O(log n).
+    The priorities and the items are kept in two flat lists, arranged as a
+    heap of arity children per node as in DaryHeap, and a dict maps each
+    item to its index so it can be found without a search. This avoids the
+    stale entries left behind when heapq is used with lazy deletion.
+    Only the priorities are compared, never the items.
+
+    items may be (item, priority) pairs or a mapping of items to priorities.
+    """
+
+    arity_err = 'arity must be at least 2'
+    duplicate_err = 'item is already in the heap'
+    empty_err = 'heap is empty'
+
+    def __bool__(self):
+        return bool(self.items)
+
+    def __contains__(self, item):
+        return item in self.positions
+
+    def __delitem__(self, item):
+        self.remove(item)
+
+    def __getitem__(self, item):
+        return self.priorities[self.positions[item]]
+
+    def __init__(self, items = (), arity = 4):
+        if arity < 2:
+            raise ValueError(self.arity_err)
+
+        self.arity = arity
+        if hasattr(items, 'items'):
+            items = items.items()
+
+        pairs = list(items)
+        self.items = [item for item, _ in pairs]
+        self.priorities = [priority for _, priority in pairs]
+        self.positions = {item: i for i, item in enumerate(self.items)}
+        if len(self.positions) != len(self.items):
+            raise ValueError(self.duplicate_err)
+
+        for i in range((len(self.items) - 2) // arity, -1, -1):
+            self._sift_down(i)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __setitem__(self, item, priority):
+        if item in self.positions:
+            self.update(item, priority)
+
+        else:
+            self.push(item, priority)
+
+    def get(self, item, default = None):
+        """Return the priority of item, or default if it is absent."""
+        i = self.positions.get(item)
+        return default if i is None else self.priorities[i]
+
+    def peek(self):
+        """Return the (item, priority) pair of least priority."""
+        if not self.items:
+            raise IndexError(self.empty_err)
+
+        return self.items[0], self.priorities[0]
+
+    def pop(self):
+        """Remove and return the (item, priority) pair of least priority."""
+        if not self.items:
+            raise IndexError(self.empty_err)
+
+        return self._take(0)
+
+    def push(self, item, priority):
+        """Add item with priority, raising ValueError if it is present."""
+        if item in self.positions:
+            raise ValueError(self.duplicate_err)
+
+        self.positions[item] = len(self.items)
+        self.items.append(item)
+        self.priorities.append(priority)
+        self._sift_up(len(self.items) - 1)
+
+    def remove(self, item):
+        """Remove item and return its priority, raising KeyError if it is
+        absent.
+        """
+        return self._take(self.positions[item])[1]
+
+    def update(self, item, priority):
+        """Change the priority of item, raising KeyError if it is absent."""
+        i = self.positions[item]
+        old = self.priorities[i]
+        self.priorities[i] = priority
+        if priority < old:
+            self._sift_up(i)
+
+        elif old < priority:
+            self._sift_down(i)
+
+    def _sift_down(self, i):
+        """Move the entry at i down past every child of lower priority."""
+        priorities = self.priorities
+        items = self.items
+        positions = self.positions
+        arity = self.arity
+        size = len(items)
+        priority = priorities[i]
+        item = items[i]
+        first = arity * i + 1
+        while first < size:
+            children = priorities[first:first + arity]
+            least = min(children)
+            if not least < priority:
+                break
+
+            child = first + children.index(least)
+            priorities[i] = least
+            moved = items[i] = items[child]
+            positions[moved] = i
+            i = child
+            first = arity * i + 1
+
+        priorities[i] = priority
+        items[i] = item
+        positions[item] = i
+
+    def _sift_up(self, i):
+        """Move the entry at i up past every parent of higher priority."""
+        priorities = self.priorities
+        items = self.items
+        positions = self.positions
+        arity = self.arity
+        priority = priorities[i]
+        item = items[i]
+        while i:
+            parent = (i - 1) // arity
+            above = priorities[parent]
+            if not priority < above:
+                break
+
+            priorities[i] = above
+            moved = items[i] = items[parent]
+            positions[moved] = i
+            i = parent
+
+        priorities[i] = priority
+        items[i] = item
+        positions[item] = i
+
+    def _take(self, i):
+        """Remove the entry at i and return its (item, priority) pair."""
+        items = self.items
+        priorities = self.priorities
+        item = items[i]
+        priority = priorities[i]
+        del self.positions[item]
+        last_item = items.pop()
+        last_priority = priorities.pop()
+        if i < len(items):
+            items[i] = last_item
+            priorities[i] = last_priority
+            self.positions[last_item] = i
+            if last_priority < priority:
+                self._sift_up(i)
+
+            else:
+                self._sift_down(i)
+
+        return item, priority
+
+class PairingHeapNode(FastNode):
+    """A node of a PairingHeap, and the handle of its item.
+
+    Attributes:
+        data:
+            the item.
+
+        key:
+            the priority of the item.
+
+        child:
+            the first child of the node, or None.
+
+        sibling:
+            the next child of the same parent, or None.
+
+        previous:
+            the previous child of the same parent, the parent for a first
+            child, or None for the root and for nodes no longer in a heap.
+    """
+
+    __slots__ = ('key', 'child', 'sibling', 'previous')
+
+    def __init__(self, data = None, key = None):
+        self.data = data
+        self.key = key
+        self.child = None
+        self.sibling = None
+        self.previous = None
+
+class PairingHeap(object):
+    """A mergeable min-heap held in a tree of any shape.
+    Two trees are linked by making the root of greater priority the first
+    child of the other, which is all that push, meld and decrease need, so
+    they run in O(1). pop removes the root and pairs up its children, left
+    to right and then back, taking O(log n) amortised.
+
+    push returns the node of the item, which is its handle for decrease.
+    A node must only be passed back to the heap it came from, while its
+    item is still in it.
+    """
+
+    decrease_err = 'priority is greater than the current one'
+    empty_err = 'heap is empty'
+    handle_err = 'node is not in a heap'
+
+    def __bool__(self):
+        return self.root is not None
+
+    def __init__(self, items = ()):
+        self.root = None
+        self.length = 0
+        if hasattr(items, 'items'):
+            items = items.items()
+
+        for item, priority in items:
+            self.push(item, priority)
+
+    def __len__(self):
+        return self.length
+
+    def decrease(self, node, priority):
+        """Lower the priority of the item of node."""
+        if node.key < priority:
+            raise ValueError(self.decrease_err)
+
+        if node is self.root:
+            node.key = priority
+            return
+
+        previous = node.previous
+        if previous is None:
+            raise ValueError(self.handle_err)
+
+        node.key = priority
+        sibling = node.sibling
+        if previous.child is node:
+            previous.child = sibling
+
+        else:
+            previous.sibling = sibling
+
+        if sibling is not None:
+            sibling.previous = previous
+
+        node.sibling = None
+        node.previous = None
+        self.root = self._link(self.root, node)
+
+    def meld(self, other):
+        """Move every item of other, another PairingHeap, into this one."""
+        self.root = self._link(self.root, other.root)
+        self.length += other.length
+        other.root = None
+        other.length = 0
+
+    def peek(self):
+        """Return the (item, priority) pair of least priority."""
+        if self.root is None:
+            raise IndexError(self.empty_err)
+
+        return self.root.data, self.root.key
+
+    def pop(self):
+        """Remove and return the (item, priority) pair of least priority."""
+        root = self.root
+        if root is None:
+            raise IndexError(self.empty_err)
+
+        link = self._link
+        pairs = []
+        node = root.child
+        while node is not None:
+            after = node.sibling
+            node.sibling = node.previous = None
+            if after is not None:
+                following = after.sibling
+                after.sibling = after.previous = None
+                node = link(node, after)
+                after = following
+
+            pairs.append(node)
+            node = after
+
+        merged = None
+        for node in reversed(pairs):
+            merged = link(node, merged)
+
+        self.root = merged
+        self.length -= 1
+        root.child = None
+        return root.data, root.key
+
+    def push(self, item, priority):
+        """Add item with priority and return its node."""
+        node = PairingHeapNode(item, priority)
+        self.root = self._link(self.root, node)
+        self.length += 1
+        return node
+
+    def _link(self, first, second):
+        """Join two roots, or None, and return the root of the result."""
+        if first is None:
+            return second
+
+        if second is None:
+            return first
+
+        if second.key < first.key:
+            first, second = second, first
+
+        child = first.child
+        second.sibling = child
+        if child is not None:
+            child.previous = second
+
+        second.previous = first
+        first.child = second
+        return first
+
+class FibonacciHeapNode(FastNode):
+    """A node of a FibonacciHeap, and the handle of its item.
+
+    Attributes:
+        data:
+            the item.
+
+        key:
+            the priority of the item.
+
+        parent:
+            the parent of the node, or None for a root.
+
+        child:
+            any one of the children of the node, or None.
+
+        left, right:
+            the neighbours of the node in the circular list of its siblings,
+            or of the roots.
+
+        degree:
+            the number of children of the node.
+
+        marked:
+            whether the node has lost a child since it became a child.
+    """
+
+    __slots__ = ('key', 'parent', 'child', 'left', 'right', 'degree',
+                 'marked')
+
+    def __init__(self, data = None, key = None):
+        self.data = data
+        self.key = key
+        self.parent = None
+        self.child = None
+        self.left = self
+        self.right = self
+        self.degree = 0
+        self.marked = False
+
+class FibonacciHeap(object):
+    """A mergeable min-heap held in a circular list of heap ordered trees.
+    push and meld only splice circular lists, and decrease cuts a node out to
+    the roots, cutting each marked ancestor after it, all in O(1) amortised.
+    pop removes the least root, puts its children among the roots, and
+    links roots of equal degree until no two are left, in O(log n)
+    amortised.
+
+    push returns the node of the item, which is its handle for decrease.
+    A node must only be passed back to the heap it came from, while its
+    item is still in it.
+    """
+
+    decrease_err = 'priority is greater than the current one'
+    empty_err = 'heap is empty'
+    handle_err = 'node is not in a heap'
+
+    def __bool__(self):
+        return self.minimum is not None
+
+    def __init__(self, items = ()):
+        self.minimum = None
+        self.length = 0
+        if hasattr(items, 'items'):
+            items = items.items()
+
+        for item, priority in items:
+            self.push(item, priority)
+
+    def __len__(self):
+        return self.length
+
+    def decrease(self, node, priority):
+        """Lower the priority of the item of node."""
+        if node.key < priority:
+            raise ValueError(self.decrease_err)
+
+        if node.left is None:
+            raise ValueError(self.handle_err)
+
+        node.key = priority
+        parent = node.parent
+        if parent is not None and priority < parent.key:
+            self._cut(node, parent)
+            while parent.parent is not None:
+                if not parent.marked:
+                    parent.marked = True
+                    break
+
+                above = parent.parent
+                self._cut(parent, above)
+                parent = above
+
+        if priority < self.minimum.key:
+            self.minimum = node
+
+    def meld(self, other):
+        """Move every item of other, another FibonacciHeap, into this one."""
+        if other.minimum is None:
+            return
+
+        if self.minimum is None:
+            self.minimum = other.minimum
+
+        else:
+            self._splice(self.minimum, other.minimum)
+            if other.minimum.key < self.minimum.key:
+                self.minimum = other.minimum
+
+        self.length += other.length
+        other.minimum = None
+        other.length = 0
+
+    def peek(self):
+        """Return the (item, priority) pair of least priority."""
+        if self.minimum is None:
+            raise IndexError(self.empty_err)
+
+        return self.minimum.data, self.minimum.key
+
+    def pop(self):
+        """Remove and return the (item, priority) pair of least priority."""
+        least = self.minimum
+        if least is None:
+            raise IndexError(self.empty_err)
+
+        child = least.child
+        if child is not None:
+            node = child
+            while True:
+                node.parent = None
+                node = node.right
+                if node is child:
+                    break
+
+            self._splice(least, child)
+
+        self.length -= 1
+        if least.right is least:
+            self.minimum = None
+
+        else:
+            least.left.right = least.right
+            least.right.left = least.left
+            self._consolidate(least.right)
+
+        least.child = least.left = least.right = None
+        return least.data, least.key
+
+    def push(self, item, priority):
+        """Add item with priority and return its node."""
+        node = FibonacciHeapNode(item, priority)
+        minimum = self.minimum
+        if minimum is None:
+            self.minimum = node
+
+        else:
+            self._splice(minimum, node)
+            if priority < minimum.key:
+                self.minimum = node
+
+        self.length += 1
+        return node
+
+    def _consolidate(self, start):
+        """Link the roots, starting from start, until their degrees differ,
+        and find the new minimum.
+        """
+        roots = []
+        node = start
+        while True:
+            roots.append(node)
+            node = node.right
+            if node is start:
+                break
+
+        table = []
+        for node in roots:
+            degree = node.degree
+            while degree < len(table) and table[degree] is not None:
+                other = table[degree]
+                table[degree] = None
+                if other.key < node.key:
+                    node, other = other, node
+
+                other.left.right = other.right
+                other.right.left = other.left
+                other.left = other.right = other
+                other.parent = node
+                other.marked = False
+                if node.child is None:
+                    node.child = other
+
+                else:
+                    self._splice(node.child, other)
+
+                node.degree += 1
+                degree += 1
+
+            if degree >= len(table):
+                table += [None] * (degree + 1 - len(table))
+
+            table[degree] = node
+
+        minimum = None
+        for node in table:
+            if node is not None and (minimum is None or
+                                     node.key < minimum.key):
+                minimum = node
+
+        self.minimum = minimum
+
+    def _cut(self, node, parent):
+        """Move node from the children of parent to the roots."""
+        if node.right is node:
+            parent.child = None
+
+        else:
+            node.left.right = node.right
+            node.right.left = node.left
+            if parent.child is node:
+                parent.child = node.right
+
+        parent.degree -= 1
+        node.left = node.right = node
+        node.parent = None
+        node.marked = False
+        self._splice(self.minimum, node)
+
+    def _splice(self, first, second):
+        """Join the circular lists holding first and second."""
+        first_right = first.right
+        second_left = second.left
+        first.right = second
+        second.left = first
+        second_left.right = first_right
+        first_right.left = second_left
+
+class RadixHeap(object):
+    """A min-heap of integer priorities which never go below the last one
+    popped, as in Dijkstra's algorithm or a timer queue.
+    Bucket b holds the items whose priority differs from the last popped
+    priority first in bit b - 1, so bucket 0 holds the ties with it and
+    every bucket's priorities are less than the next bucket's. When bucket 0
+    runs out, the least nonempty bucket is spread over the buckets below it,
+    around its least priority. An item moves down at most once per bit, so
+    push is O(1) and pop O(log C) amortised, for priorities up to C apart.
+
+    Priorities must be integers no less than start, and a push below the
+    last priority popped raises ValueError.
+    """
+
+    empty_err = 'heap is empty'
+    monotone_err = 'priority is less than the last priority popped'
+
+    def __bool__(self):
+        return self.length > 0
+
+    def __init__(self, items = (), start = 0):
+        self.last = start
+        self.length = 0
+        self.keys = [[]]
+        self.items = [[]]
+        if hasattr(items, 'items'):
+            items = items.items()
+
+        for item, priority in items:
+            self.push(item, priority)
+
+    def __len__(self):
+        return self.length
+
+    def peek(self):
+        """Return the (item, priority) pair of least priority, leaving the
+        buckets, and the last priority popped, as they are.
+        """
+        keys = self.keys
+        if keys[0]:
+            return self.items[0][-1], self.last
+
+        if not self.length:
+            raise IndexError(self.empty_err)
+
+        bucket = 1
+        while not keys[bucket]:
+            bucket += 1
+
+        spread_keys = keys[bucket]
+        least = min(spread_keys)
+        # The last tie, which is the one pop spreads to the end of bucket 0.
+        i = len(spread_keys) - 1 - spread_keys[::-1].index(least)
+        return self.items[bucket][i], least
+
+    def pop(self):
+        """Remove and return the (item, priority) pair of least priority."""
+        self._refill()
+        self.keys[0].pop()
+        self.length -= 1
+        return self.items[0].pop(), self.last
+
+    def push(self, item, priority):
+        """Add item with priority."""
+        if priority < self.last:
+            raise ValueError(self.monotone_err)
+
+        bucket = (priority ^ self.last).bit_length()
+        keys = self.keys
+        if bucket >= len(keys):
+            for _ in range(bucket + 1 - len(keys)):
+                keys.append([])
+                self.items.append([])
+
+        keys[bucket].append(priority)
+        self.items[bucket].append(item)
+        self.length += 1
+
+    def _refill(self):
+        """Make sure bucket 0 holds the items of least priority."""
+        keys = self.keys
+        if keys[0]:
+            return
+
+        if not self.length:
+            raise IndexError(self.empty_err)
+
+        items = self.items
+        bucket = 1
+        while not keys[bucket]:
+            bucket += 1
+
+        spread_keys = keys[bucket]
+        spread_items = items[bucket]
+        keys[bucket] = []
+        items[bucket] = []
+        last = self.last = min(spread_keys)
+        for priority, item in zip(spread_keys, spread_items):
+            below = (priority ^ last).bit_length()
+            keys[below].append(priority)
+            items[below].append(item)
+
+class BucketQueue(object):
+    """A min-queue of integer priorities which never go below the last one
+    popped, and never more than span above it, as in Dial's algorithm.
+    There is one bucket for each priority in the span, used in a circle, so
+    push is O(1) and pop moves past empty buckets at most span times
+    between two priorities.
+
+    Priorities must be integers from the last priority popped, which begins
+    as start, up to span above it, or push raises ValueError.
+    """
+
+    empty_err = 'queue is empty'
+    range_err = 'priority is outside the span after the last one popped'
+    span_err = 'span must be at least 1'
+
+    def __bool__(self):
+        return self.length > 0
+
+    def __init__(self, span, items = (), start = 0):
+        if span < 1:
+            raise ValueError(self.span_err)
+
+        self.span = span
+        self.last = start
+        self.length = 0
+        self.buckets = [[] for _ in range(span + 1)]
+        if hasattr(items, 'items'):
+            items = items.items()
+
+        for item, priority in items:
+            self.push(item, priority)
+
+    def __len__(self):
+        return self.length
+
+    def peek(self):
+        """Return the (item, priority) pair of least priority."""
+        last = self._least()
+        return self.buckets[last % (self.span + 1)][-1], last
+
+    def pop(self):
+        """Remove and return the (item, priority) pair of least priority."""
+        last = self.last = self._least()
+        item = self.buckets[last % (self.span + 1)].pop()
+        self.length -= 1
+        return item, last
+
+    def push(self, item, priority):
+        """Add item with priority."""
+        if not self.last <= priority <= self.last + self.span:
+            raise ValueError(self.range_err)
+
+        self.buckets[priority % (self.span + 1)].append(item)
+        self.length += 1
+
+    def _least(self):
+        """Return the least priority, without moving last up to it."""
+        if not self.length:
+            raise IndexError(self.empty_err)
+
+        buckets = self.buckets
+        size = self.span + 1
+        last = self.last
+        bucket = buckets[last % size]
+        while not bucket:
+            last += 1
+            bucket = buckets[last % size]
+
+        return last
+
+class MinMaxHeap(object):
+    """A double ended heap, with both the least and the greatest item at
+    hand, kept in one flat sequence.
+    The levels of the tree alternate, starting at the root, between levels
+    no greater than anything below them and levels no less. The least item
+    is the root and the greatest is one of its two children, so both are
+    found in O(1), and either end is popped in O(log n). With a typecode
+    the items are kept in an array of that type.
+
+    With a maxlen, pushing onto a full heap evicts the least item when
+    evict is 'min', keeping the maxlen greatest seen, or the greatest when
+    evict is 'max', in O(log maxlen) and without the heap growing.
+    """
+
+    empty_err = 'heap is empty'
+    evict_err = "evict must be 'min' or 'max'"
+    maxlen_err = 'maxlen must be at least 1'
+
+    def __bool__(self):
+        return bool(self.heap)
+
+    def __init__(self, items = (), maxlen = None, evict = 'min',
+                 typecode = None):
+        if evict not in ('min', 'max'):
+            raise ValueError(self.evict_err)
+
+        if maxlen is not None and maxlen < 1:
+            raise ValueError(self.maxlen_err)
+
+        self.maxlen = maxlen
+        self.evict = evict
+        self.typecode = typecode
+        if typecode is None:
+            self.heap = list(items)
+
+        else:
+            self.heap = array(typecode, items)
+
+        for i in range(len(self.heap) // 2 - 1, -1, -1):
+            self._trickle_down(i)
+
+        while maxlen is not None and len(self.heap) > maxlen:
+            if evict == 'min':
+                self.pop_min()
+
+            else:
+                self.pop_max()
+
+    def __len__(self):
+        return len(self.heap)
+
+    def clear(self):
+        """Remove every item."""
+        del self.heap[:]
+
+    def peek_max(self):
+        """Return the greatest item without removing it."""
+        return self.heap[self._max_index()]
+
+    def peek_min(self):
+        """Return the least item without removing it."""
+        if not self.heap:
+            raise IndexError(self.empty_err)
+
+        return self.heap[0]
+
+    def pop_max(self):
+        """Remove and return the greatest item."""
+        return self._take(self._max_index())
+
+    def pop_min(self):
+        """Remove and return the least item."""
+        if not self.heap:
+            raise IndexError(self.empty_err)
+
+        return self._take(0)
+
+    def push(self, item):
+        """Add item, returning the item evicted to stay within maxlen, which
+        may be item itself, or None if nothing was evicted.
+        """
+        heap = self.heap
+        if self.maxlen is None or len(heap) < self.maxlen:
+            heap.append(item)
+            self._bubble_up(len(heap) - 1)
+            return None
+
+        if self.evict == 'min':
+            i = 0
+            if not heap[0] < item:
+                return item
+
+        else:
+            i = self._max_index()
+            if not item < heap[i]:
+                return item
+
+        evicted = heap[i]
+        if i and item < heap[0]:
+            heap[i] = heap[0]
+            heap[0] = item
+
+        else:
+            heap[i] = item
+
+        self._trickle_down(i)
+        return evicted
+
+    def _bubble_up(self, i):
+        """Move the item at i up through the levels of its own kind."""
+        heap = self.heap
+        if not i:
+            return
+
+        parent = (i - 1) // 2
+        minimum = (i + 1).bit_length() % 2
+        item = heap[i]
+        if (item > heap[parent]) if minimum else (item < heap[parent]):
+            heap[i] = heap[parent]
+            heap[parent] = item
+            i = parent
+            minimum = not minimum
+
+        while i > 2:
+            above = (i - 3) // 4
+            if not ((item < heap[above]) if minimum
+                    else (heap[above] < item)):
+                break
+
+            heap[i] = heap[above]
+            i = above
+
+        heap[i] = item
+
+    def _max_index(self):
+        heap = self.heap
+        size = len(heap)
+        if size < 3:
+            if not size:
+                raise IndexError(self.empty_err)
+
+            return size - 1
+
+        return 1 if heap[2] < heap[1] else 2
+
+    def _take(self, i):
+        """Remove and return the item at i."""
+        heap = self.heap
+        last = heap.pop()
+        if i == len(heap):
+            return last
+
+        item = heap[i]
+        heap[i] = last
+        self._trickle_down(i)
+        return item
+
+    def _trickle_down(self, i):
+        """Move the item at i down, on a min level past anything less than
+        it, or on a max level past anything greater.
+        """
+        heap = self.heap
+        size = len(heap)
+        minimum = (i + 1).bit_length() % 2
+        pick = min if minimum else max
+        while True:
+            first = 2 * i + 1
+            if first >= size:
+                return
+
+            children = heap[first:first + 2]
+            best = pick(children)
+            chosen = first + children.index(best)
+            grandchildren = heap[2 * first + 1:2 * first + 5]
+            if grandchildren:
+                other = pick(grandchildren)
+                if (other < best) if minimum else (best < other):
+                    best = other
+                    chosen = 2 * first + 1 + grandchildren.index(other)
+
+            item = heap[i]
+            if not ((best < item) if minimum else (item < best)):
+                return
+
+            heap[i] = best
+            heap[chosen] = item
+            if chosen <= first + 1:
+                return
+
+            parent = (chosen - 1) // 2
+            if (heap[parent] < item) if minimum else (item < heap[parent]):
+                heap[chosen] = heap[parent]
+                heap[parent] = item
+
+            i = chosen
@@ -25,15 +25,527 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
 import unittest
 from structs.trees import b_trees
 
+class BTreeTestCase(unittest.TestCase):
+    """A test case for BTree and, through inheritance, BPlusTree.
+    The trees use a small order so that they grow several levels deep, and
+    every test compares the tree against a dict holding the same items.
+    """
+
+    tree_class = b_trees.BTree
+
+    def setUp(self):
+        self.random = random.Random(17)
+        self.items = {}
+        self.tree = self.tree_class(order = 4)
+        for _ in range(500):
+            key = self.random.randrange(1000)
+            self.items[key] = -key
+            self.tree[key] = -key
+
+    def tearDown(self):
+        self.items = None
+        self.tree = None
+
+    def check_tree(self, tree):
+        """Check key order, node fill and leaf depth, returning the height."""
+        depths = set()
+        stack = [(tree.root, None, None, 0)]
+        while stack:
+            node, low, high, depth = stack.pop()
+            keys = list(node.keys)
+            self.assertEqual(keys, sorted(set(keys)))
+            self.assertLessEqual(len(keys), tree.max_keys)
+            if node is not tree.root:
+                self.assertGreaterEqual(len(keys), tree.min_keys)
+
+            if keys:
+                self.assertTrue(low is None or low <= keys[0])
+                self.assertTrue(high is None or keys[-1] < high)
+
+            if node.children is None:
+                self.assertEqual(len(node.values), len(keys))
+                depths.add(depth)
+                continue
+
+            self.assertEqual(len(node.children), len(keys) + 1)
+            bounds = [low] + keys + [high]
+            for i, child in enumerate(node.children):
+                stack.append((child, bounds[i], bounds[i + 1], depth + 1))
+
+        self.assertEqual(len(depths), 1)
+        self.assertEqual(list(tree.items()), sorted(self.items.items()))
+        self.assertEqual(len(tree), len(self.items))
+        return depths.pop() + 1
+
+    def test_insert(self):
+        """Test that inserts keep keys sorted and unique."""
+        self.check_tree(self.tree)
+        key = next(iter(self.items))
+        self.tree[key] = 'replaced'
+        self.items[key] = 'replaced'
+        self.check_tree(self.tree)
+
+    def test_lookup(self):
+        """Test item access, get and membership for present and absent keys."""
+        for key in range(-1, 1001):
+            self.assertEqual(key in self.tree, key in self.items)
+            self.assertEqual(self.tree.get(key), self.items.get(key))
+
+        key = next(iter(self.items))
+        self.assertEqual(self.tree[key], -key)
+        self.assertRaises(KeyError, self.tree.__getitem__, 1000)
+
+    def test_delete(self):
+        """Test deleting every key in random order, checking as it goes."""
+        keys = list(self.items)
+        self.random.shuffle(keys)
+        for n, key in enumerate(keys):
+            self.assertEqual(self.tree.delete(key), self.items.pop(key))
+            if n % 20 == 0:
+                self.check_tree(self.tree)
+
+        self.check_tree(self.tree)
+        with self.assertRaises(KeyError):
+            del self.tree[keys[0]]
+
+    def test_items(self):
+        """Test bounded and open ended scans."""
+        ordered = sorted(self.items.items())
+        for low, high in ((100, 200), (None, 50), (900, None), (500, 400),
+                          (None, None), (-10, -1)):
+            expected = [(k, v) for k, v in ordered
+                        if (low is None or low <= k) and
+                           (high is None or k <= high)]
+            self.assertEqual(list(self.tree.items(low, high)), expected)
+            self.assertEqual(list(self.tree.keys(low, high)),
+                             [k for k, _ in expected],
+                            )
+            self.assertEqual(list(self.tree.values(low, high)),
+                             [v for _, v in expected],
+                            )
+
+    def test_from_sorted(self):
+        """Test bulk loading, including the fill of the last nodes."""
+        for count in (0, 1, 3, 4, 5, 15, 16, 17, 300):
+            self.items = {key: str(key) for key in range(count)}
+            tree = self.tree_class.from_sorted(sorted(self.items.items()),
+                                               order = 4,
+                                              )
+            self.check_tree(tree)
+            tree.insert(count, str(count))
+            self.items[count] = str(count)
+            self.check_tree(tree)
+
+        with self.assertRaises(ValueError):
+            self.tree_class.from_sorted([(1, 1), (1, 2)])
+
+    def test_height(self):
+        """Test that a high order keeps the tree shallow."""
+        self.items = {key: None for key in range(100000)}
+        tree = self.tree_class.from_sorted(self.items.items(), order = 64)
+        self.assertLessEqual(self.check_tree(tree), 3)
+
+    def test_typecode(self):
+        """Test keys held in typed arrays and a bad order."""
+        tree = self.tree_class(order = 5, typecode = 'q')
+        tree.update(self.items)
+        self.check_tree(tree)
+        self.assertEqual(tree.root.keys.typecode, 'q')
+        self.assertRaises(ValueError, self.tree_class, order = 2)
+
+class BPlusTreeTestCase(BTreeTestCase):
+    """A test case for BPlusTree, adding checks of the leaf links."""
+
+    tree_class = b_trees.BPlusTree
+
+    def check_tree(self, tree):
+        height = super().check_tree(tree)
+        leaves = []
+        stack = [tree.root]
+        while stack:
+            node = stack.pop()
+            if node.children is None:
+                leaves.append(node)
+
+            else:
+                self.assertIsNone(node.values)
+                stack.extend(reversed(node.children))
+
+        for leaf, after in zip(leaves, leaves[1:] + [None]):
+            self.assertIs(leaf.next, after)
+
+        return height
+
+class ConcurrentBPlusTreeTestCase(BPlusTreeTestCase):
+    """A test case for ConcurrentBPlusTree, adding checks of the versions
+    and a stress test of readers and writers running together.
+    """
+
+    tree_class = b_trees.ConcurrentBPlusTree
+
+    def check_tree(self, tree):
+        height = super().check_tree(tree)
+        stack = [tree.root]
+        while stack:
+            node = stack.pop()
+            self.assertEqual(node.version % 2, 0)
+            self.assertFalse(node.latch.locked())
+            stack.extend(node.children or ())
+
+        return height
+
+    def test_threads(self):
+        """Test writers on interleaved keys alongside readers which look for
+        keys that are never changed, with thread switches forced often.
+        """
+        tree = self.tree_class(order = 4)
+        stable = list(range(0, 3000, 2))
+        tree.update((key, key) for key in stable)
+        writes = [{} for _ in range(3)]
+        errors = []
+        done = threading.Event()
+
+        def write(n):
+            rng = random.Random(n)
+            mine = writes[n]
+            for step in range(3000):
+                key = 6 * rng.randrange(1000) + 2 * n + 1
+                if rng.random() < 0.6:
+                    tree[key] = step
+                    mine[key] = step
+
+                elif key in mine:
+                    if tree.delete(key) != mine.pop(key):
+                        errors.append(('delete', key))
+
+        def read(n):
+            rng = random.Random(-n)
+            while not done.is_set():
+                key = rng.choice(stable)
+                if tree.get(key) != key:
+                    errors.append(('get', key))
+
+                low = rng.randrange(3000)
+                keys = list(tree.keys(low, low + 100))
+                if keys != sorted(set(keys)):
+                    errors.append(('order', low))
+
+                if ([key for key in keys if key % 2 == 0] !=
+                    [key for key in stable if low <= key <= low + 100]):
+                    errors.append(('scan', low))
+
+        writers = [threading.Thread(target = write, args = (n,))
+                   for n in range(3)]
+        readers = [threading.Thread(target = read, args = (n,))
+                   for n in range(3)]
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            for thread in readers + writers:
+                thread.start()
+
+            for thread in writers:
+                thread.join()
+
+        finally:
+            done.set()
+            for thread in readers:
+                thread.join()
+
+            sys.setswitchinterval(interval)
+
+        self.assertEqual(errors, [])
+        self.items = {key: key for key in stable}
+        for mine in writes:
+            self.items.update(mine)
+
+        self.check_tree(tree)
+
+class BEpsilonTreeTestCase(unittest.TestCase):
+    """A test case for BEpsilonTree.
+    The tree uses tiny nodes and buffers so that messages are flushed
+    through several levels, and every test compares it against a dict.
+    """
+
+    def setUp(self):
+        self.random = random.Random(19)
+        self.items = {}
+        self.tree = b_trees.BEpsilonTree(fanout = 4, buffer_size = 8,
+                                         leaf_size = 8)
+        for _ in range(1000):
+            key = self.random.randrange(2000)
+            self.items[key] = -key
+            self.tree[key] = -key
+
+    def tearDown(self):
+        self.items = None
+        self.tree = None
+
+    def check_tree(self):
+        """Check the items, routing, fanout and leaf depth of the tree."""
+        self.assertEqual(list(self.tree.items()), sorted(self.items.items()))
+        depths = set()
+        stack = [(self.tree.root, None, None, 0)]
+        while stack:
+            node, low, high, depth = stack.pop()
+            keys = node.keys
+            self.assertEqual(keys, sorted(set(keys)))
+            self.assertTrue(all((low is None or low <= key) and
+                                (high is None or key < high)
+                                for key in keys))
+            if node.children is None:
+                self.assertLessEqual(len(keys), self.tree.leaf_size)
+                depths.add(depth)
+                continue
+
+            self.assertLessEqual(len(node.buffer), self.tree.buffer_size)
+            self.assertLessEqual(len(node.children), self.tree.fanout)
+            self.assertEqual(len(node.children), len(keys) + 1)
+            bounds = [low] + keys + [high]
+            for i, child in enumerate(node.children):
+                stack.append((child, bounds[i], bounds[i + 1], depth + 1))
+
+        self.assertEqual(len(depths), 1)
+
+    def test_insert(self):
+        """Test that inserts reach the leaves in order."""
+        self.check_tree()
+        self.assertIsNotNone(self.tree.root.children)
+
+    def test_lookup(self):
+        """Test lookups of keys whose messages are still buffered."""
+        for key in range(-1, 2001):
+            self.assertEqual(key in self.tree, key in self.items)
+            self.assertEqual(self.tree.get(key), self.items.get(key))
+
+        self.assertRaises(KeyError, self.tree.__getitem__, 2000)
+
+    def test_delete(self):
+        """Test blind deletes and the checked deletes of del."""
+        keys = list(self.items)
+        self.random.shuffle(keys)
+        for n, key in enumerate(keys):
+            self.tree.delete(key)
+            del self.items[key]
+            self.tree.delete(key + 0.5)
+            if n % 100 == 0:
+                self.check_tree()
+
+        self.check_tree()
+        self.tree[1] = 1
+        del self.tree[1]
+        with self.assertRaises(KeyError):
+            del self.tree[1]
+
+    def test_upsert(self):
+        """Test upserts over puts, deletes, absent keys and other upserts."""
+        for step in range(5000):
+            key = self.random.randrange(2000)
+            choice = self.random.random()
+            if choice < 0.5:
+                self.tree.upsert(key, lambda value: value + 1, 0)
+                self.items[key] = self.items.get(key, 0) + 1
+
+            elif choice < 0.7:
+                self.tree.upsert(key, lambda value: value * 2, 5)
+                self.items[key] = self.items.get(key, 5) * 2
+
+            elif choice < 0.9:
+                self.tree[key] = step
+                self.items[key] = step
+
+            else:
+                self.tree.delete(key)
+                self.items.pop(key, None)
+
+            if step % 50 == 0:
+                self.assertEqual(self.tree.get(key), self.items.get(key))
+
+        self.check_tree()
+
+    def test_items(self):
+        """Test bounded and open ended scans over buffered messages."""
+        for key in range(0, 2000, 7):
+            self.tree.delete(key)
+            self.items.pop(key, None)
+
+        ordered = sorted(self.items.items())
+        for low, high in ((100, 200), (None, 50), (1900, None), (500, 400),
+                          (None, None), (-10, -1)):
+            expected = [(k, v) for k, v in ordered
+                        if (low is None or low <= k) and
+                           (high is None or k <= high)]
+            self.assertEqual(list(self.tree.items(low, high)), expected)
+            self.assertEqual(list(self.tree.values(low, high)),
+                             [v for _, v in expected],
+                            )
+
+    def test_sizes(self):
+        """Test a bad fanout."""
+        self.assertRaises(ValueError, b_trees.BEpsilonTree, fanout = 2)
+
+class DiskBPlusTreeTestCase(unittest.TestCase):
+    """A test case for DiskBPlusTree.
+    The tree uses small pages and a small buffer pool, so that it grows
+    several levels deep and dirty pages are evicted before they are
+    committed.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'tree')
+        self.random = random.Random(18)
+        self.items = {}
+        self.tree = self.open()
+        for _ in range(2000):
+            key = self.random.randrange(4000)
+            self.items[key] = key * 3
+            self.tree[key] = key * 3
+
+        self.tree.commit()
+
+    def tearDown(self):
+        if self.tree._file is not None:
+            self.tree._close_files()
+
+        shutil.rmtree(self.directory)
+        self.items = None
+        self.tree = None
+
+    def open(self, **options):
+        options.setdefault('page_size', 512)
+        options.setdefault('cache_pages', 8)
+        return b_trees.DiskBPlusTree(self.path, **options)
+
+    def reopen(self, commit = True):
+        """Close the tree, committing or else as a crash would, and open it."""
+        if commit:
+            self.tree.close()
+
+        else:
+            self.tree._close_files()
+
+        self.tree = self.open()
+
+    def test_lookup(self):
+        """Test item access, get and membership after reopening."""
+        self.reopen()
+        for key in range(-1, 4001):
+            self.assertEqual(key in self.tree, key in self.items)
+            self.assertEqual(self.tree.get(key), self.items.get(key))
+
+        self.assertEqual(len(self.tree), len(self.items))
+        self.assertRaises(KeyError, self.tree.__getitem__, 4000)
+        self.assertGreater(self.tree.hits, 0)
+        self.assertGreater(self.tree.misses, 0)
+
+    def test_delete(self):
+        """Test deleting every key, with no page kept in the pool once
+        merged away, reusing the freed pages afterwards.
+        """
+        keys = list(self.items)
+        self.random.shuffle(keys)
+        tree = self.tree
+        for n, key in enumerate(keys):
+            self.assertEqual(tree.delete(key), self.items.pop(key))
+            self.assertFalse(set(tree._cache) &
+                             set(tree._free + tree._pending))
+            if n % 500 == 0:
+                self.tree.commit()
+
+        self.assertRaises(KeyError, self.tree.delete, keys[0])
+        self.reopen()
+        self.assertEqual(list(self.tree.items()), [])
+        pages = self.tree.page_count
+        self.tree.update((key, key) for key in range(2000))
+        self.assertEqual(self.tree.page_count, pages)
+
+    def test_items(self):
+        """Test bounded and open ended scans."""
+        ordered = sorted(self.items.items())
+        for low, high in ((100, 2000), (None, 50), (3900, None), (500, 400),
+                          (None, None), (-10, -1)):
+            expected = [(k, v) for k, v in ordered
+                        if (low is None or low <= k) and
+                           (high is None or k <= high)]
+            self.assertEqual(list(self.tree.items(low, high)), expected)
+            self.assertEqual(list(self.tree.keys(low, high)),
+                             [k for k, _ in expected],
+                            )
+
+    def test_crash(self):
+        """Test that uncommitted changes, even ones already evicted to the
+        file, are lost in a crash, as is a torn header.
+        """
+        for key in range(4000, 5000):
+            self.tree[key] = key
+
+        self.reopen(commit = False)
+        self.assertEqual(list(self.tree.items()), sorted(self.items.items()))
+        for key in range(4000, 5000):
+            self.tree[key] = key
+
+        self.tree.commit()
+        offset = self.tree._slots[self.tree._sequence % 2]
+        self.tree._view[offset + 20] ^= 0xff
+        self.reopen(commit = False)
+        self.assertEqual(list(self.tree.items()), sorted(self.items.items()))
+
+    def test_rollback(self):
+        """Test that rollback restores the last commit."""
+        for key in list(self.items)[:500]:
+            del self.tree[key]
+
+        self.tree[-5] = 5
+        self.tree.rollback()
+        self.assertEqual(list(self.tree.items()), sorted(self.items.items()))
+        with self.tree as tree:
+            tree[-5] = 5
+
+        self.tree = self.open()
+        self.assertEqual(self.tree[-5], 5)
+
+    def test_formats(self):
+        """Test bytes keys and the checks on formats and items."""
+        self.tree.close()
+        os.remove(self.path)
+        self.tree = self.open(key_format = '8s', value_format = 'd')
+        self.tree[b'b'] = 1.5
+        self.tree[b'a'] = 2
+        self.assertEqual(self.tree[b'b'], 1.5)
+        self.assertEqual(list(self.tree), [b'a' + bytes(7), b'b' + bytes(7)])
+        self.assertRaises(ValueError, self.tree.insert, 'a', 1.0)
+        self.reopen()
+        self.assertEqual(self.tree.key_format, '8s')
+        self.tree.close()
+        self.assertRaises(ValueError, self.open, key_format = 'q')
+        self.tree = self.open()
+        for key_format in ('<q', 'qq', 'x'):
+            self.assertRaises(ValueError, b_trees.DiskBPlusTree,
+                              os.path.join(self.directory, key_format),
+                              key_format = key_format,
+                             )
+
 def get_test_suite():
     """
     """
     b_tree_test_suite = unittest.TestSuite()
     test_loader = binary_tree_test_suite.TestLoader()
     # test_loader.loadTestsFromTestCase()
+    test_loader.loadTestsFromTestCase(BTreeTestCase)
+    test_loader.loadTestsFromTestCase(BPlusTreeTestCase)
+    test_loader.loadTestsFromTestCase(ConcurrentBPlusTreeTestCase)
+    test_loader.loadTestsFromTestCase(BEpsilonTreeTestCase)
+    test_loader.loadTestsFromTestCase(DiskBPlusTreeTestCase)
     return binary_tree_test_suite
 
 def run_test():
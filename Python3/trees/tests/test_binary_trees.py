@@ -25,15 +25,1153 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import array
+import bisect
+import math
+import random
 import unittest
+from structs.nodes import FastSizedBinaryNode
 from structs.trees import binary_trees
 
+def link(parent, left = None, right = None):
+    """Attach left and right to parent as children and return parent."""
+    parent.left = left
+    parent.right = right
+    for child in (left, right):
+        if child is not None:
+            child.parent = parent
+
+    return parent
+
+class BinaryTreeTestCase(unittest.TestCase):
+    """A test case for traversal of the BinaryTree class.
+    The tree used by these tests is built by hand as
+
+            4
+           / \\
+          2   6
+         / \\   \\
+        1   3   7
+
+    so that every traversal order gives a different sequence.
+    """
+
+    def setUp(self):
+        N = FastSizedBinaryNode
+        self.tree = binary_trees.BinaryTree()
+        self.tree.root = link(N(4),
+                              link(N(2), N(1), N(3)),
+                              link(N(6), None, N(7)),
+                             )
+        self.tree.recount()
+
+    def test_orders(self):
+        """Test all four traversal orders."""
+        self.assertEqual(list(self.tree.traverse('in')), [1, 2, 3, 4, 6, 7])
+        self.assertEqual(list(self.tree.traverse('pre')), [4, 2, 1, 3, 6, 7])
+        self.assertEqual(list(self.tree.traverse('post')), [1, 3, 2, 7, 6, 4])
+        self.assertEqual(list(self.tree.traverse('level')),
+                         [4, 2, 6, 1, 3, 7],
+                        )
+        with self.assertRaises(ValueError):
+            self.tree.traverse('sideways')
+
+    def test_iter(self):
+        """Test that iterating uses the tree's order and can be nested."""
+        self.assertEqual(list(self.tree), [1, 2, 3, 4, 6, 7])
+        self.tree.order = 'level'
+        pairs = [(a, b) for a in self.tree for b in self.tree]
+        self.assertEqual(len(pairs), 36)
+        self.assertEqual(pairs[0], (4, 4))
+
+    def test_contains_and_len(self):
+        """Test membership and size of a populated and an empty tree."""
+        self.assertIn(3, self.tree)
+        self.assertNotIn(5, self.tree)
+        self.assertEqual(len(self.tree), 6)
+        empty = binary_trees.BinaryTree()
+        self.assertNotIn(None, empty)
+        self.assertEqual(len(empty), 0)
+        self.assertEqual(list(empty.traverse('post')), [])
+        self.assertEqual(list(empty.traverse('level')), [])
+
+    def test_degenerate_depth(self):
+        """Test that a tree deeper than the recursion limit can be walked."""
+        depth = 20000
+        root = node = FastSizedBinaryNode(0)
+        for i in range(1, depth):
+            node = link(node, FastSizedBinaryNode(i))
+            node = node.left
+
+        tree = binary_trees.BinaryTree()
+        tree.root = root
+        tree.recount()
+        self.assertEqual(len(tree), depth)
+        self.assertIn(depth - 1, tree)
+        for order in tree.orders:
+            self.assertEqual(sum(1 for each in tree.traverse(order)), depth)
+
+    def test_sizes(self):
+        """Test that recount sets the size of every subtree."""
+        self.assertEqual(self.tree.root.size, 6)
+        self.assertEqual(self.tree.root.left.size, 3)
+        self.assertEqual(self.tree.root.right.size, 2)
+
+    def test_select_and_getitem(self):
+        """Test indexing by in-order position, including negative indexes."""
+        self.assertEqual([self.tree[i] for i in range(6)], [1, 2, 3, 4, 6, 7])
+        self.assertEqual(self.tree[-1], 7)
+        self.assertIs(self.tree.select(3), self.tree.root)
+        with self.assertRaises(IndexError):
+            self.tree[6]
+
+        with self.assertRaises(IndexError):
+            self.tree[-7]
+
+        self.tree[0] = 0
+        self.assertEqual(self.tree.root.left.left.data, 0)
+
+    def test_rank_and_position(self):
+        """Test rank of present and absent items and position of nodes."""
+        self.assertEqual([self.tree.rank(x) for x in range(9)],
+                         [0, 0, 1, 2, 3, 4, 4, 5, 6],
+                        )
+        for node in self.tree.nodes():
+            self.assertIs(self.tree.select(self.tree.position(node)), node)
+
+    def test_insert_and_delete_at(self):
+        """Test that positional inserts and deletes keep sizes correct."""
+        self.tree.insert_at(4, 5)
+        self.tree.insert_at(0, 0)
+        self.tree.insert_at(100, 8)
+        self.tree.insert_at(-1, 7.5)
+        self.assertEqual(list(self.tree), [0, 1, 2, 3, 4, 5, 6, 7, 7.5, 8])
+        self.assertEqual(len(self.tree), 10)
+        self.assertEqual(self.tree.delete_at(4), 4)
+        self.assertEqual(self.tree.delete_at(0), 0)
+        self.assertEqual(self.tree.delete_at(-1), 8)
+        self.assertEqual(list(self.tree), [1, 2, 3, 5, 6, 7, 7.5])
+        for node in self.tree.nodes():
+            self.assertEqual(node.size,
+                             sum(1 for each in self.tree._in_order(node)),
+                            )
+
+        while len(self.tree):
+            self.tree.delete_at(0)
+
+        self.assertIsNone(self.tree.root)
+        self.tree.insert_at(0, 1)
+        self.assertEqual(list(self.tree), [1])
+
+    def test_from_sorted(self):
+        """Test linear bulk loading from lists, counted and bare generators."""
+        for count in range(40):
+            for tree in (binary_trees.BinaryTree.from_sorted(range(count)),
+                         binary_trees.BinaryTree.from_sorted(
+                             (i for i in range(count)), count),
+                         binary_trees.BinaryTree.from_sorted(
+                             i for i in range(count)),
+                        ):
+                self.assertEqual(list(tree), list(range(count)))
+                self.assertEqual(len(tree), count)
+                heights = {None: 0}
+                for node in tree.nodes('post'):
+                    heights[node] = 1 + max(heights[node.left],
+                                            heights[node.right])
+                    self.assertEqual(node.size,
+                                     sum(1 for each in tree._in_order(node)),
+                                    )
+                    if node.left is not None:
+                        self.assertIs(node.left.parent, node)
+
+                    if node.right is not None:
+                        self.assertIs(node.right.parent, node)
+
+                self.assertEqual(heights[tree.root], count.bit_length())
+
+        tree = binary_trees.BinaryTree.from_sorted([3, 1, 2], order = 'pre')
+        self.assertEqual(list(tree.traverse('in')), [3, 1, 2])
+        self.assertEqual(tree.order, 'pre')
+
+    def test_from_sorted_count_fail(self):
+        """Test that a count which does not match the iterable fails."""
+        with self.assertRaises(ValueError):
+            binary_trees.BinaryTree.from_sorted(iter(range(3)), 4)
+
+        with self.assertRaises(ValueError):
+            binary_trees.BinaryTree.from_sorted(iter(range(5)), 4)
+
+    def tearDown(self):
+        del self.tree
+
+class BinarySearchTreeTestCase(unittest.TestCase):
+    """A test case for BinarySearchTree and, through inheritance, the balanced
+    search trees. Every test compares the tree against a sorted list holding
+    the same elements and checks the tree's invariants with check_tree, which
+    balanced test cases extend with their own balance rules.
+    """
+
+    tree_class = binary_trees.BinarySearchTree
+
+    def setUp(self):
+        self.random = random.Random(1)
+        self.keys = [self.random.randrange(200) for i in range(300)]
+        self.tree = self.tree_class()
+        self.tree.update(self.keys)
+        self.keys.sort()
+
+    def check_tree(self, tree):
+        """Check order, parent links and sizes, returning the height."""
+        self.assertEqual(list(tree), self.keys)
+        heights = {None: 0}
+        for node in tree.nodes('post'):
+            for child in (node.left, node.right):
+                if child is not None:
+                    self.assertIs(child.parent, node)
+
+            if node.left is not None:
+                self.assertLessEqual(node.left.data, node.data)
+
+            if node.right is not None:
+                self.assertLessEqual(node.data, node.right.data)
+
+            self.assertEqual(node.size,
+                             1 + sum(child.size
+                                     for child in (node.left, node.right)
+                                     if child is not None),
+                            )
+            heights[node] = 1 + max(heights[node.left], heights[node.right])
+
+        if tree.root is not None:
+            self.assertIsNone(tree.root.parent)
+
+        return heights[tree.root]
+
+    def test_insert(self):
+        """Test that inserted keys, including duplicates, come out sorted."""
+        self.check_tree(self.tree)
+        self.assertEqual(len(self.tree), len(self.keys))
+
+    def test_search(self):
+        """Test search and membership for present and absent keys."""
+        for key in range(-1, 201):
+            self.assertEqual(key in self.tree, key in self.keys)
+
+        node = self.tree.search(self.keys[0])
+        self.assertEqual(node.data, self.keys[0])
+        self.assertIsNone(self.tree.search(500))
+
+    def test_floor_and_ceiling(self):
+        """Test floor and ceiling against a scan of the sorted keys."""
+        for key in range(-1, 202):
+            below = [k for k in self.keys if k <= key]
+            above = [k for k in self.keys if k >= key]
+            self.assertEqual(self.tree.floor(key),
+                             below[-1] if below else None,
+                            )
+            self.assertEqual(self.tree.ceiling(key),
+                             above[0] if above else None,
+                            )
+
+    def test_range(self):
+        """Test inclusive and open ended range iteration."""
+        self.assertEqual(list(self.tree.range(50, 60)),
+                         [k for k in self.keys if 50 <= k <= 60],
+                        )
+        self.assertEqual(list(self.tree.range(high = 10)),
+                         [k for k in self.keys if k <= 10],
+                        )
+        self.assertEqual(list(self.tree.range(190)),
+                         [k for k in self.keys if k >= 190],
+                        )
+        self.assertEqual(list(self.tree.range(60, 50)), [])
+        self.assertEqual(list(self.tree.range()), self.keys)
+
+    def test_rank_and_select(self):
+        """Test order statistics after inserts and deletes."""
+        for key in range(0, 201, 7):
+            self.assertEqual(self.tree.rank(key),
+                             sum(1 for k in self.keys if k < key),
+                            )
+
+        for index in range(0, len(self.keys), 11):
+            self.assertEqual(self.tree[index], self.keys[index])
+
+    def test_delete(self):
+        """Test deleting every key in random order, checking as it goes."""
+        order = list(self.keys)
+        self.random.shuffle(order)
+        for i, key in enumerate(order):
+            self.tree.delete(key)
+            self.keys.remove(key)
+            if i % 25 == 0:
+                self.check_tree(self.tree)
+
+        self.assertIsNone(self.tree.root)
+        with self.assertRaises(KeyError):
+            self.tree.delete(1)
+
+    def test_delete_at(self):
+        """Test positional deletes from both ends and the middle."""
+        self.assertEqual(self.tree.delete_at(0), self.keys.pop(0))
+        self.assertEqual(self.tree.delete_at(-1), self.keys.pop())
+        self.assertEqual(self.tree.delete_at(100), self.keys.pop(100))
+        self.check_tree(self.tree)
+
+    def test_positional_assignment_fail(self):
+        """Test that keys cannot be placed by position."""
+        with self.assertRaises(TypeError):
+            self.tree[0] = 1
+
+        with self.assertRaises(TypeError):
+            self.tree.insert_at(0, 1)
+
+    def test_from_sorted(self):
+        """Test bulk loading with and without a known count."""
+        for count in (0, 1, 2, 3, 7, 8, 100):
+            self.keys = list(range(count))
+            for tree in (self.tree_class.from_sorted(self.keys),
+                         self.tree_class.from_sorted(iter(self.keys), count),
+                         self.tree_class.from_sorted(iter(self.keys)),
+                        ):
+                self.assertLessEqual(self.check_tree(tree),
+                                     2 * count.bit_length(),
+                                    )
+                tree.insert(-1)
+                self.keys.insert(0, -1)
+                self.check_tree(tree)
+                tree.delete(-1)
+                self.keys.pop(0)
+                self.check_tree(tree)
+
+        balanced = self.tree_class.from_sorted(self.keys)
+        self.assertEqual(self.check_tree(balanced), 7)
+
+    def test_from_sorted_unsorted_fail(self):
+        """Test that unsorted input is rejected."""
+        with self.assertRaises(ValueError):
+            self.tree_class.from_sorted([1, 3, 2])
+
+        with self.assertRaises(ValueError):
+            self.tree_class.from_sorted(iter([1, 3, 2]))
+
+    def tearDown(self):
+        del self.tree
+        del self.keys
+
+class AVLTreeTestCase(BinarySearchTreeTestCase):
+    """A test case for AVLTree, adding height and balance checks."""
+
+    tree_class = binary_trees.AVLTree
+
+    def check_tree(self, tree):
+        height = super().check_tree(tree)
+        for node in tree.nodes():
+            left = node.left.height if node.left is not None else 0
+            right = node.right.height if node.right is not None else 0
+            self.assertLessEqual(abs(left - right), 1)
+            self.assertEqual(node.height, 1 + max(left, right))
+
+        return height
+
+    def test_sorted_height(self):
+        """Test that sorted input still gives a logarithmic height."""
+        self.keys = list(range(1023))
+        tree = self.tree_class()
+        tree.update(self.keys)
+        self.assertLessEqual(self.check_tree(tree), 11)
+
+class RedBlackTreeTestCase(BinarySearchTreeTestCase):
+    """A test case for RedBlackTree, adding color and black height checks."""
+
+    tree_class = binary_trees.RedBlackTree
+
+    def check_tree(self, tree):
+        height = super().check_tree(tree)
+        if tree.root is not None:
+            self.assertFalse(tree.root.red)
+
+        black_heights = {None: 1}
+        for node in tree.nodes('post'):
+            if node.red:
+                for child in (node.left, node.right):
+                    self.assertFalse(child is not None and child.red)
+
+            self.assertEqual(black_heights[node.left],
+                             black_heights[node.right],
+                            )
+            black_heights[node] = black_heights[node.left] + (not node.red)
+
+        return height
+
+    def test_sorted_height(self):
+        """Test that sorted input still gives a logarithmic height."""
+        self.keys = list(range(1023))
+        tree = self.tree_class()
+        tree.update(self.keys)
+        self.assertLessEqual(self.check_tree(tree), 20)
+
+class SplayTreeTestCase(BinarySearchTreeTestCase):
+    """A test case for SplayTree, which holds distinct keys only."""
+
+    tree_class = binary_trees.SplayTree
+
+    def setUp(self):
+        super().setUp()
+        self.keys = sorted(set(self.keys))
+
+    def test_distinct(self):
+        """Test that inserting a present key returns its node."""
+        node = self.tree.insert(self.keys[0])
+        self.assertEqual(node.data, self.keys[0])
+        self.assertEqual(len(self.tree), len(self.keys))
+        with self.assertRaises(ValueError):
+            self.tree_class.from_sorted([1, 1, 2])
+
+    def test_splay_to_root(self):
+        """Test that searched, inserted and nearby keys come to the root."""
+        key = self.keys[len(self.keys) // 2]
+        self.assertIsNotNone(self.tree.search(key))
+        self.assertEqual(self.tree.root.data, key)
+        self.tree.insert(1000)
+        self.assertEqual(self.tree.root.data, 1000)
+        self.keys.append(1000)
+        self.assertIsNone(self.tree.search(500))
+        self.assertIn(self.tree.root.data, (self.keys[-2], 1000))
+        self.check_tree(self.tree)
+
+    def test_split_and_join(self):
+        """Test splitting at present and absent keys and joining back."""
+        for key in (-5, self.keys[10], self.keys[10] + 0.5, 1000):
+            upper = self.tree.split(key)
+            self.assertEqual(list(self.tree), [k for k in self.keys if k < key])
+            self.assertEqual(list(upper), [k for k in self.keys if k >= key])
+            self.assertEqual(len(self.tree) + len(upper), len(self.keys))
+            self.tree.join(upper)
+            self.assertIsNone(upper.root)
+            self.check_tree(self.tree)
+
+        upper = self.tree.split(self.keys[10])
+        with self.assertRaises(ValueError):
+            upper.join(self.tree)
+
+    def test_degenerate_depth(self):
+        """Test that sorted inserts and a deep splay need no recursion."""
+        self.keys = list(range(20000))
+        tree = self.tree_class()
+        tree.update(self.keys)
+        self.assertIsNotNone(tree.search(0))
+        self.assertEqual(tree.root.data, 0)
+        self.check_tree(tree)
+
+class TreapTestCase(BinarySearchTreeTestCase):
+    """A test case for Treap, adding heap order checks and set operations.
+    Every treap in these tests is seeded so that the tests are repeatable.
+    """
+
+    tree_class = binary_trees.Treap
+
+    def setUp(self):
+        super().setUp()
+        self.keys = sorted(set(self.keys))
+        self.tree = self.make(self.keys, 1)
+
+    def check_tree(self, tree):
+        height = super().check_tree(tree)
+        for node in tree.nodes():
+            for child in (node.left, node.right):
+                if child is not None:
+                    self.assertLessEqual(child.priority, node.priority)
+
+        return height
+
+    def make(self, keys, seed):
+        tree = self.tree_class(seed = seed)
+        tree.update(keys)
+        return tree
+
+    def test_from_sorted(self):
+        """Test bulk loading with and without a known count."""
+        for count in (0, 1, 2, 3, 7, 8, 100):
+            self.keys = list(range(count))
+            for tree in (self.tree_class.from_sorted(self.keys, seed = 1),
+                         self.tree_class.from_sorted(iter(self.keys),
+                                                     count,
+                                                     seed = 1,
+                                                    ),
+                         self.tree_class.from_sorted(iter(self.keys),
+                                                     seed = 1,
+                                                    ),
+                        ):
+                self.check_tree(tree)
+                tree.insert(-1)
+                self.keys.insert(0, -1)
+                self.check_tree(tree)
+                tree.delete(-1)
+                self.keys.pop(0)
+                self.check_tree(tree)
+
+        with self.assertRaises(ValueError):
+            self.tree_class.from_sorted(iter(self.keys), 101)
+
+        with self.assertRaises(ValueError):
+            self.tree_class.from_sorted([1, 1, 2])
+
+    def test_degenerate_depth(self):
+        """Test that sorted input gives a logarithmic expected height."""
+        self.keys = list(range(20000))
+        for tree in (self.make(self.keys, 1),
+                     self.tree_class.from_sorted(iter(self.keys), seed = 1),
+                    ):
+            self.assertLess(self.check_tree(tree), 60)
+
+    def test_seed(self):
+        """Test that a seed makes the shape of the tree reproducible."""
+        first = self.make(self.keys, 7)
+        second = self.make(self.keys, 7)
+        self.assertEqual([node.priority for node in first.nodes('pre')],
+                         [node.priority for node in second.nodes('pre')],
+                        )
+        self.assertEqual(list(first.traverse('pre')),
+                         list(second.traverse('pre')),
+                        )
+
+    def test_split_and_merge(self):
+        """Test splitting at present and absent keys and merging back."""
+        for key in (-5, self.keys[10], self.keys[10] + 0.5, 1000):
+            upper = self.tree.split(key)
+            self.assertEqual(list(self.tree), [k for k in self.keys if k < key])
+            self.assertEqual(list(upper), [k for k in self.keys if k >= key])
+            self.tree.merge(upper)
+            self.assertIsNone(upper.root)
+            self.check_tree(self.tree)
+
+        overlapping = self.make([self.keys[0]], 2)
+        with self.assertRaises(ValueError):
+            self.tree.merge(overlapping)
+
+    def test_set_operations(self):
+        """Test union, intersection and difference against Python sets."""
+        generator = random.Random(3)
+        for size in (0, 1, 10, 300):
+            a = set(generator.sample(range(500), size))
+            b = set(generator.sample(range(500), 40))
+            for method, expected in (('union_update', a | b),
+                                     ('intersection_update', a & b),
+                                     ('difference_update', a - b),
+                                    ):
+                tree = self.make(a, 4)
+                other = self.make(b, 5)
+                getattr(tree, method)(other)
+                self.keys = sorted(expected)
+                self.check_tree(tree)
+                self.assertIsNone(other.root)
+
+class ScapegoatTreeTestCase(BinarySearchTreeTestCase):
+    """A test case for ScapegoatTree, whose nodes have no parent or size."""
+
+    tree_class = binary_trees.ScapegoatTree
+
+    def check_tree(self, tree):
+        """Check order and the depth bound, returning the height."""
+        self.assertEqual(list(tree), self.keys)
+        self.assertEqual(len(tree), len(self.keys))
+        heights = {None: 0}
+        for node in tree.nodes('post'):
+            self.assertFalse(hasattr(node, 'parent'))
+            self.assertFalse(hasattr(node, 'size'))
+            if node.left is not None:
+                self.assertLessEqual(node.left.data, node.data)
+
+            if node.right is not None:
+                self.assertLessEqual(node.data, node.right.data)
+
+            heights[node] = 1 + max(heights[node.left], heights[node.right])
+
+        if tree.root is not None:
+            bound = math.log(tree._max_size) / math.log(1 / tree.alpha)
+            self.assertLessEqual(heights[tree.root] - 1, bound + 1)
+
+        return heights[tree.root]
+
+    def test_sorted_height(self):
+        """Test that sorted inserts still give a logarithmic height."""
+        self.keys = list(range(1023))
+        tree = self.tree_class()
+        tree.update(self.keys)
+        self.assertLessEqual(self.check_tree(tree), 21)
+
+    def test_alpha_fail(self):
+        """Test that alpha must be at least a half and less than one."""
+        with self.assertRaises(ValueError):
+            self.tree_class(alpha = 0.4)
+
+        with self.assertRaises(ValueError):
+            self.tree_class(alpha = 1)
+
+    def test_position(self):
+        """Test position, which walks the tree without parent links."""
+        for index, node in enumerate(self.tree.nodes()):
+            self.assertEqual(self.tree.position(node), index)
+
+class WeightBalancedTreeTestCase(BinarySearchTreeTestCase):
+    """A test case for WeightBalancedTree, adding weight balance checks."""
+
+    tree_class = binary_trees.WeightBalancedTree
+
+    def check_tree(self, tree):
+        height = super().check_tree(tree)
+        weight = tree._weight
+        for node in tree.nodes():
+            self.assertLessEqual(weight(node.left),
+                                 tree.delta * weight(node.right),
+                                )
+            self.assertLessEqual(weight(node.right),
+                                 tree.delta * weight(node.left),
+                                )
+
+        return height
+
+    def test_sorted_height(self):
+        """Test that sorted input still gives a logarithmic height."""
+        self.keys = list(range(1023))
+        tree = self.tree_class()
+        tree.update(self.keys)
+        self.assertLessEqual(self.check_tree(tree), 20)
+
+class SmallTTree(binary_trees.TTree):
+    """A TTree with four keys per node, so that test trees have many nodes."""
+
+    def __init__(self, data = None, order = 'in', capacity = 4,
+                 typecode = None):
+        super().__init__(data, order, capacity, typecode)
+
+class TTreeTestCase(BinarySearchTreeTestCase):
+    """A test case for TTree, checking node fill, sizes and AVL balance."""
+
+    tree_class = SmallTTree
+
+    def check_tree(self, tree):
+        """Check key order, fill, sizes and balance, returning the height."""
+        self.assertEqual(list(tree), self.keys)
+        self.assertEqual(len(tree), len(self.keys))
+        heights = {None: 0}
+        for node in tree.nodes('post'):
+            self.assertTrue(0 < len(node.data) <= tree.capacity)
+            for child in (node.left, node.right):
+                if child is not None:
+                    self.assertIs(child.parent, node)
+
+            self.assertEqual(node.size,
+                             len(node.data) + sum(child.size
+                                                  for child in (node.left,
+                                                                node.right)
+                                                  if child is not None),
+                            )
+            left, right = heights[node.left], heights[node.right]
+            self.assertLessEqual(abs(left - right), 1)
+            heights[node] = node.height
+            self.assertEqual(node.height, 1 + max(left, right))
+
+        return heights[tree.root]
+
+    def test_search(self):
+        """Test search and membership for present and absent keys."""
+        for key in range(-1, 201):
+            self.assertEqual(key in self.tree, key in self.keys)
+
+        self.assertIn(self.keys[0], self.tree.search(self.keys[0]).data)
+        self.assertIsNone(self.tree.search(500))
+
+    def test_from_sorted(self):
+        """Test that bulk loading packs keys into full, balanced nodes."""
+        for count in (0, 1, 4, 5, 100):
+            self.keys = list(range(count))
+            for tree in (self.tree_class.from_sorted(self.keys),
+                         self.tree_class.from_sorted(iter(self.keys), count),
+                        ):
+                self.check_tree(tree)
+                self.assertEqual(len(list(tree.nodes())), -(-count // 4))
+
+        with self.assertRaises(ValueError):
+            self.tree_class.from_sorted(iter(range(5)), 6)
+
+    def test_borrow(self):
+        """Test that a node with two children refills from its left side."""
+        tree = self.tree_class.from_sorted(range(12))
+        self.keys = list(range(12))
+        self.assertEqual(list(tree.root.data), [4, 5, 6, 7])
+        for key in (4, 5, 6):
+            tree.delete(key)
+            self.keys.remove(key)
+
+        self.assertEqual(list(tree.root.data), [3, 7])
+        self.check_tree(tree)
+
+    def test_position(self):
+        """Test that positions and select agree on the first key of nodes."""
+        for node in self.tree.nodes():
+            index = self.tree.position(node)
+            self.assertEqual(self.keys[index], node.data[0])
+            self.assertIs(self.tree.select(index), node)
+
+    def test_typecode(self):
+        """Test that keys can be kept in typed arrays."""
+        tree = binary_trees.TTree(capacity = 8, typecode = 'q')
+        tree.update(reversed(self.keys))
+        self.check_tree(tree)
+        self.assertTrue(all(type(node.data) is array.array
+                            for node in tree.nodes()))
+        self.assertRaises(ValueError, binary_trees.TTree, capacity = 1)
+
+class ThreadedBinaryTreeTestCase(BinarySearchTreeTestCase):
+    """A test case for ThreadedBinaryTree, adding checks of the threads."""
+
+    tree_class = binary_trees.ThreadedBinaryTree
+
+    def check_tree(self, tree):
+        height = super().check_tree(tree)
+        nodes = list(tree._in_order(tree.root))
+        for before, after in zip([None] + nodes, nodes + [None]):
+            if before is not None:
+                self.assertIs(before.successor, after)
+
+            if after is not None:
+                self.assertIs(after.predecessor, before)
+
+        self.assertEqual(list(reversed(tree)), self.keys[::-1])
+        return height
+
+    def test_cursor(self):
+        """Test bounded cursors in both directions."""
+        for low, high in ((50, 60), (None, 10), (190, None), (60, 50)):
+            expected = [k for k in self.keys
+                        if (low is None or low <= k) and
+                           (high is None or k <= high)]
+            self.assertEqual(list(self.tree.cursor(low, high)), expected)
+            self.assertEqual(list(self.tree.cursor(low, high, True)),
+                             expected[::-1],
+                            )
+
+        self.assertEqual(list(self.tree_class().cursor()), [])
+
+    def test_resume(self):
+        """Test that a paused cursor carries on after inserts."""
+        cursor = self.tree.cursor(100)
+        page = cursor.take(10)
+        self.assertEqual(page, [k for k in self.keys if k >= 100][:10])
+        self.tree.insert(1000)
+        self.tree.insert(page[-1])
+        self.keys.append(1000)
+        self.keys.append(page[-1])
+        self.keys.sort()
+        rest = list(cursor)
+        self.assertEqual(page + rest, [k for k in self.keys if k >= 100])
+        self.assertEqual(cursor.take(5), [])
+        self.check_tree(self.tree)
+
+class CartesianTreeTestCase(unittest.TestCase):
+    """A test case for the CartesianTree class.
+    The values have many repeats, so that ties are tested, and span several
+    64 element blocks of the range index.
+    """
+
+    def setUp(self):
+        rng = random.Random(14)
+        self.values = [rng.randrange(50) for _ in range(700)]
+        self.tree = binary_trees.CartesianTree(self.values)
+
+    def tearDown(self):
+        self.values = None
+        self.tree = None
+
+    def check_tree(self, tree, better):
+        """Check the in-order positions and the heap order of tree."""
+        order = []
+        stack = []
+        node = tree.root
+        while stack or node != tree.NULL:
+            while node != tree.NULL:
+                stack.append(node)
+                node = tree.left[node]
+
+            node = stack.pop()
+            order.append(node)
+            for child in (tree.left[node], tree.right[node]):
+                if child != tree.NULL:
+                    self.assertFalse(better(tree[child], tree[node]))
+
+            node = tree.right[node]
+
+        self.assertEqual(order, list(range(len(tree))))
+
+    def check_queries(self, tree, best):
+        """Check random and edge ranges against a scan of the values."""
+        rng = random.Random(1)
+        count = len(self.values)
+        ranges = [(0, count), (0, 1), (count - 1, count), (63, 65), (-5, None)]
+        for _ in range(500):
+            start = rng.randrange(count)
+            ranges.append((start, rng.randrange(start + 1, count + 1)))
+
+        for start, stop in ranges:
+            piece = self.values[start:stop]
+            start = slice(start, stop).indices(count)[0]
+            expected = start + piece.index(best(piece))
+            self.assertEqual(tree.query(start, stop), expected)
+            self.assertEqual(tree.query_value(start, stop), best(piece))
+
+    def test_minimum(self):
+        """Test the tree shape and range minimum queries."""
+        self.check_tree(self.tree, lambda a, b: a < b)
+        self.check_queries(self.tree, min)
+        self.assertEqual(self.tree[self.tree.root], min(self.values))
+
+    def test_maximum(self):
+        """Test a reverse tree over a typed array."""
+        tree = binary_trees.CartesianTree(self.values, 'l', reverse = True)
+        self.check_tree(tree, lambda a, b: a > b)
+        self.check_queries(tree, max)
+
+    def test_lowest_common_ancestor(self):
+        """Test that the ancestor of two positions is above both."""
+        tree = binary_trees.CartesianTree([5, 2, 8, 1, 9, 3])
+        self.assertEqual(tree.root, 3)
+        self.assertEqual(tree.lowest_common_ancestor(0, 2), 1)
+        self.assertEqual(tree.lowest_common_ancestor(5, 2), 3)
+        self.assertEqual(tree.lowest_common_ancestor(4, 4), 4)
+
+    def test_empty_range_fail(self):
+        """Test that empty ranges and empty trees are rejected."""
+        self.assertRaises(ValueError, self.tree.query, 5, 5)
+        tree = binary_trees.CartesianTree()
+        self.assertEqual(tree.root, tree.NULL)
+        self.assertRaises(ValueError, tree.query, 0, 1)
+
+class LinkCutTreeTestCase(unittest.TestCase):
+    """A test case for the LinkCutTree class.
+    The forest is mirrored by an adjacency map, and paths are found in it by
+    a plain search to check every query.
+    """
+
+    def setUp(self):
+        self.random = random.Random(15)
+        self.values = [self.random.randrange(-50, 50) for _ in range(40)]
+        self.tree = binary_trees.LinkCutTree(self.values)
+        self.edges = {vertex: set() for vertex in range(40)}
+
+    def tearDown(self):
+        self.tree = None
+        self.edges = None
+
+    def path(self, first, second):
+        """Return the vertices from first to second, or None."""
+        previous = {first: None}
+        stack = [first]
+        while stack:
+            vertex = stack.pop()
+            for other in self.edges[vertex]:
+                if other not in previous:
+                    previous[other] = vertex
+                    stack.append(other)
+
+        if second not in previous:
+            return None
+
+        path = [second]
+        while path[-1] != first:
+            path.append(previous[path[-1]])
+
+        return path
+
+    def test_chain(self):
+        """Test path queries along a long chain, from either end."""
+        for vertex in range(39):
+            self.tree.link(vertex, vertex + 1)
+
+        self.assertEqual(self.tree.path_sum(0, 39), sum(self.values))
+        self.assertEqual(self.tree.path_max(39, 0), max(self.values))
+        self.assertEqual(self.tree.path_sum(10, 12), sum(self.values[10:13]))
+        self.assertEqual(self.tree.path_sum(7, 7), self.values[7])
+        self.tree.cut(20, 19)
+        self.assertFalse(self.tree.connected(0, 39))
+        self.assertEqual(self.tree.path_sum(20, 39), sum(self.values[20:]))
+
+    def test_random_forest(self):
+        """Test random links, cuts and value changes against the mirror."""
+        for _ in range(1500):
+            first = self.random.randrange(40)
+            second = self.random.randrange(40)
+            path = self.path(first, second)
+            choice = self.random.random()
+            if choice < 0.35 and path is None:
+                self.tree.link(first, second)
+                self.edges[first].add(second)
+                self.edges[second].add(first)
+
+            elif choice < 0.55 and second in self.edges[first]:
+                self.tree.cut(first, second)
+                self.edges[first].discard(second)
+                self.edges[second].discard(first)
+
+            elif choice < 0.65:
+                self.values[first] = self.random.randrange(-50, 50)
+                self.tree[first] = self.values[first]
+
+            else:
+                self.assertEqual(self.tree.connected(first, second),
+                                 path is not None,
+                                )
+                if path is not None:
+                    self.assertEqual(self.tree.path_sum(first, second),
+                                     sum(self.values[v] for v in path),
+                                    )
+                    self.assertEqual(self.tree.path_max(first, second),
+                                     max(self.values[v] for v in path),
+                                    )
+
+        self.assertEqual([self.tree[v] for v in range(40)], self.values)
+
+    def test_bad_edges_fail(self):
+        """Test that cycles, missing edges and split paths are rejected."""
+        self.tree.link(0, 1)
+        self.tree.link(1, 2)
+        self.assertRaises(ValueError, self.tree.link, 2, 0)
+        self.assertRaises(ValueError, self.tree.link, 3, 3)
+        self.assertRaises(ValueError, self.tree.cut, 0, 2)
+        self.assertRaises(ValueError, self.tree.path_sum, 0, 3)
+        self.assertEqual(self.tree.add(5), 40)
+        self.tree.link(40, 2)
+        self.assertEqual(self.tree.path_max(0, 40),
+                         max(self.values[:3] + [5]),
+                        )
+
+class VanEmdeBoasTreeTestCase(unittest.TestCase):
+    """A test case for the VanEmdeBoasTree class.
+    Each test checks the tree against a sorted list of the same keys.
+    """
+
+    def setUp(self):
+        rng = random.Random(11)
+        self.keys = sorted(set(rng.getrandbits(32) for _ in range(500)))
+        self.keys += [0, 2 ** 32 - 1]
+        self.keys.sort()
+        self.tree = binary_trees.VanEmdeBoasTree()
+        self.tree.update(reversed(self.keys))
+
+    def tearDown(self):
+        self.keys = None
+        self.tree = None
+
+    def test_contains(self):
+        """Test membership for present and absent keys."""
+        self.assertEqual(len(self.tree), len(self.keys))
+        for key in self.keys:
+            self.assertIn(key, self.tree)
+            self.assertNotIn(key + 1, self.tree)
+
+        self.assertNotIn(-1, self.tree)
+        self.assertNotIn(2 ** 32, self.tree)
+        self.assertNotIn('a', self.tree)
+
+    def test_insert(self):
+        """Test that inserts are ordered, idempotent and range checked."""
+        self.tree.insert(self.keys[3])
+        self.assertEqual(len(self.tree), len(self.keys))
+        self.assertEqual(list(self.tree), self.keys)
+        self.assertEqual(self.tree.minimum, 0)
+        self.assertEqual(self.tree.maximum, 2 ** 32 - 1)
+        self.assertRaises(ValueError, self.tree.insert, -1)
+        self.assertRaises(ValueError, self.tree.insert, 2 ** 32)
+        self.assertRaises(ValueError, binary_trees.VanEmdeBoasTree, 0)
+
+    def test_successor_and_predecessor(self):
+        """Test neighbour queries against bisect."""
+        keys = self.keys
+        probes = [-5, 0, 2 ** 32 - 1, 2 ** 32 + 5]
+        probes += [key + delta for key in keys[::7] for delta in (-1, 0, 1)]
+        for probe in probes:
+            i = bisect.bisect_right(keys, probe)
+            self.assertEqual(self.tree.successor(probe),
+                             keys[i] if i < len(keys) else None,
+                            )
+            i = bisect.bisect_left(keys, probe)
+            self.assertEqual(self.tree.predecessor(probe),
+                             keys[i - 1] if i else None,
+                            )
+
+    def test_delete(self):
+        """Test deletes, including the minimum and maximum, until empty."""
+        rng = random.Random(5)
+        keys = list(self.keys)
+        rng.shuffle(keys)
+        remaining = set(keys)
+        for key in keys:
+            self.tree.delete(key)
+            remaining.discard(key)
+            self.assertNotIn(key, self.tree)
+            self.assertEqual(self.tree.minimum, min(remaining, default = None))
+            self.assertEqual(self.tree.maximum, max(remaining, default = None))
+
+        self.assertEqual(len(self.tree), 0)
+        self.assertEqual(self.tree.root.clusters, {})
+        self.assertIsNone(self.tree.root.summary)
+        self.assertRaises(KeyError, self.tree.delete, keys[0])
+
+    def test_small_universes(self):
+        """Test every subset of small universes, including odd bit counts."""
+        for bits in (1, 2, 3):
+            universe = range(2 ** bits)
+            for mask in range(2 ** len(universe)):
+                keys = [key for key in universe if mask >> key & 1]
+                tree = binary_trees.VanEmdeBoasTree(bits)
+                tree.update(keys)
+                self.assertEqual(list(tree), keys)
+                for key in universe:
+                    self.assertEqual(key in tree, key in keys)
+                    later = [k for k in keys if k > key]
+                    earlier = [k for k in keys if k < key]
+                    self.assertEqual(tree.successor(key),
+                                     later[0] if later else None,
+                                    )
+                    self.assertEqual(tree.predecessor(key),
+                                     earlier[-1] if earlier else None,
+                                    )
+
+class RopeTestCase(unittest.TestCase):
+    """A test case for the Rope class.
+    Each test applies the same edits to a rope and to a plain str.
+    """
+
+    def setUp(self):
+        rng = random.Random(12)
+        self.text = ''.join(rng.choice('abcdef') for _ in range(1000))
+        self.rope = binary_trees.Rope(self.text, chunk_size = 16)
+
+    def tearDown(self):
+        self.text = None
+        self.rope = None
+
+    def check_rope(self, rope, text):
+        """Check rope against text, and its chunks and AVL balance."""
+        self.assertEqual(str(rope), text)
+        self.assertEqual(len(rope), len(text))
+
+        def height(node):
+            if node.chunk is not None:
+                self.assertTrue(0 < len(node.chunk) <= rope.chunk_size)
+                return 1
+
+            left, right = height(node.left), height(node.right)
+            self.assertLessEqual(abs(left - right), 1)
+            self.assertEqual(node.length, node.left.length + node.right.length)
+            return max(left, right) + 1
+
+        if rope.root is not None:
+            self.assertEqual(height(rope.root), rope.root.height)
+
+    def test_index(self):
+        """Test indexing and slicing against str."""
+        self.check_rope(self.rope, self.text)
+        for i in (0, 15, 16, 999, -1, -1000):
+            self.assertEqual(self.rope[i], self.text[i])
+
+        self.assertRaises(IndexError, self.rope.__getitem__, 1000)
+        for start, stop in ((0, 1000), (3, 40), (-50, -2), (500, 100)):
+            piece = self.rope[start:stop]
+            self.check_rope(piece, self.text[start:stop])
+
+        self.assertEqual(self.rope[::3], self.text[::3])
+        self.assertEqual(''.join(self.rope), self.text)
+
+    def test_insert_and_delete(self):
+        """Test random edits, which must leave the rope balanced."""
+        rng = random.Random(4)
+        text = self.text
+        for _ in range(200):
+            i = rng.randrange(len(text) + 1)
+            data = 'xyz' * rng.randrange(10)
+            self.rope.insert(i, data)
+            text = text[:i] + data + text[i:]
+            i = rng.randrange(len(text) + 1)
+            j = i + rng.randrange(20)
+            self.rope.delete(i, j)
+            text = text[:i] + text[j:]
+            self.check_rope(self.rope, text)
+
+        del self.rope[0]
+        del self.rope[-10:]
+        self.check_rope(self.rope, text[1:-10])
+
+    def test_split_and_concat(self):
+        """Test split, append and + without disturbing shared ropes."""
+        original = self.rope.copy()
+        tail = self.rope.split(300)
+        self.check_rope(self.rope, self.text[:300])
+        self.check_rope(tail, self.text[300:])
+        joined = tail + self.rope
+        self.check_rope(joined, self.text[300:] + self.text[:300])
+        self.rope.append(tail)
+        self.check_rope(self.rope, self.text)
+        self.check_rope(original, self.text)
+        self.check_rope('<' + tail + '>', '<' + self.text[300:] + '>')
+
+    def test_small_appends(self):
+        """Test that many small appends are merged into full chunks."""
+        rope = binary_trees.Rope(chunk_size = 64)
+        for _ in range(640):
+            rope += 'ab'
+
+        self.check_rope(rope, 'ab' * 640)
+        self.assertEqual(list(map(len, rope.chunks())), [64] * 20)
+
+    def test_chunks(self):
+        """Test that chunks streams exactly the requested range."""
+        for start, stop in ((0, None), (5, 5), (7, 900), (-20, None)):
+            self.assertEqual(''.join(self.rope.chunks(start, stop)),
+                             self.text[start:stop],
+                            )
+
+    def test_bytes(self):
+        """Test bytes ropes and mixing types."""
+        rope = binary_trees.Rope(b'hello world', chunk_size = 4)
+        rope.insert(5, bytearray(b','))
+        self.assertEqual(bytes(rope), b'hello, world')
+        self.assertEqual(rope[0], ord('h'))
+        self.assertRaises(TypeError, rope.insert, 0, 'text')
+        self.assertRaises(TypeError, self.rope.append, rope)
+        self.assertRaises(TypeError, binary_trees.Rope, [1, 2])
+
+    def test_buffers(self):
+        """Test ropes built from a bytearray and a memoryview."""
+        for data in (bytearray(b'hello world'), memoryview(b'hello world')):
+            rope = binary_trees.Rope(data, chunk_size = 4)
+            self.assertIs(rope.type, bytes)
+            self.assertEqual(bytes(rope), b'hello world')
+            rope.append(b'!')
+            self.assertEqual(bytes(rope), b'hello world!')
+            self.assertRaises(TypeError, rope.append, 'text')
+
 def get_test_suite():
     """
     """
     binary_tree_test_suite = unittest.TestSuite()
     test_loader = binary_tree_test_suite.TestLoader()
     # test_loader.loadTestsFromTestCase()
+    test_loader.loadTestsFromTestCase(BinaryTreeTestCase)
+    test_loader.loadTestsFromTestCase(BinarySearchTreeTestCase)
+    test_loader.loadTestsFromTestCase(AVLTreeTestCase)
+    test_loader.loadTestsFromTestCase(RedBlackTreeTestCase)
+    test_loader.loadTestsFromTestCase(SplayTreeTestCase)
+    test_loader.loadTestsFromTestCase(TreapTestCase)
+    test_loader.loadTestsFromTestCase(ScapegoatTreeTestCase)
+    test_loader.loadTestsFromTestCase(WeightBalancedTreeTestCase)
+    test_loader.loadTestsFromTestCase(TTreeTestCase)
+    test_loader.loadTestsFromTestCase(ThreadedBinaryTreeTestCase)
+    test_loader.loadTestsFromTestCase(CartesianTreeTestCase)
+    test_loader.loadTestsFromTestCase(VanEmdeBoasTreeTestCase)
+    test_loader.loadTestsFromTestCase(LinkCutTreeTestCase)
+    test_loader.loadTestsFromTestCase(RopeTestCase)
     return binary_tree_test_suite
 
 def run_test():
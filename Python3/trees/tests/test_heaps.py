@@ -24,3 +24,544 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
+
+import heapq
+import random
+import unittest
+from structs.trees import heaps
+
+class DaryHeapTestCase(unittest.TestCase):
+    """A test case for DaryHeap and, through inheritance, BinaryHeap.
+    Every heap is drained and compared against the sorted items, for plain
+    items, items in an array and items with a key.
+    """
+
+    options = [{'arity': 2}, {'arity': 3}, {'arity': 8}]
+
+    def setUp(self):
+        self.random = random.Random(21)
+        self.items = [self.random.randrange(-1000, 1000) for _ in range(300)]
+
+    def tearDown(self):
+        self.items = None
+
+    def make(self, items = (), **options):
+        return heaps.DaryHeap(items, **options)
+
+    def variants(self):
+        """Yield each heap to test, built from the items, and its key."""
+        for options in self.options:
+            yield self.make(self.items, **options), None
+            yield self.make(self.items, typecode = 'q', **options), None
+            yield self.make(self.items, key = abs, **options), abs
+
+    def drain(self, heap):
+        items = []
+        while heap:
+            items.append(heap.pop())
+
+        return items
+
+    def test_heapify(self):
+        """Test that a heap built from items pops them in order."""
+        for heap, key in self.variants():
+            self.assertEqual(len(heap), len(self.items))
+            self.assertEqual(self.drain(heap), sorted(self.items, key = key))
+
+    def test_push(self):
+        """Test pushes into an empty heap, with peek tracking the least."""
+        for heap, key in self.variants():
+            heap.clear()
+            key_of = key or int
+            for n, item in enumerate(self.items, 1):
+                heap.push(item)
+                self.assertEqual(key_of(heap.peek()),
+                                 min(map(key_of, self.items[:n])),
+                                )
+
+            self.assertEqual(self.drain(heap), sorted(self.items, key = key))
+
+    def test_stability(self):
+        """Test that items with equal keys pop in the order pushed."""
+        heap = self.make(key = lambda item: item[0])
+        pairs = [(self.random.randrange(5), n) for n in range(100)]
+        for pair in pairs:
+            heap.push(pair)
+
+        self.assertEqual(self.drain(heap), sorted(pairs))
+
+    def test_pushpop(self):
+        """Test pushpop and replace against a sorted list."""
+        for heap, key in self.variants():
+            expected = sorted(self.items, key = key)
+            for item in range(-50, 50, 7):
+                popped = heap.pushpop(item)
+                expected.append(item)
+                expected.sort(key = key)
+                self.assertEqual(popped, expected.pop(0))
+                popped = heap.replace(item)
+                self.assertEqual(popped, expected.pop(0))
+                expected.append(item)
+                expected.sort(key = key)
+
+            self.assertEqual(self.drain(heap), expected)
+
+    def test_extend(self):
+        """Test extending by a few items and by many."""
+        for heap, key in self.variants():
+            heap.extend(range(5))
+            heap.extend(range(1000))
+            self.assertEqual(self.drain(heap),
+                             sorted(self.items + list(range(5)) +
+                                    list(range(1000)), key = key))
+
+    def test_empty(self):
+        """Test the errors of an empty heap and of bad options."""
+        heap = self.make()
+        self.assertFalse(heap)
+        self.assertRaises(IndexError, heap.pop)
+        self.assertRaises(IndexError, heap.peek)
+        self.assertRaises(IndexError, heap.replace, 1)
+        self.assertEqual(heap.pushpop(1), 1)
+        self.assertRaises(ValueError, self.make, key = abs, typecode = 'q')
+
+class BinaryHeapTestCase(DaryHeapTestCase):
+    """A test case for BinaryHeap, which leaves lists to heapq."""
+
+    options = [{}]
+
+    def make(self, items = (), **options):
+        return heaps.BinaryHeap(items, **options)
+
+    def test_heapq(self):
+        """Test that a plain heap keeps the list in heapq's order."""
+        heap = self.make(self.items)
+        for item in self.items:
+            heap.pushpop(item)
+            self.assertTrue(all(heap.heap[(i - 1) // 2] <= heap.heap[i]
+                                for i in range(1, len(heap))))
+
+class IndexedHeapTestCase(unittest.TestCase):
+    """A test case for IndexedHeap, comparing it against a dict of the
+    priorities and checking the position map after every change.
+    """
+
+    def setUp(self):
+        self.random = random.Random(22)
+        self.priorities = {item: self.random.randrange(1000)
+                           for item in range(200)}
+        self.heap = heaps.IndexedHeap(self.priorities)
+
+    def tearDown(self):
+        self.priorities = None
+        self.heap = None
+
+    def check_heap(self, heap):
+        """Check the heap order, the position map and the priorities."""
+        priorities = heap.priorities
+        arity = heap.arity
+        for i in range(1, len(priorities)):
+            self.assertLessEqual(priorities[(i - 1) // arity], priorities[i])
+
+        self.assertEqual(len(heap.positions), len(heap))
+        for item, i in heap.positions.items():
+            self.assertEqual(heap.items[i], item)
+            self.assertEqual(heap[item], self.priorities[item])
+
+    def drain(self, heap):
+        pairs = []
+        while heap:
+            pairs.append(heap.pop())
+
+        return pairs
+
+    def test_heapify(self):
+        """Test building from a mapping and from pairs of several arities."""
+        self.check_heap(self.heap)
+        for arity in (2, 3, 8):
+            heap = heaps.IndexedHeap(self.priorities.items(), arity = arity)
+            self.check_heap(heap)
+            self.assertEqual([priority for _, priority in self.drain(heap)],
+                             sorted(self.priorities.values()))
+
+        self.assertRaises(ValueError, heaps.IndexedHeap, [(1, 1), (1, 2)])
+
+    def test_update(self):
+        """Test raising and lowering priorities."""
+        for _ in range(1000):
+            item = self.random.randrange(200)
+            priority = self.random.randrange(1000)
+            self.heap.update(item, priority)
+            self.priorities[item] = priority
+            item, priority = self.heap.peek()
+            self.assertEqual(priority, min(self.priorities.values()))
+            self.assertEqual(self.priorities[item], priority)
+
+        self.check_heap(self.heap)
+        self.assertRaises(KeyError, self.heap.update, 200, 0)
+
+    def test_remove(self):
+        """Test removing items from anywhere in the heap."""
+        items = list(self.priorities)
+        self.random.shuffle(items)
+        for n, item in enumerate(items):
+            self.assertIn(item, self.heap)
+            self.assertEqual(self.heap.remove(item),
+                             self.priorities.pop(item),
+                            )
+            self.assertNotIn(item, self.heap)
+            if n % 20 == 0:
+                self.check_heap(self.heap)
+
+        self.assertRaises(KeyError, self.heap.remove, items[0])
+        self.assertRaises(IndexError, self.heap.pop)
+        self.assertRaises(IndexError, self.heap.peek)
+
+    def test_mapping(self):
+        """Test item access, assignment, get and push of a present item."""
+        self.heap[500] = -1
+        self.priorities[500] = -1
+        self.heap[0] = 2000
+        self.priorities[0] = 2000
+        del self.heap[1]
+        del self.priorities[1]
+        self.check_heap(self.heap)
+        self.assertEqual(self.heap.get(1, 'absent'), 'absent')
+        self.assertEqual(self.heap.peek(), (500, -1))
+        self.assertRaises(ValueError, self.heap.push, 500, 0)
+        self.assertEqual(sorted(self.heap), sorted(self.priorities))
+        pairs = self.drain(self.heap)
+        self.assertEqual([priority for _, priority in pairs],
+                         sorted(self.priorities.values()),
+                        )
+        self.assertEqual(dict(pairs), self.priorities)
+
+class PairingHeapTestCase(unittest.TestCase):
+    """A test case for PairingHeap and, through inheritance, FibonacciHeap.
+    Every test compares the heap against a dict of the priorities.
+    """
+
+    heap_class = heaps.PairingHeap
+
+    def setUp(self):
+        self.random = random.Random(23)
+        self.priorities = {item: self.random.randrange(1000)
+                           for item in range(300)}
+        self.heap = self.heap_class()
+        self.nodes = {item: self.heap.push(item, priority)
+                      for item, priority in self.priorities.items()}
+
+    def tearDown(self):
+        self.priorities = None
+        self.heap = None
+        self.nodes = None
+
+    def drain(self, heap):
+        """Pop every pair, checking that priorities never go down."""
+        pairs = []
+        while heap:
+            pairs.append(heap.pop())
+            if len(pairs) > 1:
+                self.assertLessEqual(pairs[-2][1], pairs[-1][1])
+
+        return pairs
+
+    def test_pop(self):
+        """Test that pops come out in order of priority."""
+        self.assertEqual(len(self.heap), len(self.priorities))
+        self.assertEqual(self.heap.peek()[1], min(self.priorities.values()))
+        self.assertEqual(dict(self.drain(self.heap)), self.priorities)
+        self.assertRaises(IndexError, self.heap.pop)
+        self.assertRaises(IndexError, self.heap.peek)
+
+    def test_decrease(self):
+        """Test lowering priorities, popping between so trees form."""
+        for n in range(2000):
+            item = self.random.choice(list(self.priorities))
+            priority = self.priorities[item] - self.random.randrange(100)
+            self.heap.decrease(self.nodes[item], priority)
+            self.priorities[item] = priority
+            if n % 10 == 0:
+                item, priority = self.heap.pop()
+                self.assertEqual(priority, min(self.priorities.values()))
+                self.assertEqual(self.priorities.pop(item), priority)
+                self.assertRaises(ValueError, self.heap.decrease,
+                                  self.nodes.pop(item), priority - 1)
+
+        item = next(iter(self.priorities))
+        self.assertRaises(ValueError, self.heap.decrease, self.nodes[item],
+                          self.priorities[item] + 1)
+        self.assertEqual(dict(self.drain(self.heap)), self.priorities)
+
+    def test_meld(self):
+        """Test melding heaps, including empty ones, and then decreasing."""
+        other = self.heap_class({item: -item for item in range(300, 400)})
+        self.heap.pop()
+        other.pop()
+        self.heap.meld(other)
+        self.heap.meld(self.heap_class())
+        self.assertEqual(len(other), 0)
+        self.assertFalse(other)
+        empty = self.heap_class()
+        empty.meld(self.heap)
+        self.assertEqual(len(empty), 398)
+        node = empty.push('least', -1000)
+        empty.decrease(node, -2000)
+        self.assertEqual(empty.peek(), ('least', -2000))
+        self.assertEqual(len(self.drain(empty)), 399)
+
+class FibonacciHeapTestCase(PairingHeapTestCase):
+    """A test case for FibonacciHeap, adding checks of the tree shape."""
+
+    heap_class = heaps.FibonacciHeap
+
+    def test_degrees(self):
+        """Test that after pops the roots have distinct degrees, and every
+        node's degree counts its children.
+        """
+        for _ in range(10):
+            self.heap.pop()
+
+        roots = []
+        node = self.heap.minimum
+        while True:
+            roots.append(node)
+            node = node.right
+            if node is self.heap.minimum:
+                break
+
+        degrees = [root.degree for root in roots]
+        self.assertEqual(len(degrees), len(set(degrees)))
+        stack = list(roots)
+        while stack:
+            node = stack.pop()
+            children = []
+            child = node.child
+            while child is not None:
+                self.assertIs(child.parent, node)
+                self.assertLessEqual(node.key, child.key)
+                children.append(child)
+                child = child.right
+                if child is node.child:
+                    break
+
+            self.assertEqual(node.degree, len(children))
+            stack += children
+
+class RadixHeapTestCase(unittest.TestCase):
+    """A test case for RadixHeap and, through inheritance, BucketQueue.
+    A monotone trace of pushes and pops runs against heapq.
+    """
+
+    span = 1 << 40
+
+    def make(self, items = (), start = 0):
+        return heaps.RadixHeap(items, start)
+
+    def setUp(self):
+        self.random = random.Random(24)
+
+    def tearDown(self):
+        self.random = None
+
+    def test_trace(self):
+        """Test a trace of pushes within the span and pops against heapq."""
+        heap = self.make(start = 7)
+        expected = []
+        for step in range(5000):
+            if expected and self.random.random() < 0.45:
+                item, priority = heap.pop()
+                self.assertEqual(priority, heapq.heappop(expected)[0])
+
+            else:
+                width = self.random.choice((0, 3, 100, self.span))
+                priority = heap.last + self.random.randint(0, width)
+                heap.push(step, priority)
+                heapq.heappush(expected, (priority, step))
+
+            self.assertEqual(len(heap), len(expected))
+
+        while heap:
+            self.assertEqual(heap.peek()[1], expected[0][0])
+            self.assertEqual(heap.pop()[1], heapq.heappop(expected)[0])
+
+    def test_items(self):
+        """Test building from a mapping and that items come back with
+        their priorities.
+        """
+        priorities = {str(n): self.random.randrange(50) for n in range(200)}
+        heap = self.make(priorities)
+        popped = {}
+        while heap:
+            item, priority = heap.pop()
+            popped[item] = priority
+
+        self.assertEqual(popped, priorities)
+
+    def test_errors(self):
+        """Test popping an empty heap and pushing below the last pop."""
+        heap = self.make()
+        self.assertFalse(heap)
+        self.assertRaises(IndexError, heap.pop)
+        self.assertRaises(IndexError, heap.peek)
+        heap.push('a', 10)
+        heap.pop()
+        self.assertRaises(ValueError, heap.push, 'b', 9)
+        heap.push('c', 10)
+        self.assertEqual(heap.pop(), ('c', 10))
+
+    def test_peek(self):
+        """Test that peek leaves the floor for pushes where it was, and
+        returns the pair the next pop does.
+        """
+        heap = self.make()
+        heap.push('a', 10)
+        self.assertEqual(heap.peek(), ('a', 10))
+        heap.push('b', 5)
+        self.assertEqual(heap.peek(), ('b', 5))
+        for n in range(20):
+            heap.push(n, self.random.randrange(5, 40))
+
+        while heap:
+            pair = heap.peek()
+            self.assertEqual(heap.pop(), pair)
+
+class BucketQueueTestCase(RadixHeapTestCase):
+    """A test case for BucketQueue."""
+
+    span = 100
+
+    def make(self, items = (), start = 0):
+        return heaps.BucketQueue(self.span, items, start)
+
+    def test_span(self):
+        """Test the bounds of the span."""
+        queue = self.make()
+        queue.push('a', self.span)
+        self.assertRaises(ValueError, queue.push, 'b', self.span + 1)
+        self.assertRaises(ValueError, heaps.BucketQueue, 0)
+        self.assertEqual(queue.pop(), ('a', self.span))
+        queue.push('b', 2 * self.span)
+        self.assertEqual(queue.peek(), ('b', 2 * self.span))
+
+class MinMaxHeapTestCase(unittest.TestCase):
+    """A test case for MinMaxHeap, popping from both ends in random order
+    against a sorted list, with and without a maxlen.
+    """
+
+    def setUp(self):
+        self.random = random.Random(25)
+        self.items = [self.random.randrange(-1000, 1000) for _ in range(300)]
+
+    def tearDown(self):
+        self.items = None
+
+    def variants(self, items = (), **options):
+        yield heaps.MinMaxHeap(items, **options)
+        yield heaps.MinMaxHeap(items, typecode = 'q', **options)
+
+    def test_empty(self):
+        """Test peeks and pops on an empty heap."""
+        for heap in self.variants():
+            self.assertFalse(heap)
+            self.assertRaises(IndexError, heap.peek_min)
+            self.assertRaises(IndexError, heap.peek_max)
+            self.assertRaises(IndexError, heap.pop_min)
+            self.assertRaises(IndexError, heap.pop_max)
+
+    def test_heapify(self):
+        """Test that a heap built from items pops them from either end."""
+        for heap in self.variants(self.items):
+            expected = sorted(self.items)
+            self.assertEqual(len(heap), len(expected))
+            while expected:
+                self.assertEqual(heap.peek_min(), expected[0])
+                self.assertEqual(heap.peek_max(), expected[-1])
+                if self.random.random() < 0.5:
+                    self.assertEqual(heap.pop_min(), expected.pop(0))
+
+                else:
+                    self.assertEqual(heap.pop_max(), expected.pop())
+
+            self.assertFalse(heap)
+
+    def test_push(self):
+        """Test pushes mixed with pops from both ends."""
+        for heap in self.variants():
+            expected = []
+            for item in self.items:
+                self.assertIsNone(heap.push(item))
+                expected.append(item)
+                expected.sort()
+                choice = self.random.random()
+                if choice < 0.2:
+                    self.assertEqual(heap.pop_min(), expected.pop(0))
+
+                elif choice < 0.4:
+                    self.assertEqual(heap.pop_max(), expected.pop())
+
+                if expected:
+                    self.assertEqual(heap.peek_min(), expected[0])
+                    self.assertEqual(heap.peek_max(), expected[-1])
+
+            self.assertEqual(len(heap), len(expected))
+            heap.clear()
+            self.assertFalse(heap)
+
+    def test_maxlen(self):
+        """Test that a bounded heap keeps the greatest or least items."""
+        for maxlen in (1, 2, 3, 10):
+            for heap in self.variants(maxlen = maxlen):
+                for n, item in enumerate(self.items, 1):
+                    evicted = heap.push(item)
+                    if n <= maxlen:
+                        self.assertIsNone(evicted)
+
+                    else:
+                        self.assertLessEqual(evicted, heap.peek_min())
+
+                    self.assertLessEqual(len(heap), maxlen)
+
+                self.assertEqual(sorted(heap.heap),
+                                 sorted(self.items)[-maxlen:])
+
+            for heap in self.variants(maxlen = maxlen, evict = 'max'):
+                for item in self.items:
+                    evicted = heap.push(item)
+                    if evicted is not None:
+                        self.assertGreaterEqual(evicted, heap.peek_max())
+
+                self.assertEqual(sorted(heap.heap),
+                                 sorted(self.items)[:maxlen])
+
+            heap = heaps.MinMaxHeap(self.items, maxlen, 'max')
+            self.assertEqual(sorted(heap.heap), sorted(self.items)[:maxlen])
+
+    def test_options(self):
+        """Test that bad options are refused."""
+        self.assertRaises(ValueError, heaps.MinMaxHeap, maxlen = 0)
+        self.assertRaises(ValueError, heaps.MinMaxHeap, evict = 'middle')
+
+def get_test_suite():
+    """
+    """
+    heap_test_suite = unittest.TestSuite()
+    test_loader = binary_tree_test_suite.TestLoader()
+    # test_loader.loadTestsFromTestCase()
+    test_loader.loadTestsFromTestCase(DaryHeapTestCase)
+    test_loader.loadTestsFromTestCase(BinaryHeapTestCase)
+    test_loader.loadTestsFromTestCase(IndexedHeapTestCase)
+    test_loader.loadTestsFromTestCase(PairingHeapTestCase)
+    test_loader.loadTestsFromTestCase(FibonacciHeapTestCase)
+    test_loader.loadTestsFromTestCase(RadixHeapTestCase)
+    test_loader.loadTestsFromTestCase(BucketQueueTestCase)
+    test_loader.loadTestsFromTestCase(MinMaxHeapTestCase)
+    return binary_tree_test_suite
+
+def run_test():
+    heap_test_suite = get_test_suite()
+    tester = unittest.TextTestRunner(verbosity = 2)
+    tester.run(binary_tree_test_suite)
+
+if __name__ == '__main__':
+    run_test()